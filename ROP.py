@@ -1,14 +1,35 @@
 import streamlit as st
 import pandas as pd
 import numpy as np
-from io import BytesIO
-import math
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from google.oauth2 import service_account
 from googleapiclient.discovery import build
-from googleapiclient.http import MediaIoBaseDownload
 import io
 import os
 from datetime import datetime, timedelta
+from rop_engine import compute_rolling_frame
+from rop_engine.rolling import ABC_MODES, DEFAULT_ABC_MODE
+from rop_engine.gdrive import list_all_files, download_bytes
+from rop_engine.readers import parse_produk_excel
+from rop_engine.pivots import PIVOT_SORT_OPTIONS, city_pivot_view, pivot_page_rows, pivot_html
+from rop_engine.export import EXPORT_FORMATS, export_rop_result
+from rop_engine.file_cache import ParsedFileCache
+from rop_engine.filters import ResultIndex
+from rop_engine.backtest import backtest_windows, run_backtest, summarize_backtest
+from rop_engine.cube import ErrorCube
+from rop_engine.item_params import ItemParamsError, has_item_params, read_item_params
+from rop_engine.shared_data import SharedSalesData
+from rop_engine.store import ResultStore
+from rop_engine.simulation import DEFAULT_ORDER_DAYS, SIMULATION_GROUPS, run_simulation, summarize_simulation
+from rop_engine.rop import (
+    ROP_METHODS, ABC_CLASSES, LEAD_TIME_DAYS, apply_rop_method, abc_codes, compute_rop,
+    evaluate_z_grid, row_lead_times, score_methods, search_z_table,
+)
+from rop_engine.profiling import RunProfiler, profile_frame, rss_bytes
+from rop_engine.memo import LRUMemo, frame_fingerprint, object_nbytes
+from rop_engine.normalize import normalize_produk
 
 # Konfigurasi awal halaman Streamlit
 st.set_page_config(layout="wide", page_title="Analisis Stock & ROP")
@@ -25,17 +46,42 @@ page = st.sidebar.radio(
 )
 st.sidebar.markdown("---")
 
+# Batas memori cache pivot per kota di session ini
+PIVOT_CACHE_BYTES = 256 * 1024 * 1024
+PIVOT_PAGE_SIZES = [25, 50, 100, 250]
+# Anggaran memori data per session; di atas ini cache yang bisa dibuat ulang dilepas
+SESSION_MEMORY_BUDGET_BYTES = int(os.environ.get("ROP_SESSION_MAX_MB", "1024")) * 1024 * 1024
+
 # --- Inisialisasi Session State ---
-if 'df_penjualan' not in st.session_state:
-    st.session_state.df_penjualan = pd.DataFrame()
 if 'produk_ref' not in st.session_state:
     st.session_state.produk_ref = pd.DataFrame()
+if 'item_params' not in st.session_state:
+    st.session_state.item_params = pd.DataFrame()
 if 'rop_analysis_result' not in st.session_state:
     st.session_state.rop_analysis_result = None
-if 'error_analysis_result' not in st.session_state:
-    st.session_state.error_analysis_result = None
+if 'error_cube' not in st.session_state:
+    st.session_state.error_cube = None
 if 'summary_error_result' not in st.session_state:
     st.session_state.summary_error_result = None
+if 'z_grid_stats' not in st.session_state:
+    st.session_state.z_grid_stats = None
+if 'simulation_result' not in st.session_state:
+    st.session_state.simulation_result = None
+if 'backtest_result' not in st.session_state:
+    st.session_state.backtest_result = None
+if 'export_payload' not in st.session_state:
+    st.session_state.export_payload = None
+if 'last_profile' not in st.session_state:
+    st.session_state.last_profile = None
+if 'rop_result_index' not in st.session_state:
+    st.session_state.rop_result_index = None
+if 'store_future' not in st.session_state:
+    st.session_state.store_future = None
+if 'pivot_cache' not in st.session_state:
+    st.session_state.pivot_cache = LRUMemo(max_bytes=PIVOT_CACHE_BYTES)
+
+# Profil kinerja per run (waktu, baris, dan memori per tahap)
+run_profiler = RunProfiler(page)
 
 
 # --------------------------------Fungsi Umum & Google Drive--------------------------------
@@ -72,147 +118,265 @@ except Exception as e:
 @st.cache_data(ttl=600)
 def list_files_in_folder(_drive_service, folder_id):
     if not DRIVE_AVAILABLE: return []
-    query = f"'{folder_id}' in parents and mimeType != 'application/vnd.google-apps.folder'"
-    response = _drive_service.files().list(q=query, fields="files(id, name)").execute()
-    return response.get('files', [])
+    return list_all_files(_drive_service, folder_id, fields="id, name, modifiedTime, md5Checksum")
 
 @st.cache_data(ttl=600)
 def download_file_from_gdrive(file_id):
-    request = drive_service.files().get_media(fileId=file_id)
-    fh = BytesIO()
-    downloader = MediaIoBaseDownload(fh, request)
-    done = False
-    while not done: _, done = downloader.next_chunk()
-    fh.seek(0)
-    return fh
-
-def download_and_read(file_id, file_name, **kwargs):
-    fh = download_file_from_gdrive(file_id)
-    return pd.read_csv(fh, **kwargs) if file_name.endswith('.csv') else pd.read_excel(fh, **kwargs)
-
-def read_produk_file(file_id, sheet_name, skip_rows):
+    return download_bytes(drive_service, file_id)
+
+@st.cache_resource
+def get_sales_file_cache():
+    return ParsedFileCache()
+
+def show_file_cache_report():
+    stats = get_sales_file_cache().stats()
+    st.sidebar.caption(
+        f"💾 Cache file penjualan: {stats['hits']} hit, {stats['misses']} miss, {stats['evictions']} evict · "
+        f"{stats['files']} file, {stats['size_bytes'] / 1024**2:.1f}/{stats['max_bytes'] / 1024**2:.0f} MB"
+    )
+    if stats['write_errors']:
+        st.sidebar.caption(f"⚠️ {stats['write_errors']} file gagal disimpan ke cache (lihat log); data tetap dimuat.")
+
+def new_drive_service():
+    # Satu service per thread worker; httplib2 tidak aman dipakai bersama antar thread
+    return build('drive', 'v3', credentials=credentials)
+
+@st.cache_resource(max_entries=8)
+def load_shared_produk(file_id, file_version, sheet_name, skip_rows):
+    # Satu frame produk per (file, versi, konfigurasi) untuk semua session; diperlakukan read-only
+    fh = download_bytes(new_drive_service(), file_id)
+    return normalize_produk(parse_produk_excel(fh, sheet_name, skip_rows))
+
+def read_produk_file(file_info, sheet_name, skip_rows):
     try:
-        fh = download_file_from_gdrive(file_id)
-        df = pd.read_excel(fh, sheet_name=sheet_name, skiprows=skip_rows, usecols=[0, 1, 2, 3])
-        df.columns = ['No. Barang', 'BRAND Barang', 'Kategori Barang', 'Nama Barang']
-        return df
+        return load_shared_produk(file_info['id'], ParsedFileCache.version_of(file_info), sheet_name, skip_rows)
     except Exception as e:
         st.error(f"Gagal membaca file Excel. Pastikan Nama Sheet dan jumlah baris header benar. Detail error: {e}")
         return pd.DataFrame()
 
-# --- FUNGSI MAPPING DATA ---
-def map_nama_dept(row):
-    dept = str(row.get('Dept.', '')).strip().upper()
-    pelanggan = str(row.get('Nama Pelanggan', '')).strip().upper()
-    if dept == 'A':
-        if pelanggan in ['A - CASH', 'AIRPAY INTERNATIONAL INDONESIA', 'TOKOPEDIA']: return 'A - ITC'
-        else: return 'A - RETAIL'
-    mapping = {'B': 'B - JKT', 'C': 'C - PUSAT', 'D': 'D - SMG','E': 'E - JOG', 'F': 'F - MLG', 'G': 'G - PROJECT','H': 'H - BALI', 'X': 'X'}
-    return mapping.get(dept, 'X')
-
-def map_city(nama_dept):
-    if nama_dept in ['A - ITC', 'A - RETAIL', 'C - PUSAT', 'G - PROJECT']:
-        return 'Surabaya'
-    elif nama_dept == 'B - JKT': return 'Jakarta'
-    elif nama_dept == 'D - SMG': return 'Semarang'
-    elif nama_dept == 'E - JOG': return 'Jogja'
-    elif nama_dept == 'F - MLG': return 'Malang'
-    elif nama_dept == 'H - BALI': return 'Bali'
-    else: return 'Others'
+# --- DATA PENJUALAN BERSAMA ---
+@st.cache_resource
+def get_shared_sales_data():
+    """
+    Data penjualan yang dimuat sekali untuk semua session di proses ini
+    (rop_engine.shared_data). Listing folder dipanggil dari thread latar belakang,
+    jadi memakai service sendiri per thread yang dibuat sekali lalu dipakai ulang
+    untuk setiap pemeriksaan berkala.
+    """
+    listing = threading.local()
+
+    def list_sales_files():
+        if not hasattr(listing, 'service'):
+            listing.service = new_drive_service()
+        return list_all_files(listing.service, folder_penjualan, fields="id, name, modifiedTime, md5Checksum")
+
+    return SharedSalesData(list_sales_files, new_drive_service, cache=get_sales_file_cache())
+
+def show_shared_data_status():
+    """Versi data penjualan bersama di sidebar, plus status pemuatan di latar belakang."""
+    stats = get_shared_sales_data().stats()
+    if stats['version'] is not None:
+        st.sidebar.caption(f"📦 Data penjualan versi {stats['version']}, dimuat {stats['loaded_at']:%d-%m %H:%M}")
+    if stats['refreshing']:
+        st.sidebar.caption("🔄 Memeriksa / memuat data penjualan terbaru di latar belakang...")
+
+@st.fragment(run_every=2)
+def show_shared_refresh_progress():
+    """Progres pemuatan di latar belakang; setelah selesai seluruh halaman dijalankan ulang dengan versi baru."""
+    stats = get_shared_sales_data().stats()
+    if not stats['refreshing']:
+        st.rerun()
+    done, total = stats['progress'] or (0, 0)
+    if total:
+        st.progress(done / total, text=f"Memuat data penjualan terbaru di latar belakang: {done}/{total} file...")
+    else:
+        st.caption("🔄 Memeriksa folder penjualan di Google Drive...")
+
+def show_shared_data_report(stats):
+    """Versi dan memori data penjualan bersama (halaman Input Data)."""
+    rss = rss_bytes()
+    c1, c2, c3, c4 = st.columns(4)
+    c1.metric("Versi data", stats['version'] or "-")
+    c2.metric("Baris", f"{stats['rows']:,}")
+    c3.metric("Memori data bersama", f"{stats['size_bytes'] / 1024**2:.1f} MB")
+    c4.metric("Memori proses (RSS)", f"{rss / 1024**2:.0f} MB" if rss is not None else "-")
+    details = [f"{stats['files']} file"]
+    if stats['loaded_at'] is not None:
+        details.append(f"dimuat {stats['loaded_at']:%d-%m-%Y %H:%M:%S} dalam {stats['load_seconds']:.1f} detik")
+    if stats['checked_at'] is not None:
+        details.append(f"diperiksa {stats['checked_at']:%H:%M:%S}")
+    if stats['retired_versions']:
+        details.append(f"{stats['retired_versions']} versi lama masih di memori ({stats['retired_bytes'] / 1024**2:.1f} MB)")
+    st.caption(" · ".join(details))
+    if stats['last_profile']:
+        last_profile = stats['last_profile']
+        with st.expander(f"Profil pemuatan terakhir ({last_profile['started_at']}, {last_profile['total_seconds']:.2f} detik)"):
+            st.dataframe(profile_frame(last_profile))
+
+def get_analysis_inputs():
+    """
+    Data penjualan (versi bersama yang aktif) & produk yang sudah dinormalisasi
+    untuk halaman analisis, tanpa salinan. Versi diambil sekali per run, jadi satu
+    analisis tidak pernah mencampur dua versi data.
+    """
+    shared = get_shared_sales_data() if DRIVE_AVAILABLE else None
+    current = shared.current if shared is not None else None
+    if current is None:
+        if shared is not None and shared.refreshing:
+            st.info("⏳ Data penjualan sedang dimuat di latar belakang. Halaman akan diperbarui otomatis setelah selesai.")
+            show_shared_refresh_progress()
+        elif shared is not None and shared.last_error:
+            st.error(f"Error: {shared.last_error}")
+        else:
+            st.warning("⚠️ Data **Penjualan** belum tersedia. Periksa halaman **'Input Data'**.")
+        st.stop()
+    if st.session_state.produk_ref.empty:
+        st.warning("⚠️ Harap muat file **Produk Referensi** di halaman **'Input Data'**.")
+        st.stop()
+    return current.penjualan, st.session_state.produk_ref
 
 # --- FUNGSI UTAMA PERHITUNGAN ROP (STRATEGI BARU) ---
-@st.cache_data(ttl=3600)
-def preprocess_sales_data(_penjualan_df, _produk_df, start_date, end_date):
+@st.cache_resource
+def get_preprocess_memo():
+    return LRUMemo()
+
+def preprocess_sales_data(penjualan_df, produk_df, start_date, end_date, profiler=None, abc_mode=DEFAULT_ABC_MODE,
+                          item_params=None):
     """
-    Fungsi inti dengan logika perhitungan yang ditulis ulang menggunakan groupby().apply()
-    untuk menghindari bug internal pandas pada MultiIndex.
+    Fungsi inti pra-pemrosesan. Statistik rolling (sales_90d, std_dev_90d, ADS,
+    Penjualan_Aktual_21_Hari) dihitung sekaligus untuk semua (City, No. Barang)
+    lewat matriks item x hari di rop_engine, bukan groupby().apply() per grup.
+    Dengan `item_params`, jendela dan lead time mengikuti tabel parameter per
+    item/kota (kolom 'Lead Time' dan 'Jendela' ikut di frame hasil).
+
+    Hasil di-memo berdasarkan sidik jari isi data penjualan & produk (dan tabel
+    parameter) plus rentang tanggal, sehingga data baru tidak pernah mengembalikan
+    hasil lama. Frame yang dikembalikan dipakai bersama; jangan diubah di tempat.
     """
-    penjualan_df = _penjualan_df.copy()
-    produk_df = _produk_df.copy()
+    if not has_item_params(item_params):
+        item_params = None
+    key = (frame_fingerprint(penjualan_df), frame_fingerprint(produk_df), str(start_date), str(end_date), abc_mode,
+           frame_fingerprint(item_params) if item_params is not None else '')
+    return get_preprocess_memo().get_or_compute(
+        key, lambda: compute_rolling_frame(penjualan_df, produk_df, start_date, end_date, profiler=profiler, abc_mode=abc_mode,
+                                           item_params=item_params)
+    )
 
-    analysis_start_date = pd.to_datetime(start_date) - pd.DateOffset(days=90)
-    extended_end_date = pd.to_datetime(end_date) + pd.DateOffset(days=21)
-    date_range_full = pd.date_range(start=analysis_start_date, end=extended_end_date, freq='D')
+def select_abc_mode():
+    """Pilihan klasifikasi ABC di sidebar, dipakai bersama halaman hasil ROP dan analisis error."""
+    return st.sidebar.radio(
+        "Klasifikasi ABC:", list(ABC_MODES), index=list(ABC_MODES).index(DEFAULT_ABC_MODE),
+        format_func=ABC_MODES.get, key="abc_mode",
+        help="'Per tanggal' dan 'Per minggu' hanya memakai penjualan sampai tanggal tersebut, sehingga kelas bisa "
+             "berubah di dalam rentang; 'Per minggu' menghitung ulang kelas setiap 7 hari.",
+    )
 
-    daily_sales = penjualan_df.groupby(['Tgl Faktur', 'City', 'No. Barang'])['Kuantitas'].sum().reset_index()
-    daily_sales.rename(columns={'Tgl Faktur': 'Date', 'Kuantitas': 'SO'}, inplace=True)
-    daily_sales['Date'] = pd.to_datetime(daily_sales['Date'])
+def show_preprocess_cache_report():
+    stats = get_preprocess_memo().stats()
+    st.sidebar.caption(
+        f"🧠 Cache pra-pemrosesan: {stats['hits']} hit, {stats['misses']} miss, {stats['evictions']} evict · "
+        f"{stats['entries']} hasil, {stats['size_bytes'] / 1024**2:.1f}/{stats['max_bytes'] / 1024**2:.0f} MB"
+    )
 
-    unique_items = daily_sales[['City', 'No. Barang']].drop_duplicates()
-    if unique_items.empty:
-        return pd.DataFrame()
+@st.cache_resource
+def get_result_store():
+    return ResultStore()
+
+@st.cache_resource
+def get_store_writer():
+    # Satu thread penulis: penyimpanan hasil ke database tidak menahan halaman
+    return ThreadPoolExecutor(max_workers=1)
+
+def save_rop_result(result_df, method, start_date, end_date, penjualan_df, produk_df, abc_mode, item_params=None):
+    """Menyimpan hasil ROP sebagai run di database hasil (di latar belakang) agar bisa di-query sistem pembelian."""
+    fingerprint = f"{frame_fingerprint(penjualan_df)}:{frame_fingerprint(produk_df)}:{abc_mode}"
+    if has_item_params(item_params):
+        fingerprint += f":{frame_fingerprint(item_params)}"
+    st.session_state.store_future = get_store_writer().submit(
+        get_result_store().save_run, result_df, method, start_date, end_date, fingerprint, 'streamlit'
+    )
 
-    date_df = pd.DataFrame({'Date': date_range_full})
-    df_full = unique_items.merge(date_df, how='cross')
-    df_full = df_full.merge(daily_sales, on=['City', 'No. Barang', 'Date'], how='left').fillna(0)
-    df_full = df_full.groupby(['City', 'No. Barang', 'Date']).sum().reset_index()
-    
-    # Fungsi untuk diterapkan pada setiap grup (setiap produk di setiap kota)
-    def calculate_metrics_for_group(group):
-        group = group.sort_values('Date')
-        group['sales_90d'] = group['SO'].rolling(window=90, min_periods=1).sum()
-        group['std_dev_90d'] = group['SO'].rolling(window=90, min_periods=1).std().fillna(0)
-        group['ADS'] = group['sales_90d'] / 90
-        
-        # Kalkulasi penjualan 21 hari ke depan
-        reversed_rolling_sum = group['SO'].iloc[::-1].rolling(window=21, min_periods=0).sum().iloc[::-1]
-        # FIX: Menghapus .shift() untuk perbandingan error yang benar
-        group['Penjualan_Aktual_21_Hari'] = reversed_rolling_sum
-        return group
-
-    # Terapkan fungsi ke setiap grup. Ini adalah inti dari perbaikan.
-    # FIX: Menghapus argumen 'include_groups' yang tidak kompatibel dengan versi pandas lama
-    df_full = df_full.groupby(['City', 'No. Barang'], group_keys=False).apply(calculate_metrics_for_group)
-
-    # --- Sisa fungsi berjalan seperti biasa ---
-    avg_ads = df_full.groupby(['City', 'No. Barang'])['ADS'].mean().reset_index()
-    
-    if avg_ads.empty:
-        abc_classification = pd.DataFrame(columns=['City', 'No. Barang', 'Kategori ABC'])
+def show_store_status():
+    future = st.session_state.store_future
+    if future is None:
+        return
+    if not future.done():
+        st.sidebar.caption("💾 Menyimpan hasil ROP ke database...")
+    elif future.exception() is not None:
+        st.sidebar.warning(f"Gagal menyimpan hasil ROP ke database: {future.exception()}")
     else:
-        # FIX: Mengganti .apply dengan metode vectorized untuk menghindari FutureWarning
-        sorted_ads = avg_ads.sort_values(by=['City', 'ADS'], ascending=[True, False])
-        city_totals = sorted_ads.groupby('City')['ADS'].transform('sum')
-        sorted_ads['CUM_ADS'] = sorted_ads.groupby('City')['ADS'].cumsum()
-        sorted_ads['Cumulative_Perc'] = 100 * sorted_ads['CUM_ADS'] / city_totals.where(city_totals != 0, 1)
-        sorted_ads['Kategori ABC'] = pd.cut(sorted_ads['Cumulative_Perc'], bins=[-1, 70, 90, 101], labels=['A', 'B', 'C'], right=True)
-        
-        # FIX: Hanya tambahkan kategori 'D' jika belum ada untuk menghindari ValueError
-        if 'D' not in sorted_ads['Kategori ABC'].cat.categories:
-            sorted_ads['Kategori ABC'] = sorted_ads['Kategori ABC'].cat.add_categories('D')
-        
-        sorted_ads.loc[city_totals == 0, 'Kategori ABC'] = 'D'
-        abc_classification = sorted_ads[['City', 'No. Barang', 'Kategori ABC']]
-
-    final_df = pd.merge(df_full, abc_classification, on=['City', 'No. Barang'], how='left')
-    final_df = pd.merge(final_df, produk_df, on='No. Barang', how='left')
-
-    final_df = final_df[(final_df['Date'].dt.date >= pd.to_datetime(start_date).date()) & (final_df['Date'].dt.date <= pd.to_datetime(end_date).date())].copy()
-
-    return final_df
-
-def apply_rop_method(df, method):
-    LEAD_TIME_DAYS = 21
-    FORECAST_PERIOD_DAYS = 90
-    df_copy = df.copy()
-    if method == "ABC Bertingkat":
-        z_scores = {'A': 1.65, 'B': 1.0, 'C': 0.0, 'D': 0.0}
-    elif method == "Uniform":
-        z_scores = {'A': 1.0, 'B': 1.0, 'C': 1.0, 'D': 1.0}
-    else: # ROP = Min Stock
-        z_scores = {'A': 0.0, 'B': 0.0, 'C': 0.0, 'D': 0.0}
-    
-    # Mengubah Kategori ABC menjadi tipe data string biasa untuk menghindari error
-    df_copy['Kategori ABC'] = df_copy['Kategori ABC'].astype(str).fillna('D')
-
-    df_copy['Z_Score'] = df_copy['Kategori ABC'].map(z_scores)
-    df_copy['Prediksi_Stok_Minimal'] = df_copy['ADS'] * LEAD_TIME_DAYS
-    lead_time_ratio_std = LEAD_TIME_DAYS / FORECAST_PERIOD_DAYS
-    df_copy['Safety_Stock'] = df_copy['Z_Score'] * df_copy['std_dev_90d'] * math.sqrt(lead_time_ratio_std)
-    df_copy['ROP'] = df_copy['Prediksi_Stok_Minimal'] + df_copy['Safety_Stock']
-    df_copy['ROP'] = df_copy['ROP'].round().astype(int)
-    df_copy['SO'] = df_copy['SO'].astype(int)
-    return df_copy
+        store = get_result_store()
+        retention = f" (disimpan {store.keep_runs} run terakhir)" if store.keep_runs else ""
+        st.sidebar.caption(f"💾 Hasil ROP tersimpan sebagai run #{future.result()} di {store.path}{retention}")
+
+def get_result_index():
+    """Indeks filter untuk hasil ROP di session; dibangun ulang hanya bila hasilnya berganti."""
+    result_index = st.session_state.rop_result_index
+    if result_index is None or result_index.frame is not st.session_state.rop_analysis_result:
+        with run_profiler.stage('indeks_filter', rows=len(st.session_state.rop_analysis_result)):
+            result_index = ResultIndex(st.session_state.rop_analysis_result)
+        st.session_state.rop_result_index = result_index
+    return result_index
+
+def get_city_pivot_view(filter_key, city, result_index, selections):
+    """
+    Pivot + ringkasan satu kota (rop_engine.pivots.city_pivot_view), dibuat saat
+    pertama kali dibutuhkan dan disimpan di session per (hasil, filter, kota).
+    Mengembalikan None bila kota tersebut tidak punya baris setelah filter.
+    """
+    def build_view():
+        city_df = result_index.subset(selections, city=city)
+        if city_df.empty:
+            return None
+        with run_profiler.stage('pivot_tabel', rows=len(city_df)):
+            return city_pivot_view(city_df)
+    return st.session_state.pivot_cache.get_or_compute(filter_key + (city,), build_view)
+
+# --- LAPORAN MEMORI SESSION ---
+SESSION_DATA_LABELS = {
+    'produk_ref': "Produk referensi",
+    'item_params': "Parameter lead time",
+    'rop_analysis_result': "Hasil ROP",
+    'rop_result_index': "Indeks filter",
+    'pivot_cache': "Cache pivot kota",
+    'export_payload': "File unduhan",
+    'error_cube': "Kubus metrik error",
+    'z_grid_stats': "Statistik grid z",
+    'simulation_result': "Hasil simulasi persediaan",
+    'backtest_result': "Hasil backtest",
+}
+
+def session_memory_usage():
+    usage = {}
+    for key, label in SESSION_DATA_LABELS.items():
+        value = st.session_state.get(key)
+        usage[label] = value.stats()['size_bytes'] if isinstance(value, LRUMemo) else object_nbytes(value)
+    return usage
+
+def show_session_memory_report():
+    """
+    Ringkasan memori data di session ini. Bila melewati anggaran, cache yang bisa
+    dibuat ulang (pivot kota dan file unduhan) dilepas lebih dulu.
+    """
+    usage = session_memory_usage()
+    if sum(usage.values()) > SESSION_MEMORY_BUDGET_BYTES:
+        st.session_state.pivot_cache.clear()
+        st.session_state.export_payload = None
+        usage = session_memory_usage()
+        st.sidebar.warning("Memori session melebihi anggaran; cache pivot dan file unduhan dilepas.")
+    total = sum(usage.values())
+    with st.sidebar.expander(f"🧮 Memori session: {total / 1024**2:.1f}/{SESSION_MEMORY_BUDGET_BYTES / 1024**2:.0f} MB"):
+        st.dataframe(pd.DataFrame(
+            {'MB': [round(n / 1024**2, 2) for n in usage.values()]}, index=list(usage)
+        ))
+
+# Data penjualan bersama diperiksa di latar belakang; run ini tidak menunggu unduhan
+if DRIVE_AVAILABLE:
+    get_shared_sales_data().maybe_refresh()
+    show_shared_data_status()
+
+# Nama metode pada halaman analisis error -> metode ROP
+ERROR_METHODS = {'ABC': "ABC Bertingkat", 'Uniform': "Uniform", 'Min_Stock': "ROP = Min Stock"}
 
 
 # =====================================================================================
@@ -226,48 +390,28 @@ if page == "Input Data":
         st.stop()
     st.header("1. Data Penjualan")
     st.info("Tips: Untuk mempercepat pemrosesan, arsipkan file-file penjualan yang sangat lama ke folder lain di Google Drive Anda.")
-    with st.spinner("Mencari file penjualan di Google Drive..."):
-        penjualan_files_list = list_files_in_folder(drive_service, folder_penjualan)
-    if st.button("Muat / Muat Ulang Data Penjualan"):
-        if penjualan_files_list:
-            progress_bar = st.progress(0, text="Memulai proses pemuatan data...")
-            all_dfs = []
-            total_files = len(penjualan_files_list)
-            try:
-                for i, file_info in enumerate(penjualan_files_list):
-                    progress_text = f"Memuat file {i + 1}/{total_files}: {file_info['name']}"
-                    progress_bar.progress((i + 1) / total_files, text=progress_text)
-                    df = download_and_read(file_info['id'], file_info['name'])
-                    all_dfs.append(df)
-                progress_bar.progress(1.0, text="Menggabungkan semua data...")
-                if all_dfs:
-                    df_penjualan = pd.concat(all_dfs, ignore_index=True)
-                    if 'No. Barang' in df_penjualan.columns:
-                        df_penjualan['No. Barang'] = df_penjualan['No. Barang'].astype(str)
-                    st.session_state.df_penjualan = df_penjualan
-                    progress_bar.empty()
-                    st.success("Data penjualan berhasil dimuat ulang.")
-                else:
-                    progress_bar.empty()
-                    st.warning("Tidak ada data untuk digabungkan.")
-            except Exception as e:
-                progress_bar.empty()
-                st.error(f"Terjadi kesalahan saat memuat file: {e}")
-                st.exception(e)
-        else:
-            st.warning("⚠️ Tidak ada file penjualan ditemukan di folder Google Drive.")
-    if not st.session_state.df_penjualan.empty:
-        df_penjualan_display = st.session_state.df_penjualan.copy()
-        st.success(f"✅ Data penjualan telah dimuat ({len(df_penjualan_display)} baris).")
-        df_penjualan_display['Tgl Faktur'] = pd.to_datetime(df_penjualan_display['Tgl Faktur'], errors='coerce')
-        min_date = df_penjualan_display['Tgl Faktur'].min()
-        max_date = df_penjualan_display['Tgl Faktur'].max()
+    shared_sales = get_shared_sales_data()
+    if st.button("Periksa & Muat Ulang Data Penjualan"):
+        shared_sales.refresh_in_background()
+    st.caption(f"Data penjualan dimuat sekali untuk semua pengguna dan diperiksa ulang otomatis setiap "
+               f"{shared_sales.refresh_seconds // 60} menit; file yang tidak berubah tidak diunduh ulang.")
+    if shared_sales.refreshing:
+        show_shared_refresh_progress()
+    if shared_sales.last_error:
+        st.error(shared_sales.last_error)
+    show_file_cache_report()
+    show_shared_data_report(shared_sales.stats())
+    current_sales = shared_sales.current
+    if current_sales is not None:
+        # Frame bersama yang sama dengan yang dipakai halaman analisis; tidak disalin
+        penjualan_display = current_sales.penjualan
+        st.success(f"✅ Data penjualan versi {current_sales.label} telah dimuat ({len(penjualan_display)} baris setelah normalisasi).")
+        min_date = penjualan_display['Tgl Faktur'].min()
+        max_date = penjualan_display['Tgl Faktur'].max()
         if pd.notna(min_date) and pd.notna(max_date):
-            num_months = len(df_penjualan_display['Tgl Faktur'].dt.to_period('M').unique())
+            num_months = penjualan_display['Tgl Faktur'].dt.to_period('M').nunique()
             st.info(f"📅 **Rentang Data:** Dari **{min_date.strftime('%d %B %Y')}** hingga **{max_date.strftime('%d %B %Y')}** ({num_months} bulan data).")
-        if 'No. Barang' in df_penjualan_display.columns:
-            df_penjualan_display['No. Barang'] = df_penjualan_display['No. Barang'].astype(str)
-        st.dataframe(df_penjualan_display)
+        st.dataframe(penjualan_display)
     st.header("2. Produk Referensi")
     with st.spinner("Mencari file produk di Google Drive..."):
         produk_files_list = list_files_in_folder(drive_service, folder_produk)
@@ -285,15 +429,37 @@ if page == "Input Data":
             submitted = st.form_submit_button("Muat File Produk")
             if submitted:
                 with st.spinner(f"Memuat dan memproses file {selected_produk_file['name']}..."):
-                    produk_df = read_produk_file(selected_produk_file['id'], sheet_name, skip_rows)
+                    produk_df = read_produk_file(selected_produk_file, sheet_name, skip_rows)
                     if not produk_df.empty:
-                        if 'No. Barang' in produk_df.columns:
-                            produk_df['No. Barang'] = produk_df['No. Barang'].astype(str)
                         st.session_state.produk_ref = produk_df
                         st.success(f"File produk referensi '{selected_produk_file['name']}' berhasil dimuat.")
     if not st.session_state.produk_ref.empty:
         st.success(f"✅ Data produk referensi telah dimuat ({len(st.session_state.produk_ref)} baris).")
         st.dataframe(st.session_state.produk_ref.head())
+    st.header("3. Lead Time & Jendela per Item/Kota (Opsional)")
+    st.info("Tabel CSV/Excel dengan kolom **City** dan/atau **No. Barang**, serta **Lead Time** dan/atau **Jendela** (hari). "
+            "Kunci kosong berlaku untuk semua; item tanpa parameter memakai lead time 21 hari dan jendela 90 hari.")
+    selected_params_file = st.selectbox(
+        "Pilih file parameter dari Google Drive:",
+        options=[None] + produk_files_list,
+        format_func=lambda x: x['name'] if x else "Pilih file",
+        key="params_file"
+    )
+    col_p1, col_p2 = st.columns(2)
+    if selected_params_file and col_p1.button("Muat Parameter"):
+        try:
+            fh = download_file_from_gdrive(selected_params_file['id'])
+            st.session_state.item_params = read_item_params(fh, selected_params_file['name'])
+            st.success(f"Parameter dari '{selected_params_file['name']}' berhasil dimuat.")
+        except ItemParamsError as e:
+            st.error(f"{selected_params_file['name']}: {e}")
+        except Exception as e:
+            st.error(f"Gagal membaca file parameter: {e}")
+    if has_item_params(st.session_state.item_params) and col_p2.button("Hapus Parameter"):
+        st.session_state.item_params = pd.DataFrame()
+    if has_item_params(st.session_state.item_params):
+        st.success(f"✅ Parameter lead time & jendela telah dimuat ({len(st.session_state.item_params)} baris).")
+        st.dataframe(st.session_state.item_params)
 # =====================================================================================
 #                                HALAMAN HASIL ANALISA ROP
 # =====================================================================================
@@ -304,24 +470,8 @@ elif page == "Hasil Analisa ROP":
         "Pilih Metode Perhitungan ROP:",
         ("ABC Bertingkat", "Uniform", "ROP = Min Stock")
     )
-    if st.session_state.df_penjualan.empty or st.session_state.produk_ref.empty:
-        st.warning("⚠️ Harap muat file **Penjualan** dan **Produk Referensi** di halaman **'Input Data'**.")
-        st.stop()
-    penjualan = st.session_state.df_penjualan.copy()
-    produk_ref = st.session_state.produk_ref.copy()
-    for df in [penjualan, produk_ref]:
-        if 'No. Barang' in df.columns:
-            df['No. Barang'] = df['No. Barang'].astype(str).str.strip()
-    if 'Qty' in penjualan.columns and 'Kuantitas' not in penjualan.columns:
-        penjualan.rename(columns={'Qty': 'Kuantitas'}, inplace=True)
-    elif 'Kuantitas' not in penjualan.columns:
-        st.error("Error: Kolom kuantitas ('Qty' atau 'Kuantitas') tidak ditemukan.")
-        st.stop()
-    penjualan['Nama Dept'] = penjualan.apply(map_nama_dept, axis=1)
-    penjualan['City'] = penjualan['Nama Dept'].apply(map_city)
-    penjualan = penjualan[penjualan['City'] != 'Others']
-    penjualan['Tgl Faktur'] = pd.to_datetime(penjualan['Tgl Faktur'], errors='coerce')
-    penjualan.dropna(subset=['Tgl Faktur', 'City'], inplace=True)
+    abc_mode = select_abc_mode()
+    penjualan, produk_ref = get_analysis_inputs()
     st.markdown("---")
     st.header("Pilih Rentang Tanggal untuk Analisis")
     default_end_date = penjualan['Tgl Faktur'].max().date()
@@ -335,96 +485,108 @@ elif page == "Hasil Analisa ROP":
         else:
             try:
                 with st.spinner(f"Menjalankan pra-pemrosesan data... Ini mungkin butuh waktu lebih lama."):
-                    preprocessed_df = preprocess_sales_data(penjualan, produk_ref, start_date, end_date)
+                    with run_profiler.stage('preprocess_total') as info:
+                        preprocessed_df = preprocess_sales_data(penjualan, produk_ref, start_date, end_date, profiler=run_profiler,
+                                                                abc_mode=abc_mode, item_params=st.session_state.item_params)
+                        info['rows'] = len(preprocessed_df)
                 with st.spinner(f"Menerapkan metode '{metode_rop}'..."):
-                    rop_result_df = apply_rop_method(preprocessed_df, metode_rop)
+                    with run_profiler.stage('apply_rop', rows=len(preprocessed_df)):
+                        rop_result_df = apply_rop_method(preprocessed_df, metode_rop)
                 if not rop_result_df.empty:
                     st.session_state.rop_analysis_result = rop_result_df
+                    get_result_index()
+                    save_rop_result(rop_result_df, metode_rop, start_date, end_date, penjualan, produk_ref, abc_mode,
+                                    st.session_state.item_params)
                     st.success(f"Analisis berhasil dijalankan!")
                 else:
                     st.error("Tidak ada data yang dihasilkan.")
             except Exception as e:
                 st.error(f"Terjadi kesalahan saat perhitungan: {e}")
                 st.exception(e)
+    show_preprocess_cache_report()
+    show_store_status()
     if st.session_state.rop_analysis_result is not None:
-        result_df = st.session_state.rop_analysis_result.copy()
+        # Opsi dan kode filter sudah dihitung di muka; filter hanya berupa mask boolean
+        result_index = get_result_index()
         st.markdown("---"); st.header("🔍 Filter Hasil")
         col_f1, col_f2, col_f3 = st.columns(3)
-        kategori_options = sorted(result_df['Kategori Barang'].dropna().unique().astype(str))
-        selected_kategori = col_f1.multiselect("Kategori:", kategori_options)
-        brand_options = sorted(result_df['BRAND Barang'].dropna().unique().astype(str))
-        selected_brand = col_f2.multiselect("Brand:", brand_options)
-        product_options = sorted(result_df['Nama Barang'].dropna().unique().astype(str))
-        selected_products = col_f3.multiselect("Nama Produk:", product_options)
-        if selected_kategori: result_df = result_df[result_df['Kategori Barang'].astype(str).isin(selected_kategori)]
-        if selected_brand: result_df = result_df[result_df['BRAND Barang'].astype(str).isin(selected_brand)]
-        if selected_products: result_df = result_df[result_df['Nama Barang'].astype(str).isin(selected_products)]
+        selected_kategori = col_f1.multiselect("Kategori:", result_index.options['Kategori Barang'])
+        selected_brand = col_f2.multiselect("Brand:", result_index.options['BRAND Barang'])
+        selected_products = col_f3.multiselect("Nama Produk:", result_index.options['Nama Barang'])
+        selections = {
+            'Kategori Barang': selected_kategori,
+            'BRAND Barang': selected_brand,
+            'Nama Barang': selected_products,
+        }
         st.markdown("---")
-        result_df['Date'] = result_df['Date'].dt.strftime('%Y-%m-%d')
-        pivot_outputs = {}
         st.header("Tabel ROP & SO per Kota")
-        unique_cities = [str(city) for city in result_df['City'].dropna().unique()]
-        for city in sorted(unique_cities):
-            with st.expander(f"📍 Lihat Hasil untuk Kota: {city}", expanded=(city == "Surabaya")):
-                city_df = result_df[result_df['City'] == city].copy()
-                if not city_df.empty:
-                    index_cols = ['No. Barang', 'Nama Barang', 'BRAND Barang', 'Kategori Barang']
-                    for col in index_cols:
-                        city_df[col] = city_df[col].fillna('Data Tidak Ditemukan')
-                    pivot_city = city_df.pivot_table(
-                        index=index_cols,
-                        columns='Date',
-                        values=['ROP', 'SO']
-                    ).fillna(0).astype(int)
-                    pivot_city.columns = pivot_city.columns.swaplevel(0, 1)
-                    pivot_city.sort_index(axis=1, level=0, inplace=True)
-                    pivot_outputs[f"ROP_{city.replace(' ', '_')}"] = pivot_city
-                    cmap_rop = 'Greens'
-                    cmap_so = 'Blues'
-                    styled_pivot = pivot_city.style.background_gradient(
-                        cmap=cmap_rop,
-                        subset=pd.IndexSlice[:, pd.IndexSlice[:, 'ROP']]
-                    ).background_gradient(
-                        cmap=cmap_so,
-                        subset=pd.IndexSlice[:, pd.IndexSlice[:, 'SO']]
-                    ).format("{:}")
-                    st.write(styled_pivot.to_html(), unsafe_allow_html=True)
-                else:
+        # Pivot kota dibuat hanya saat expander-nya dibuka, lalu disimpan per kombinasi hasil + filter
+        filter_key = (
+            frame_fingerprint(st.session_state.rop_analysis_result),
+            tuple(selected_kategori), tuple(selected_brand), tuple(selected_products),
+        )
+        col_v1, col_v2, col_v3 = st.columns(3)
+        sort_by = col_v1.selectbox("Urutkan produk:", list(PIVOT_SORT_OPTIONS), format_func=PIVOT_SORT_OPTIONS.get)
+        top_n = col_v2.number_input("Top-N produk menurut ROP (0 = semua):", min_value=0, value=0, step=10)
+        page_size = col_v3.selectbox("Baris per halaman:", PIVOT_PAGE_SIZES, index=1)
+        for city in result_index.cities(selections):
+            city_expander = st.expander(
+                f"📍 Lihat Hasil untuk Kota: {city}", expanded=(city == "Surabaya"),
+                key=f"pivot_open_{city}", on_change="rerun"
+            )
+            # .open bernilai None bila Streamlit tidak melacak status expander; tampilkan seperti biasa
+            if city_expander.open is False:
+                continue
+            with city_expander:
+                view = get_city_pivot_view(filter_key, city, result_index, selections)
+                if view is None:
                     st.write("Tidak ada data yang cocok dengan filter.")
-        if pivot_outputs:
+                    continue
+                page_count = pivot_page_rows(view, sort_by, top_n, 1, page_size)[2]
+                page_no = st.number_input(
+                    f"Halaman (dari {page_count}):", min_value=1, max_value=page_count, value=1,
+                    key=f"pivot_page_{city}"
+                )
+                rows, n_shown, _ = pivot_page_rows(view, sort_by, top_n, page_no, page_size)
+                with run_profiler.stage('render_pivot_html', rows=len(rows)):
+                    st.write(pivot_html(view, rows), unsafe_allow_html=True)
+                st.caption(f"Menampilkan {len(rows)} dari {n_shown} produk (total {len(view['pivot'])} produk di kota ini).")
+        n_filtered = result_index.count(selections)
+        if n_filtered:
             st.markdown("---")
             st.header("💾 Unduh Hasil Analisis")
-            output = BytesIO()
-            with pd.ExcelWriter(output, engine='openpyxl') as writer:
-                for sheet_name, df_pivot in pivot_outputs.items():
-                    df_pivot.to_excel(writer, sheet_name=sheet_name, index=True)
-            st.download_button(
-                label="📥 Unduh Semua Hasil ROP & SO (Excel)",
-                data=output.getvalue(),
-                file_name=f"hasil_rop_so_{start_date}_to_{end_date}.xlsx",
-                mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+            export_fmt = st.radio(
+                "Format file:", list(EXPORT_FORMATS),
+                format_func=lambda fmt: EXPORT_FORMATS[fmt]['label'], horizontal=True
+            )
+            # File hanya dibuat saat diminta, lalu disimpan untuk kombinasi hasil + filter + format ini
+            export_key = (
+                frame_fingerprint(st.session_state.rop_analysis_result),
+                tuple(selected_kategori), tuple(selected_brand), tuple(selected_products), export_fmt,
             )
+            if st.button("⚙️ Siapkan File Unduhan"):
+                with st.spinner("Menyiapkan file unduhan..."):
+                    with run_profiler.stage(f'export_{export_fmt}', rows=n_filtered):
+                        with tempfile.TemporaryFile() as tmp:
+                            export_rop_result(result_index.subset(selections), export_fmt, tmp)
+                            tmp.seek(0)
+                            st.session_state.export_payload = {'key': export_key, 'data': tmp.read()}
+            export_payload = st.session_state.export_payload
+            if export_payload is not None and export_payload['key'] == export_key:
+                st.download_button(
+                    label=f"📥 Unduh Semua Hasil ROP & SO ({EXPORT_FORMATS[export_fmt]['label']})",
+                    data=export_payload['data'],
+                    file_name=f"hasil_rop_so_{start_date}_to_{end_date}.{EXPORT_FORMATS[export_fmt]['ext']}",
+                    mime=EXPORT_FORMATS[export_fmt]['mime']
+                )
 # =====================================================================================
 #                          HALAMAN ANALISIS ERROR METODE ROP
 # =====================================================================================
 elif page == "Analisis Error Metode ROP":
     st.title("🎯 Analisis Error Metode ROP")
     st.markdown("Halaman ini membandingkan 3 metode ROP dengan penjualan riil untuk melihat kecenderungan **Overstock** vs **Stockout**.")
-    if st.session_state.df_penjualan.empty or st.session_state.produk_ref.empty:
-        st.warning("⚠️ Harap muat file **Penjualan** dan **Produk Referensi** di halaman **'Input Data'**.")
-        st.stop()
-    penjualan = st.session_state.df_penjualan.copy()
-    produk_ref = st.session_state.produk_ref.copy()
-    for df in [penjualan, produk_ref]:
-        if 'No. Barang' in df.columns:
-            df['No. Barang'] = df['No. Barang'].astype(str).str.strip()
-    if 'Qty' in penjualan.columns:
-        penjualan.rename(columns={'Qty': 'Kuantitas'}, inplace=True)
-    penjualan['Nama Dept'] = penjualan.apply(map_nama_dept, axis=1)
-    penjualan['City'] = penjualan['Nama Dept'].apply(map_city)
-    penjualan = penjualan[penjualan['City'] != 'Others']
-    penjualan['Tgl Faktur'] = pd.to_datetime(penjualan['Tgl Faktur'], errors='coerce')
-    penjualan.dropna(subset=['Tgl Faktur', 'City'], inplace=True)
+    abc_mode = select_abc_mode()
+    penjualan, produk_ref = get_analysis_inputs()
     st.markdown("---")
     st.header("Pilih Rentang Tanggal untuk Analisis Error")
     st.info("Pilih rentang tanggal evaluasi. Pastikan data penjualan Anda mencakup 21 hari setelah tanggal akhir untuk perbandingan akurat.")
@@ -454,44 +616,53 @@ elif page == "Analisis Error Metode ROP":
         else:
             with st.spinner("Menjalankan analisis... Ini mungkin butuh beberapa saat."):
                 progress_bar = st.progress(0, text="Memulai pra-pemrosesan data...")
-                preprocessed_df = preprocess_sales_data(penjualan, produk_ref, start_date, end_date)
-                progress_bar.progress(40, text="Menerapkan metode ROP...")
-                rop_abc = apply_rop_method(preprocessed_df, "ABC Bertingkat")
-                rop_uniform = apply_rop_method(preprocessed_df, "Uniform")
-                rop_min = apply_rop_method(preprocessed_df, "ROP = Min Stock")
-                progress_bar.progress(70, text="Menggabungkan hasil dan menghitung error...")
-                analysis_df = preprocessed_df.copy()
-                analysis_df['ROP_ABC'] = rop_abc['ROP']
-                analysis_df['ROP_Uniform'] = rop_uniform['ROP']
-                analysis_df['ROP_Min_Stock'] = rop_min['ROP']
-                analysis_df.dropna(subset=['Penjualan_Aktual_21_Hari'], inplace=True)
-                analysis_df['Error_ABC'] = analysis_df['ROP_ABC'] - analysis_df['Penjualan_Aktual_21_Hari']
-                analysis_df['Error_Uniform'] = analysis_df['ROP_Uniform'] - analysis_df['Penjualan_Aktual_21_Hari']
-                analysis_df['Error_Min_Stock'] = analysis_df['ROP_Min_Stock'] - analysis_df['Penjualan_Aktual_21_Hari']
-                
-                # Simpan hasil untuk digunakan nanti
-                st.session_state.error_analysis_result = analysis_df
-                
+                with run_profiler.stage('preprocess_total') as info:
+                    preprocessed_df = preprocess_sales_data(penjualan, produk_ref, start_date, end_date, profiler=run_profiler,
+                                                            abc_mode=abc_mode, item_params=st.session_state.item_params)
+                    info['rows'] = len(preprocessed_df)
+                progress_bar.progress(40, text="Menghitung ROP semua metode dalam satu lintasan...")
+                with run_profiler.stage('rop_semua_metode', rows=len(preprocessed_df)):
+                    actual = preprocessed_df['Penjualan_Aktual_21_Hari'].to_numpy(dtype=float)
+                    valid = ~np.isnan(actual)
+                    actual = actual[valid]
+                    ads = preprocessed_df['ADS'].to_numpy(dtype=float)[valid]
+                    std = preprocessed_df['std_dev_90d'].to_numpy(dtype=float)[valid]
+                    codes = abc_codes(preprocessed_df['Kategori ABC'])[valid]
+                    # Lead time & periode per baris bila tabel parameter dimuat, selain itu skalar bawaan
+                    lead_time, period = (v[valid] if np.ndim(v) else v for v in row_lead_times(preprocessed_df))
+                    errors = {
+                        short_name.replace('_', ' '): compute_rop(ads, std, codes, ROP_METHODS[method], lead_time, period) - actual
+                        for short_name, method in ERROR_METHODS.items()
+                    }
+
+                # Detail error diringkas sekali ke kubus; drill-down di bawah hanya membaca kubus ini
+                with run_profiler.stage('kubus_error', rows=len(actual)):
+                    st.session_state.error_cube = ErrorCube(preprocessed_df.loc[valid], errors)
+                del errors
+
+                progress_bar.progress(70, text="Mengevaluasi grid z-score per kelas ABC...")
+                with run_profiler.stage('grid_z_score', rows=len(actual)):
+                    z_grid_stats = evaluate_z_grid(ads, std, actual, codes, lead_time=lead_time, period=period)
+                st.session_state.z_grid_stats = z_grid_stats
+
                 # Kalkulasi ringkasan keseluruhan
-                summary_list = []
-                for method in ['ABC', 'Uniform', 'Min_Stock']:
-                    error_col = f'Error_{method}'
-                    mae = analysis_df[error_col].abs().mean()
-                    bias = analysis_df[error_col].mean()
-                    stockout_days = (analysis_df[error_col] < 0).sum()
-                    summary_list.append({
-                        'Metode': method.replace('_', ' '),
-                        'MAE': mae,
-                        'Rata-rata Error (Bias)': bias,
-                        'Jumlah Hari Stockout': stockout_days
-                    })
-                summary_df = pd.DataFrame(summary_list).set_index('Metode')
+                summary_df = score_methods(
+                    z_grid_stats,
+                    {short_name.replace('_', ' '): ROP_METHODS[method] for short_name, method in ERROR_METHODS.items()},
+                )[['MAE', 'Rata-rata Error (Bias)', 'Jumlah Hari Stockout']].rename_axis('Metode')
                 st.session_state.summary_error_result = summary_df
+
+                progress_bar.progress(85, text="Mensimulasikan persediaan harian...")
+                with run_profiler.stage('simulasi_persediaan', rows=len(preprocessed_df)):
+                    simulation_methods = {short_name.replace('_', ' '): ROP_METHODS[method] for short_name, method in ERROR_METHODS.items()}
+                    item_df, sim = run_simulation(preprocessed_df, simulation_methods)
+                st.session_state.simulation_result = {'items': item_df, 'sim': sim, 'methods': simulation_methods}
                 progress_bar.progress(100, text="Analisis Selesai!")
                 
+    show_preprocess_cache_report()
     if 'summary_error_result' in st.session_state and st.session_state.summary_error_result is not None:
         summary_df = st.session_state.summary_error_result
-        result_df = st.session_state.error_analysis_result # Ambil kembali data detail
+        error_cube = st.session_state.error_cube
         
         st.markdown("---")
         st.header("🏆 Hasil Perbandingan Metode (Keseluruhan)")
@@ -505,39 +676,62 @@ elif page == "Analisis Error Metode ROP":
             .apply(lambda x: ['background-color: lightcoral' if v < 0 else 'background-color: lightblue' for v in x], subset=['Rata-rata Error (Bias)'])
             .format("{:.2f}", subset=['MAE', 'Rata-rata Error (Bias)'])
         )
+
+        # --- Simulasi persediaan: hasil stok riil setiap metode ---
+        simulation = st.session_state.simulation_result
+        if simulation is not None:
+            st.markdown("---")
+            st.header("📦 Simulasi Persediaan Harian")
+            st.markdown(f"""
+            Penjualan harian riil diputar ulang terhadap ROP setiap metode: saat stok + pesanan dalam perjalanan turun ke ROP,
+            barang dipesan sampai ROP + kebutuhan {DEFAULT_ORDER_DAYS} hari dan tiba setelah {LEAD_TIME_DAYS} hari (atau lead time per item bila parameter dimuat). Permintaan yang tidak terlayani dianggap hilang.
+            - **Fill Rate**: Persentase permintaan yang terpenuhi dari stok. *Semakin besar semakin baik*.
+            - **Hari Stockout**: Jumlah hari-item ketika permintaan tidak terpenuhi penuh.
+            - **Rata-rata Persediaan**: Rata-rata stok akhir hari per item. *Biaya penyimpanan*.
+            """)
+            simulation_group = st.radio("Kelompokkan per", list(SIMULATION_GROUPS), horizontal=True, key="simulation_group")
+            simulation_df = summarize_simulation(simulation['items'], simulation['sim'], simulation['methods'],
+                                                 by=SIMULATION_GROUPS[simulation_group])
+            st.dataframe(simulation_df.style.format({
+                'Permintaan': "{:,.0f}", 'Terpenuhi': "{:,.0f}", 'Fill Rate (%)': "{:.2f}%",
+                'Tingkat Hari Stockout (%)': "{:.2f}%", 'Rata-rata Persediaan': "{:,.2f}",
+            }), width='stretch')
         
-        # --- BAGIAN BARU: Analisis per Kota ---
-        st.markdown("---")
-        st.header("🏙️ Hasil Perbandingan per Kota")
-        
-        unique_cities = sorted(result_df['City'].unique())
-        for city in unique_cities:
-            with st.expander(f"Lihat Hasil untuk Kota: {city}"):
-                city_df = result_df[result_df['City'] == city]
-                
-                summary_list_city = []
-                if not city_df.empty:
-                    for method in ['ABC', 'Uniform', 'Min_Stock']:
-                        error_col = f'Error_{method}'
-                        mae = city_df[error_col].abs().mean()
-                        bias = city_df[error_col].mean()
-                        stockout_days = (city_df[error_col] < 0).sum()
-                        summary_list_city.append({
-                            'Metode': method.replace('_', ' '),
-                            'MAE': mae,
-                            'Rata-rata Error (Bias)': bias,
-                            'Jumlah Hari Stockout': stockout_days
-                        })
-                    
-                    summary_df_city = pd.DataFrame(summary_list_city).set_index('Metode')
-                    
-                    st.dataframe(summary_df_city.style
-                        .highlight_min(subset=['MAE', 'Jumlah Hari Stockout'], color='lightgreen')
-                        .apply(lambda x: ['background-color: lightcoral' if v < 0 else 'background-color: lightblue' for v in x], subset=['Rata-rata Error (Bias)'])
-                        .format("{:.2f}", subset=['MAE', 'Rata-rata Error (Bias)'])
-                    )
-                else:
-                    st.write("Tidak ada data untuk kota ini.")
+        # --- Pencarian tabel z-score berdasarkan target stockout ---
+        if st.session_state.z_grid_stats is not None:
+            st.markdown("---")
+            st.header("🎚️ Cari Tabel Z-Score untuk Target Stockout")
+            st.markdown("Mencari kombinasi z-score per kelas ABC dengan **MAE terendah** yang tingkat stockout-nya tidak melebihi target.")
+            target_stockout = st.slider("Target Tingkat Stockout Maksimal (%)", min_value=0.0, max_value=50.0, value=10.0, step=0.5)
+            best_z = search_z_table(st.session_state.z_grid_stats, target_stockout)
+            if not best_z['target_tercapai']:
+                st.warning("Target tidak tercapai dengan grid z-score yang tersedia; ditampilkan tabel dengan stockout terendah.")
+            col_z1, col_z2 = st.columns(2)
+            col_z1.dataframe(pd.DataFrame({'Kelas ABC': ABC_CLASSES, 'Z-Score': [best_z['z_scores'][c] for c in ABC_CLASSES]}).set_index('Kelas ABC'))
+            col_z2.metric("MAE", f"{best_z['MAE']:.2f}")
+            col_z2.metric("Rata-rata Error (Bias)", f"{best_z['Rata-rata Error (Bias)']:.2f}")
+            col_z2.metric("Tingkat Stockout", f"{best_z['Tingkat Stockout (%)']:.2f}% ({int(best_z['Jumlah Hari Stockout'])} kejadian)")
+
+        # --- Drill-down error per dimensi: potongan dari kubus metrik ---
+        if error_cube is not None:
+            st.markdown("---")
+            st.header("🏙️ Hasil Perbandingan per Kota, Kelas ABC, Brand & Kategori")
+            cube_by = st.multiselect("Kelompokkan per", error_cube.dimensions, default=['City'], key="cube_by")
+            cube_filter_cols = st.columns(len(error_cube.dimensions))
+            cube_filters = {
+                dim: col.multiselect(f"Filter {dim}", error_cube.options[dim], key=f"cube_filter_{dim}")
+                for col, dim in zip(cube_filter_cols, error_cube.dimensions)
+            }
+            cube_df = error_cube.rollup(by=[dim for dim in error_cube.dimensions if dim in cube_by], filters=cube_filters)
+            if cube_df.empty:
+                st.write("Tidak ada data untuk pilihan ini.")
+            else:
+                st.caption(f"{len(cube_df) // max(len(error_cube.methods), 1):,} kelompok dari {len(error_cube.cells) // max(len(error_cube.methods), 1):,} sel kubus.")
+                st.dataframe(cube_df.style
+                    .apply(lambda x: ['background-color: lightcoral' if v < 0 else 'background-color: lightblue' for v in x], subset=['Rata-rata Error (Bias)'])
+                    .format({'MAE': "{:.2f}", 'Rata-rata Error (Bias)': "{:.2f}", 'Tingkat Stockout (%)': "{:.2f}%",
+                             'Jumlah Hari Stockout': "{:,}", 'Jumlah Baris': "{:,}"}),
+                    width='stretch')
 
         # --- BAGIAN BARU: Kesimpulan Otomatis ---
         st.markdown("---")
@@ -581,3 +775,56 @@ elif page == "Analisis Error Metode ROP":
 
         st.markdown(kesimpulan_text)
 
+    # --- BACKTEST WALK-FORWARD: banyak jendela evaluasi sekaligus ---
+    st.markdown("---")
+    st.header("🔁 Backtest Walk-Forward")
+    st.markdown("Menilai ketiga metode pada banyak jendela evaluasi yang bergeser, sehingga terlihat sebaran MAE, bias, dan tingkat stockout, bukan hanya satu rentang tanggal.")
+    backtest_last_end = penjualan['Tgl Faktur'].max().date() - timedelta(days=21)
+    backtest_first_start = max(backtest_last_end - timedelta(days=364),
+                               penjualan['Tgl Faktur'].min().date() + timedelta(days=90))
+    col_bt1, col_bt2 = st.columns(2)
+    bt_start = col_bt1.date_input("Awal Jendela Pertama", value=backtest_first_start, key="bt_start")
+    bt_end = col_bt2.date_input("Akhir Jendela Terakhir", value=backtest_last_end, key="bt_end")
+    col_bt3, col_bt4, col_bt5 = st.columns(3)
+    bt_window_days = col_bt3.number_input("Panjang Jendela (hari)", min_value=1, max_value=365, value=30, step=1, key="bt_window")
+    bt_step_days = col_bt4.number_input("Geser per Jendela (hari)", min_value=1, max_value=365, value=7, step=1, key="bt_step")
+    bt_workers = col_bt5.number_input("Jumlah Proses", min_value=1, max_value=os.cpu_count() or 1,
+                                      value=min(4, os.cpu_count() or 1), step=1, key="bt_workers")
+    windows = backtest_windows(bt_start, bt_end, int(bt_window_days), int(bt_step_days))
+    st.caption(f"{len(windows)} jendela evaluasi.")
+
+    if st.button("🔁 Jalankan Backtest"):
+        if not windows:
+            st.error("Tidak ada jendela: pastikan rentang lebih panjang dari panjang jendela.")
+        else:
+            with st.spinner(f"Menjalankan backtest {len(windows)} jendela..."):
+                backtest_df = run_backtest(penjualan, windows, max_workers=int(bt_workers), profiler=run_profiler, abc_mode=abc_mode)
+            st.session_state.backtest_result = backtest_df if not backtest_df.empty else None
+            if backtest_df.empty:
+                st.warning("Tidak ada data penjualan pada rentang backtest.")
+
+    if st.session_state.backtest_result is not None:
+        backtest_df = st.session_state.backtest_result
+        st.subheader("Sebaran Metrik per Metode")
+        st.dataframe(summarize_backtest(backtest_df).style.format("{:,.2f}"), width='stretch')
+        st.subheader("MAE per Jendela")
+        st.line_chart(backtest_df.pivot(index='Awal', columns='Metode', values='MAE'))
+        with st.expander("Lihat detail per jendela"):
+            st.dataframe(backtest_df.style.format({
+                'Awal': "{:%Y-%m-%d}", 'Akhir': "{:%Y-%m-%d}", 'MAE': "{:,.2f}",
+                'Rata-rata Error (Bias)': "{:,.2f}", 'Tingkat Stockout (%)': "{:.2f}%",
+            }), width='stretch')
+
+show_session_memory_report()
+
+# =====================================================================================
+#                                  PROFIL KINERJA RUN
+# =====================================================================================
+if run_profiler.stages:
+    run_profiler.append_jsonl()
+    st.session_state.last_profile = run_profiler.to_record()
+if st.sidebar.checkbox("Tampilkan profil kinerja", value=False) and st.session_state.last_profile:
+    last_profile = st.session_state.last_profile
+    st.sidebar.markdown(f"**Profil run terakhir** ({last_profile['run']}, {last_profile['started_at']})")
+    st.sidebar.dataframe(profile_frame(last_profile))
+    st.sidebar.caption(f"Total {last_profile['total_seconds']:.2f} detik · RSS {last_profile['rss_mb']} MB")
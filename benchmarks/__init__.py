@@ -0,0 +1 @@
+"""Benchmark pipeline ROP dengan data sintetis."""
@@ -0,0 +1,196 @@
+"""
+Benchmark tahap-tahap pipeline ROP dengan data sintetis.
+
+Contoh:
+    python -m benchmarks.bench_rop --skus 2000 --days 365 --save-baseline
+    python -m benchmarks.bench_rop --skus 2000 --days 365      # bandingkan dengan baseline
+"""
+import argparse
+import json
+import os
+import sys
+import time
+import tracemalloc
+from io import BytesIO
+
+import pandas as pd
+
+from rop_engine.export import write_pivots_xlsx
+from rop_engine.normalize import normalize_sales, normalize_produk
+from rop_engine.pivots import city_pivot, pivot_sheet_name
+from rop_engine.rolling import compute_rolling_frame
+from rop_engine.rop import apply_rop_method
+
+from .synthetic import generate_sales, generate_produk
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(__file__), 'baseline.json')
+
+
+def _pivot_all(result_df):
+    return {pivot_sheet_name(city): city_pivot(city_df) for city, city_df in result_df.groupby('City', sort=True)}
+
+
+def _excel_export(pivots):
+    output = BytesIO()
+    write_pivots_xlsx(pivots.items(), output)
+    return output.getvalue()
+
+
+def pipeline_stages(start_date, end_date, method):
+    """Daftar (nama tahap, fungsi(state) -> state baru, fungsi jumlah baris)."""
+    return [
+        ('normalize', lambda s: {**s, 'penjualan': normalize_sales(s['raw']), 'produk': normalize_produk(s['produk_raw'])},
+         lambda s: len(s['penjualan'])),
+        ('preprocess', lambda s: {**s, 'pre': compute_rolling_frame(s['penjualan'], s['produk'], start_date, end_date)},
+         lambda s: len(s['pre'])),
+        # Mode ABC bawaan aplikasi & CLI (kelas per tanggal)
+        ('preprocess_harian', lambda s: {**s, 'pre_harian': compute_rolling_frame(s['penjualan'], s['produk'], start_date, end_date,
+                                                                                  abc_mode='harian')},
+         lambda s: len(s['pre_harian'])),
+        ('apply_rop', lambda s: {**s, 'result': apply_rop_method(s['pre'], method)},
+         lambda s: len(s['result'])),
+        ('pivot', lambda s: {**s, 'pivots': _pivot_all(s['result'])},
+         lambda s: sum(len(p) for p in s['pivots'].values())),
+        ('excel_export', lambda s: {**s, 'xlsx': _excel_export(s['pivots'])},
+         lambda s: len(s['xlsx'])),
+    ]
+
+
+def result_checksums(state, method):
+    result = state['result']
+    return {
+        'rows': int(len(result)),
+        'sum_ROP': int(result['ROP'].sum()),
+        'sum_SO': int(result['SO'].sum()),
+        'sum_sales_90d': round(float(result['sales_90d'].sum()), 6),
+        'abc_counts': {str(k): int(v) for k, v in result['Kategori ABC'].value_counts().sort_index().items()},
+        'pivot_cells': int(sum(p.size for p in state['pivots'].values())),
+        'sum_ROP_harian': int(apply_rop_method(state['pre_harian'], method)['ROP'].sum()),
+        'abc_counts_harian': {str(k): int(v) for k, v in state['pre_harian']['Kategori ABC'].value_counts().sort_index().items()},
+    }
+
+
+def run_benchmark(n_skus, n_cities, n_days, sparsity, seed, window_days, method, repeat=3):
+    """
+    Menjalankan setiap tahap `repeat` kali tanpa tracemalloc (waktu terbaik
+    dicatat), lalu sekali lagi dengan tracemalloc untuk puncak memori per tahap.
+    """
+    raw = generate_sales(n_skus, n_cities, n_days, sparsity, seed)
+    produk_raw = generate_produk(n_skus, seed)
+    end_date = (raw['Tgl Faktur'].max() - pd.Timedelta(days=21)).date()
+    start_date = end_date - pd.Timedelta(days=window_days - 1)
+    stages = pipeline_stages(start_date, end_date, method)
+
+    timings = {name: [] for name, _, _ in stages}
+    state = None
+    for _ in range(max(1, repeat)):
+        state = {'raw': raw, 'produk_raw': produk_raw}
+        for name, fn, _ in stages:
+            t0 = time.perf_counter()
+            state = fn(state)
+            timings[name].append(time.perf_counter() - t0)
+
+    report = {}
+    traced = {'raw': raw, 'produk_raw': produk_raw}
+    tracemalloc.start()
+    try:
+        for name, fn, count_rows in stages:
+            tracemalloc.reset_peak()
+            before, _ = tracemalloc.get_traced_memory()
+            traced = fn(traced)
+            _, peak = tracemalloc.get_traced_memory()
+            report[name] = {
+                'seconds': min(timings[name]),
+                'peak_mb': round((peak - before) / 1024 ** 2, 2),
+                'rows': int(count_rows(traced)),
+            }
+    finally:
+        tracemalloc.stop()
+
+    return {
+        'params': {
+            'skus': n_skus, 'cities': n_cities, 'days': n_days, 'sparsity': sparsity,
+            'seed': seed, 'window_days': window_days, 'method': method,
+            'sales_lines': int(len(raw)),
+        },
+        'stages': report,
+        'checksums': result_checksums(state, method),
+    }
+
+
+def compare_with_baseline(current, baseline, tolerance=0.25, min_seconds=0.05, min_mb=1.0):
+    """
+    Mengembalikan (baris laporan, ada_regresi). Tahap dianggap regresi bila lebih
+    lambat atau lebih boros memori dari baseline melebihi `tolerance` (dan selisih
+    absolutnya melebihi `min_seconds` / `min_mb`, agar tahap yang sangat cepat tidak
+    ditandai karena noise); hasil perhitungan (checksum) harus sama persis.
+    """
+    lines = []
+    regression = False
+    if current['params'] != baseline['params']:
+        lines.append("PERINGATAN: parameter berbeda dari baseline; perbandingan tidak sebanding.")
+    lines.append(f"{'Tahap':<18}{'Detik':>10}{'Baseline':>10}{'Rasio':>8}{'Peak MB':>10}{'Baseline':>10}  Status")
+    for name, cur in current['stages'].items():
+        base = baseline['stages'].get(name)
+        if base is None:
+            lines.append(f"{name:<18}{cur['seconds']:>10.3f}{'-':>10}{'-':>8}{cur['peak_mb']:>10.1f}{'-':>10}  BARU")
+            continue
+        ratio = cur['seconds'] / base['seconds'] if base['seconds'] else float('inf')
+        mem_ratio = cur['peak_mb'] / base['peak_mb'] if base['peak_mb'] else 1.0
+        status = 'OK'
+        slower = ratio > 1 + tolerance and cur['seconds'] - base['seconds'] > min_seconds
+        bigger = mem_ratio > 1 + tolerance and cur['peak_mb'] - base['peak_mb'] > min_mb
+        if slower or bigger:
+            status, regression = 'REGRESI', True
+        elif ratio < 1 - tolerance:
+            status = 'LEBIH CEPAT'
+        lines.append(f"{name:<18}{cur['seconds']:>10.3f}{base['seconds']:>10.3f}{ratio:>8.2f}"
+                     f"{cur['peak_mb']:>10.1f}{base['peak_mb']:>10.1f}  {status}")
+    if current['checksums'] != baseline['checksums']:
+        regression = True
+        lines.append(f"HASIL BERBEDA dari baseline:\n  sekarang: {current['checksums']}\n  baseline: {baseline['checksums']}")
+    else:
+        lines.append("Hasil perhitungan identik dengan baseline.")
+    return lines, regression
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark pipeline ROP dengan data sintetis.")
+    parser.add_argument('--skus', type=int, default=500)
+    parser.add_argument('--cities', type=int, default=6)
+    parser.add_argument('--days', type=int, default=365)
+    parser.add_argument('--sparsity', type=float, default=0.9)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--window-days', type=int, default=30, help="Panjang rentang analisis ROP")
+    parser.add_argument('--method', default="ABC Bertingkat")
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE)
+    parser.add_argument('--save-baseline', action='store_true', help="Simpan hasil sebagai baseline baru")
+    parser.add_argument('--tolerance', type=float, default=0.25)
+    parser.add_argument('--json-out', help="Tulis hasil lengkap ke file JSON")
+    args = parser.parse_args(argv)
+
+    current = run_benchmark(args.skus, args.cities, args.days, args.sparsity, args.seed,
+                            args.window_days, args.method, args.repeat)
+    print(json.dumps(current, indent=2))
+    if args.json_out:
+        with open(args.json_out, 'w') as f:
+            json.dump(current, f, indent=2)
+
+    if args.save_baseline:
+        with open(args.baseline, 'w') as f:
+            json.dump(current, f, indent=2)
+        print(f"Baseline disimpan ke {args.baseline}")
+        return 0
+    if not os.path.exists(args.baseline):
+        print("Belum ada baseline; jalankan dengan --save-baseline untuk membuatnya.")
+        return 0
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    lines, regression = compare_with_baseline(current, baseline, args.tolerance)
+    print("\n".join(lines))
+    return 1 if regression else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,52 @@
+import numpy as np
+import pandas as pd
+
+# Kode Dept. per kota (lihat rop_engine.normalize.DEPT_MAPPING)
+CITY_DEPTS = ['C', 'B', 'D', 'E', 'F', 'H']
+CUSTOMERS = ['TOKOPEDIA', 'A - CASH', 'PELANGGAN UMUM', 'CV MAJU JAYA', 'PT SINAR']
+BRANDS = ['ALPHA', 'BETA', 'GAMMA', 'DELTA', 'OMEGA']
+KATEGORI = ['Kabel', 'Lampu', 'Saklar', 'Stop Kontak', 'Fitting']
+
+
+def generate_sales(n_skus=500, n_cities=6, n_days=365, sparsity=0.9, seed=0, start='2024-01-01'):
+    """
+    Data penjualan sintetis dengan skema ekspor asli
+    (Tgl Faktur, Dept., Nama Pelanggan, No. Barang, Kuantitas).
+
+    `sparsity` adalah peluang sebuah (SKU, kota, hari) tidak punya penjualan.
+    Permintaan per SKU mengikuti sebaran miring (sebagian kecil SKU laku keras)
+    sehingga klasifikasi ABC realistis.
+    """
+    if not 1 <= n_cities <= len(CITY_DEPTS):
+        raise ValueError(f"n_cities harus 1..{len(CITY_DEPTS)}")
+    rng = np.random.default_rng(seed)
+    dates = pd.date_range(start, periods=n_days, freq='D')
+    n_series = n_skus * n_cities
+    n_lines = int(n_series * n_days * (1 - sparsity))
+
+    popularity = rng.pareto(1.5, n_skus) + 0.1
+    sku = rng.choice(n_skus, size=n_lines, p=popularity / popularity.sum())
+    city = rng.integers(0, n_cities, size=n_lines)
+    day = rng.integers(0, n_days, size=n_lines)
+    qty = rng.poisson(1 + 4 * popularity[sku] / popularity.max()) + 1
+
+    return pd.DataFrame({
+        'Tgl Faktur': dates[day],
+        'Dept.': np.array(CITY_DEPTS)[city],
+        'Nama Pelanggan': np.array(CUSTOMERS)[rng.integers(0, len(CUSTOMERS), size=n_lines)],
+        'No. Barang': pd.Index([f"BRG{i:06d}" for i in range(n_skus)])[sku],
+        'Kuantitas': qty,
+    })
+
+
+def generate_produk(n_skus=500, seed=0, coverage=0.95):
+    """Produk referensi yang cocok dengan generate_sales; sebagian SKU sengaja tidak ada."""
+    rng = np.random.default_rng(seed + 1)
+    keep = rng.random(n_skus) < coverage
+    ids = np.arange(n_skus)[keep]
+    return pd.DataFrame({
+        'No. Barang': [f"BRG{i:06d}" for i in ids],
+        'BRAND Barang': np.array(BRANDS)[rng.integers(0, len(BRANDS), size=len(ids))],
+        'Kategori Barang': np.array(KATEGORI)[rng.integers(0, len(KATEGORI), size=len(ids))],
+        'Nama Barang': [f"Produk {i}" for i in ids],
+    })
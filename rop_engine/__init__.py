@@ -0,0 +1,6 @@
+"""Mesin perhitungan ROP yang tidak bergantung pada Streamlit."""
+from .rolling import build_sales_matrix, rolling_stats, classify_abc, compute_rolling_frame
+from .rop import ROP_METHODS, apply_rop_method
+from .normalize import normalize_sales, normalize_produk
+from .pivots import city_pivot
+from .batch import run_rop_analysis, run_batch
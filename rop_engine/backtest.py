@@ -0,0 +1,161 @@
+"""
+Backtest walk-forward: metode ROP dinilai pada banyak jendela evaluasi.
+
+Statistik rolling dihitung sekali untuk seluruh rentang (satu matriks item x hari).
+Setiap jendela hanya butuh klasifikasi ABC-nya sendiri (rata-rata ADS rentang
+jendela tersebut, dihitung dari prefix sum) lalu evaluasi error. Pada mode ABC
+'harian'/'mingguan' kelas per tanggal tidak bergantung pada jendela, jadi dihitung sekali. Jendela dibagi
+ke beberapa proses; array besar ditulis sekali ke file .npy dan dibuka worker
+dengan memory-map, jadi tidak ada frame besar yang di-pickle ke setiap proses.
+"""
+import os
+import shutil
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from .profiling import profile_stage
+from .rolling import (
+    ABC_EVERY, LOOKAHEAD_DAYS, ROLLING_WINDOW_DAYS, build_sales_matrix, classify_abc, classify_abc_by_date, prefix_cumsum, prefix_sums,
+    range_avg_ads, window_std,
+)
+from .rop import ROP_METHODS, abc_codes, evaluate_z_grid, score_methods, z_table_array
+
+BACKTEST_ARRAYS = ['prefix', 'prefix_cum', 'ads', 'std', 'actual', 'abc']
+METRIC_COLUMNS = ['MAE', 'Rata-rata Error (Bias)', 'Tingkat Stockout (%)']
+
+
+def backtest_windows(first_start, last_end, window_days, step_days):
+    """Daftar (tanggal awal, tanggal akhir) jendela sepanjang `window_days` yang bergeser `step_days`."""
+    first_start, last_end = pd.Timestamp(first_start).normalize(), pd.Timestamp(last_end).normalize()
+    windows = []
+    start = first_start
+    while start + pd.Timedelta(days=window_days - 1) <= last_end:
+        windows.append((start, start + pd.Timedelta(days=window_days - 1)))
+        start += pd.Timedelta(days=step_days)
+    return windows
+
+
+def precompute_backtest_arrays(penjualan_df, windows, abc_mode='rentang'):
+    """
+    Array bersama untuk semua jendela, dengan hari ke-0 = awal jendela pertama
+    dikurangi 90 hari:
+
+    - prefix, prefix_cum: prefix sum penjualan harian (item x hari+1) dan
+      kumulatifnya (bahan rata-rata ADS per jendela, lihat range_avg_ads)
+    - ads, std, actual: ADS, std 90 hari, dan penjualan aktual 21 hari ke depan
+      untuk setiap hari keluaran (awal jendela pertama s/d akhir jendela terakhir)
+    - abc (mode 'harian'/'mingguan' saja): kode ABC per item x hari keluaran
+
+    Mengembalikan (items, arrays, tanggal hari ke-0, posisi hari keluaran pertama).
+    """
+    window = ROLLING_WINDOW_DAYS
+    first_start = min(start for start, _ in windows)
+    last_end = max(end for _, end in windows)
+    day0 = first_start - pd.Timedelta(days=window)
+    date_range = pd.date_range(start=day0, end=last_end + pd.Timedelta(days=LOOKAHEAD_DAYS), freq='D')
+
+    items, matrix = build_sales_matrix(penjualan_df, date_range)
+    prefix, prefix_sq = prefix_sums(matrix)
+    n_days = matrix.shape[1]
+
+    hi_all = np.arange(1, n_days + 1)
+    lo_all = np.maximum(hi_all - window, 0)
+    out_cols = np.arange(window, window + (last_end - first_start).days + 1)
+    hi, lo = hi_all[out_cols], lo_all[out_cols]
+    sales = prefix[:, hi] - prefix[:, lo]
+    arrays = {
+        'prefix': prefix,
+        'prefix_cum': prefix_cumsum(prefix),
+        'ads': sales / window,
+        'std': window_std(sales, prefix_sq[:, hi] - prefix_sq[:, lo], hi - lo),
+        'actual': prefix[:, out_cols + LOOKAHEAD_DAYS] - prefix[:, out_cols],
+    }
+    if abc_mode in ABC_EVERY and len(items):
+        arrays['abc'] = abc_codes(classify_abc_by_date(items, matrix, out_cols, every=ABC_EVERY[abc_mode])).reshape(len(items), len(out_cols))
+    del matrix
+    return items, arrays, day0, window
+
+
+def score_window(items, arrays, day0, out_offset, start, end, methods=ROP_METHODS):
+    """Skor ketiga metode untuk satu jendela evaluasi [start, end]."""
+    start_pos, end_pos = (start - day0).days, (end - day0).days
+    cols = slice(start_pos - out_offset, end_pos - out_offset + 1)
+    n_days = cols.stop - cols.start
+    if 'abc' in arrays:
+        codes = np.asarray(arrays['abc'][:, cols]).ravel()
+    else:
+        avg_ads = range_avg_ads(arrays['prefix'], arrays['prefix_cum'], start_pos - ROLLING_WINDOW_DAYS,
+                                end_pos + LOOKAHEAD_DAYS)
+        codes = np.repeat(abc_codes(classify_abc(items, avg_ads)), n_days)
+    z_values = np.unique(np.concatenate([z_table_array(z) for z in methods.values()]))
+    stats = evaluate_z_grid(
+        np.asarray(arrays['ads'][:, cols]).ravel(), np.asarray(arrays['std'][:, cols]).ravel(),
+        np.asarray(arrays['actual'][:, cols]).ravel(), codes, z_values
+    )
+    scores = score_methods(stats, methods)
+    scores.insert(0, 'Akhir', end)
+    scores.insert(0, 'Awal', start)
+    return scores.rename_axis('Metode').reset_index()
+
+
+# --- Worker proses: array dibuka sekali per proses lewat memory-map ---
+_worker = {}
+
+
+def _init_worker(array_dir, items, day0, out_offset):
+    _worker['items'] = items
+    _worker['day0'] = day0
+    _worker['out_offset'] = out_offset
+    _worker['arrays'] = {name: np.load(os.path.join(array_dir, f"{name}.npy"), mmap_mode='r') for name in BACKTEST_ARRAYS
+                         if os.path.exists(os.path.join(array_dir, f"{name}.npy"))}
+
+
+def _score_window_worker(window):
+    return score_window(_worker['items'], _worker['arrays'], _worker['day0'], _worker['out_offset'], *window)
+
+
+def run_backtest(penjualan_df, windows, max_workers=None, profiler=None, abc_mode='rentang'):
+    """
+    Menilai metode ROP pada setiap jendela. Mengembalikan frame panjang: satu baris
+    per (jendela, metode) dengan kolom MAE, bias, jumlah & tingkat stockout.
+    `abc_mode` sama dengan compute_rolling_frame (lihat ABC_MODES).
+    """
+    if not windows:
+        return pd.DataFrame()
+    with profile_stage(profiler, 'backtest_statistik_rolling', rows=len(penjualan_df)):
+        items, arrays, day0, out_offset = precompute_backtest_arrays(penjualan_df, windows, abc_mode)
+    if items.empty:
+        return pd.DataFrame()
+    items = items[['City']]
+
+    with profile_stage(profiler, 'backtest_jendela', rows=len(windows)):
+        if max_workers == 1 or len(windows) == 1:
+            results = [score_window(items, arrays, day0, out_offset, *window) for window in windows]
+        else:
+            array_dir = tempfile.mkdtemp(prefix='rop_backtest_')
+            try:
+                for name in arrays:
+                    np.save(os.path.join(array_dir, f"{name}.npy"), arrays[name])
+                del arrays
+                with ProcessPoolExecutor(max_workers=max_workers, initializer=_init_worker,
+                                         initargs=(array_dir, items, day0, out_offset)) as pool:
+                    results = list(pool.map(_score_window_worker, windows))
+            finally:
+                shutil.rmtree(array_dir, ignore_errors=True)
+    return pd.concat(results, ignore_index=True)
+
+
+def summarize_backtest(results):
+    """
+    Sebaran metrik setiap metode di seluruh jendela (rata-rata, simpangan baku,
+    min, kuartil, maks) plus berapa kali metode itu memiliki MAE terendah.
+    """
+    summary = results.groupby('Metode', sort=False)[METRIC_COLUMNS].describe()
+    summary = summary.drop(columns='count', level=1)
+    best = results.loc[results.groupby(['Awal', 'Akhir'])['MAE'].idxmin(), 'Metode'].value_counts()
+    summary[('Jendela', 'MAE terendah')] = best.reindex(summary.index).fillna(0).astype(int)
+    summary[('Jendela', 'Jumlah')] = results.groupby('Metode', sort=False).size()
+    return summary
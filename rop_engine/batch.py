@@ -0,0 +1,235 @@
+"""
+Perhitungan ROP tanpa Streamlit untuk dijalankan terjadwal (mis. setiap malam).
+
+Contoh:
+    python -m rop_engine.batch --sales-dir data/penjualan --produk data/produk.xlsx \
+        --start 2024-05-01 --end 2024-05-31 --out hasil_rop
+
+Untuk data yang lebih besar dari RAM, tambahkan --chunk-rows (mis. 1000000) agar
+setiap kota diproses per potongan SKU dan hasil panjangnya ditulis ke disk.
+Dengan --store rop_results.sqlite, hasil juga disimpan sebagai satu run di
+database hasil (lihat rop_engine.store).
+"""
+import argparse
+import glob
+import itertools
+import logging
+import os
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from datetime import timedelta
+
+import pandas as pd
+
+from .export import write_pivot_chunks_xlsx, write_pivots_xlsx
+from .memo import frame_fingerprint
+from .item_params import ItemParamsError, read_item_params
+from .normalize import SalesSchemaError, normalize_sales, normalize_produk
+from .partitioned import iter_rop_chunks, spill_chunk
+from .pivots import city_pivot, pivot_sheet_name
+from .readers import SALES_EXTENSIONS, concat_sales_frames, read_sales_bytes, parse_produk_excel
+from .rolling import ABC_MODES, DEFAULT_ABC_MODE, compute_rolling_frame
+from .rop import ROP_METHODS, apply_rop_method
+from .store import ResultStore
+
+logger = logging.getLogger(__name__)
+
+
+def read_sales_folder(folder, max_workers=8):
+    """Membaca semua ekspor penjualan (CSV/Excel) di folder lokal lalu menggabungkannya."""
+    paths = sorted(p for p in glob.glob(os.path.join(folder, '*')) if p.lower().endswith(SALES_EXTENSIONS))
+    if not paths:
+        return pd.DataFrame()
+
+    def read(path):
+        try:
+            return read_sales_bytes(path, path)
+        except SalesSchemaError as e:
+            raise SalesSchemaError(f"{os.path.basename(path)}: {e}") from e
+
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        dfs = list(pool.map(read, paths))
+    return concat_sales_frames(dfs)
+
+
+def run_rop_analysis(penjualan_df, produk_df, start_date, end_date, method, abc_mode='rentang', item_params=None):
+    """Pra-pemrosesan + metode ROP untuk data penjualan yang sudah dinormalisasi."""
+    preprocessed_df = compute_rolling_frame(penjualan_df, produk_df, start_date, end_date, abc_mode=abc_mode,
+                                            item_params=item_params)
+    if preprocessed_df.empty:
+        return preprocessed_df
+    return apply_rop_method(preprocessed_df, method)
+
+
+def write_city_pivot(pivot, city, out_dir, fmt='xlsx'):
+    name = pivot_sheet_name(city)
+    if fmt == 'csv':
+        path = os.path.join(out_dir, f"{name}.csv")
+        pivot.to_csv(path)
+    else:
+        path = os.path.join(out_dir, f"{name}.xlsx")
+        write_pivots_xlsx([(name, pivot)], path)
+    return path
+
+
+def write_city_pivot_chunks(pivots, city, out_dir, fmt='xlsx'):
+    """Pivot kota yang ditulis bertahap per potongan SKU; hasilnya sama dengan write_city_pivot."""
+    name = pivot_sheet_name(city)
+    if fmt == 'csv':
+        path = os.path.join(out_dir, f"{name}.csv")
+        with open(path, 'w', encoding='utf-8', newline='') as f:
+            for i, pivot in enumerate(pivots):
+                pivot.to_csv(f, header=(i == 0))
+    else:
+        path = os.path.join(out_dir, f"{name}.xlsx")
+        write_pivot_chunks_xlsx(name, pivots, path)
+    return path
+
+
+def process_city_chunked(city, city_sales, produk_df, start_date, end_date, method, out_dir, fmt, chunk_rows, spill_dir=None,
+                         store_run=None, abc_mode='rentang', item_params=None):
+    """
+    Mode terpartisi untuk satu kota: hasil dihitung per potongan SKU (paling banyak
+    `chunk_rows` baris), setiap potongan ditulis ke `spill_dir` (parquet) bila
+    diberikan, ke database hasil bila `store_run` = (path, run_id) diberikan, dan
+    langsung ditambahkan ke file pivot, lalu dibuang dari memori.
+    """
+    chunks = iter_rop_chunks(city_sales, produk_df, start_date, end_date, method, chunk_rows, abc_mode=abc_mode,
+                             item_params=item_params)
+    first = next(chunks, None)
+    if first is None:
+        return city, 0, None
+    if spill_dir:
+        os.makedirs(spill_dir, exist_ok=True)
+    store = ResultStore(store_run[0]) if store_run else None
+    n_rows = 0
+
+    def pivots():
+        nonlocal n_rows
+        for part, (_, chunk) in enumerate(itertools.chain([first], chunks)):
+            n_rows += len(chunk)
+            if spill_dir:
+                spill_chunk(chunk, spill_dir, city, part)
+            if store is not None:
+                store.add_rows(store_run[1], chunk)
+            yield city_pivot(chunk)
+
+    path = write_city_pivot_chunks(pivots(), city, out_dir, fmt)
+    return city, n_rows, path
+
+
+def process_city(city, city_sales, produk_df, start_date, end_date, method, out_dir, fmt='xlsx',
+                 chunk_rows=None, spill_dir=None, store_run=None, abc_mode='rentang', item_params=None):
+    """
+    Satu partisi kota: ROP dihitung hanya dari penjualan kota tersebut. Hasilnya
+    identik dengan perhitungan semua kota sekaligus karena klasifikasi ABC dan
+    statistik rolling memang dihitung per kota. Dengan `chunk_rows`, kota diproses
+    per potongan SKU (lihat process_city_chunked). `store_run` = (path, run_id)
+    menambahkan baris hasil kota ini ke run di database hasil.
+    """
+    if chunk_rows:
+        return process_city_chunked(city, city_sales, produk_df, start_date, end_date, method, out_dir, fmt,
+                                    chunk_rows, spill_dir, store_run, abc_mode, item_params)
+    result_df = run_rop_analysis(city_sales, produk_df, start_date, end_date, method, abc_mode, item_params)
+    if result_df.empty:
+        return city, 0, None
+    if store_run:
+        ResultStore(store_run[0]).add_rows(store_run[1], result_df)
+    return city, len(result_df), write_city_pivot(city_pivot(result_df), city, out_dir, fmt)
+
+
+def run_batch(penjualan_df, produk_df, start_date, end_date, method, out_dir, fmt='xlsx', cities=None, max_workers=None,
+              chunk_rows=None, spill_dir=None, store_path=None, abc_mode='rentang', item_params=None):
+    """
+    Menjalankan ROP per kota secara paralel di beberapa core dan menulis pivot per
+    kota. Dengan `chunk_rows`, setiap worker memproses kotanya per potongan SKU,
+    sehingga puncak memori kira-kira `max_workers` x satu potongan. Dengan
+    `store_path`, semua kota disimpan sebagai satu run di database hasil; run baru
+    ditandai selesai setelah semua kota berhasil ditulis. `item_params` mengatur
+    lead time dan jendela per item/kota (lihat item_params).
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    all_cities = sorted(str(c) for c in penjualan_df['City'].dropna().unique())
+    if cities:
+        all_cities = [c for c in all_cities if c in cities]
+
+    store_run = None
+    if store_path:
+        store = ResultStore(store_path)
+        fingerprint = f"{frame_fingerprint(penjualan_df)}:{frame_fingerprint(produk_df)}:{','.join(all_cities)}:{abc_mode}"
+        if item_params is not None:
+            fingerprint += f":{frame_fingerprint(item_params)}"
+        store_run = (store_path, store.begin_run(method, start_date, end_date, fingerprint, source='batch'))
+
+    results = []
+    with ProcessPoolExecutor(max_workers=max_workers) as pool:
+        futures = [
+            pool.submit(process_city, city, penjualan_df[penjualan_df['City'] == city], produk_df,
+                        start_date, end_date, method, out_dir, fmt, chunk_rows, spill_dir, store_run, abc_mode,
+                        item_params)
+            for city in all_cities
+        ]
+        for future in as_completed(futures):
+            city, n_rows, path = future.result()
+            logger.info("Kota %s: %d baris -> %s", city, n_rows, path or "tidak ada data")
+            results.append((city, n_rows, path))
+    if store_run:
+        ResultStore(store_path).finish_run(store_run[1])
+        logger.info("Hasil disimpan sebagai run #%d di %s", store_run[1], store_path)
+    return sorted(results)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Hitung ROP per kota dari ekspor penjualan lokal.")
+    parser.add_argument('--sales-dir', required=True, help="Folder berisi file penjualan (.csv/.xlsx/.xls)")
+    parser.add_argument('--produk', required=True, help="Workbook produk referensi (.xlsx)")
+    parser.add_argument('--sheet', default="Sheet1 (2)", help="Nama sheet produk referensi")
+    parser.add_argument('--skip-rows', type=int, default=6, help="Jumlah baris header produk yang dilewati")
+    parser.add_argument('--start', help="Tanggal awal (YYYY-MM-DD); default 6 hari sebelum --end")
+    parser.add_argument('--end', help="Tanggal akhir (YYYY-MM-DD); default tanggal faktur terakhir")
+    parser.add_argument('--method', default="ABC Bertingkat", choices=list(ROP_METHODS))
+    parser.add_argument('--out', required=True, help="Folder output pivot per kota")
+    parser.add_argument('--format', default='xlsx', choices=['xlsx', 'csv'])
+    parser.add_argument('--city', action='append', dest='cities', help="Batasi ke kota tertentu (boleh diulang)")
+    parser.add_argument('--workers', type=int, default=None, help="Jumlah proses paralel (default: jumlah CPU)")
+    parser.add_argument('--chunk-rows', type=int, default=None,
+                        help="Mode terpartisi: baris hasil (item x hari) maksimum per potongan SKU per kota")
+    parser.add_argument('--spill-dir', default=None,
+                        help="Folder hasil panjang per potongan (parquet) untuk mode terpartisi; default <out>/partisi")
+    parser.add_argument('--store', default=None, help="Simpan hasil sebagai run di database SQLite ini")
+    parser.add_argument('--abc-mode', default=DEFAULT_ABC_MODE, choices=list(ABC_MODES),
+                        help="Klasifikasi ABC: 'harian' (per tanggal, tanpa data sesudahnya), 'mingguan' (sama, dihitung "
+                             "ulang tiap 7 hari) atau 'rentang' (cara lama)")
+    parser.add_argument('--params', default=None,
+                        help="Tabel lead time & jendela per item/kota (.csv/.xlsx; kolom City, No. Barang, Lead Time, Jendela)")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+
+    logger.info("Membaca data penjualan dari %s", args.sales_dir)
+    try:
+        penjualan = normalize_sales(read_sales_folder(args.sales_dir))
+    except SalesSchemaError as e:
+        parser.error(str(e))
+    produk_ref = normalize_produk(parse_produk_excel(args.produk, args.sheet, args.skip_rows))
+    try:
+        item_params = read_item_params(args.params, args.params) if args.params else None
+    except ItemParamsError as e:
+        parser.error(f"{os.path.basename(args.params)}: {e}")
+    if penjualan.empty:
+        parser.error("Tidak ada data penjualan yang bisa diproses.")
+
+    end_date = pd.to_datetime(args.end).date() if args.end else penjualan['Tgl Faktur'].max().date()
+    start_date = pd.to_datetime(args.start).date() if args.start else end_date - timedelta(days=6)
+    if start_date > end_date:
+        parser.error("Tanggal awal tidak boleh melebihi tanggal akhir.")
+
+    logger.info("Menghitung ROP '%s' untuk %s s/d %s", args.method, start_date, end_date)
+    spill_dir = args.spill_dir or (os.path.join(args.out, 'partisi') if args.chunk_rows else None)
+    run_batch(penjualan, produk_ref, start_date, end_date, args.method, args.out,
+              fmt=args.format, cities=args.cities, max_workers=args.workers,
+              chunk_rows=args.chunk_rows, spill_dir=spill_dir, store_path=args.store, abc_mode=args.abc_mode,
+              item_params=item_params)
+
+
+if __name__ == '__main__':
+    main()
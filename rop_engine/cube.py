@@ -0,0 +1,100 @@
+"""
+Kubus metrik error metode ROP per City x Kategori ABC x BRAND x Kategori Barang.
+
+Detail (item x hari) diringkas sekali menjadi sel-sel kubus: jumlah baris,
+jumlah error, jumlah error absolut, dan jumlah stockout per metode. Karena
+keempat ukuran ini bisa dijumlahkan, roll-up maupun drill-down ke kombinasi
+dimensi apa pun cukup menjumlahkan sel kubus (beberapa ribu baris), tanpa
+memindai ulang frame detail.
+"""
+import numpy as np
+import pandas as pd
+
+CUBE_DIMENSIONS = ['City', 'Kategori ABC', 'BRAND Barang', 'Kategori Barang']
+CUBE_MEASURES = ['Jumlah Baris', 'Jumlah Error', 'Jumlah Error Absolut', 'Jumlah Hari Stockout']
+# Label untuk nilai dimensi kosong (mis. barang yang tidak ada di produk referensi)
+MISSING_LABEL = '(kosong)'
+
+
+def _dimension_codes(values):
+    codes, uniques = pd.factorize(values, sort=True)
+    labels = np.append(np.asarray([str(u) for u in uniques], dtype=object), MISSING_LABEL)
+    codes = np.where(codes < 0, len(labels) - 1, codes)
+    return codes.astype(np.int64), pd.Index(labels, dtype=object)
+
+
+def build_error_cube(detail_df, errors, dimensions=CUBE_DIMENSIONS):
+    """
+    Sel kubus dari frame detail (kolom dimensi) dan {metode: array error per
+    baris} dalam satu lintasan bincount. Mengembalikan frame panjang: satu
+    baris per (sel, metode), kolom dimensi + 'Metode' (kategori) + CUBE_MEASURES.
+    """
+    dimensions = [dim for dim in dimensions if dim in detail_df.columns]
+    key = np.zeros(len(detail_df), dtype=np.int64)
+    dim_labels = []
+    for dim in dimensions:
+        codes, labels = _dimension_codes(detail_df[dim])
+        key = key * len(labels) + codes
+        dim_labels.append(labels)
+    cell_codes, cells = pd.factorize(key)
+    n_cells, n_methods = len(cells), len(errors)
+    count = np.bincount(cell_codes, minlength=n_cells)
+
+    # Dimensi setiap sel diurai kembali dari kunci gabungan, sebagai kategori
+    cube = {}
+    rest = cells
+    for dim, labels in reversed(list(zip(dimensions, dim_labels))):
+        cube[dim] = pd.Categorical.from_codes(np.tile(rest % len(labels), n_methods), categories=labels)
+        rest = rest // len(labels)
+    cube = {dim: cube[dim] for dim in dimensions}
+    cube['Metode'] = pd.Categorical.from_codes(np.repeat(np.arange(n_methods), n_cells), categories=list(errors))
+
+    measures = {name: [] for name in CUBE_MEASURES}
+    for err in errors.values():
+        err = np.asarray(err, dtype=np.float64)
+        measures['Jumlah Baris'].append(count)
+        measures['Jumlah Error'].append(np.bincount(cell_codes, weights=err, minlength=n_cells))
+        measures['Jumlah Error Absolut'].append(np.bincount(cell_codes, weights=np.abs(err), minlength=n_cells))
+        measures['Jumlah Hari Stockout'].append(np.bincount(cell_codes, weights=err < 0, minlength=n_cells).astype(np.int64))
+    for name, parts in measures.items():
+        cube[name] = np.concatenate(parts) if parts else np.zeros(0)
+    return pd.DataFrame(cube)
+
+
+class ErrorCube:
+    """
+    Kubus metrik error yang dibangun sekali setelah analisis error. `rollup`
+    menjumlahkan sel-sel kubus ke dimensi yang dipilih (opsional difilter) lalu
+    menghitung MAE, bias, dan tingkat stockout dari jumlah-jumlah tersebut.
+    """
+
+    def __init__(self, detail_df, errors, dimensions=CUBE_DIMENSIONS):
+        self.cells = build_error_cube(detail_df, errors, dimensions)
+        self.dimensions = [dim for dim in dimensions if dim in self.cells.columns]
+        self.methods = list(errors)
+        self.options = {dim: sorted(self.cells[dim].unique()) for dim in self.dimensions}
+
+    @property
+    def nbytes(self):
+        return int(self.cells.memory_usage(deep=True).sum())
+
+    def rollup(self, by=(), filters=None):
+        """
+        Metrik per metode (dan per dimensi `by`) untuk sel yang lolos `filters`
+        ({dimensi: daftar nilai}; daftar kosong berarti semua nilai).
+        """
+        by = list(by)
+        cells = self.cells
+        for dim, selected in (filters or {}).items():
+            if selected:
+                cells = cells[cells[dim].isin(selected)]
+        # Urutan mengikuti kategori: nilai dimensi terurut, metode sesuai urutan asli
+        totals = cells.groupby(by + ['Metode'], observed=True)[CUBE_MEASURES].sum()
+        count = totals['Jumlah Baris'].where(totals['Jumlah Baris'] > 0)
+        return pd.DataFrame({
+            'MAE': totals['Jumlah Error Absolut'] / count,
+            'Rata-rata Error (Bias)': totals['Jumlah Error'] / count,
+            'Jumlah Hari Stockout': totals['Jumlah Hari Stockout'],
+            'Tingkat Stockout (%)': 100 * totals['Jumlah Hari Stockout'] / count,
+            'Jumlah Baris': totals['Jumlah Baris'],
+        })
@@ -0,0 +1,115 @@
+import zipfile
+
+import pandas as pd
+from openpyxl import Workbook
+
+from .pivots import PIVOT_INDEX_COLS, city_pivot, pivot_sheet_name
+
+EXPORT_FORMATS = {
+    'xlsx': {
+        'label': "Excel (satu sheet per kota)",
+        'ext': 'xlsx',
+        'mime': "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+    },
+    'csv_zip': {
+        'label': "ZIP berisi CSV per kota",
+        'ext': 'zip',
+        'mime': "application/zip",
+    },
+    'parquet': {
+        'label': "Parquet (format panjang, untuk sistem lain)",
+        'ext': 'parquet',
+        'mime': "application/octet-stream",
+    },
+}
+
+
+def iter_city_pivots(result_df):
+    """Pivot per kota dibuat satu per satu, jadi hanya satu pivot yang hidup di memori."""
+    for city in sorted(str(c) for c in result_df['City'].dropna().unique()):
+        city_df = result_df[result_df['City'] == city]
+        if not city_df.empty:
+            yield pivot_sheet_name(city), city_pivot(city_df)
+
+
+def _cell(value):
+    if value is None or (isinstance(value, float) and pd.isna(value)):
+        return None
+    return value.item() if hasattr(value, 'item') else value
+
+
+def pivot_rows(pivot, header=True):
+    """
+    Baris-baris sheet dengan tata letak yang sama seperti DataFrame.to_excel untuk
+    pivot ROP/SO: dua baris header kolom (Tanggal, ROP/SO), satu baris nama index,
+    lalu data. Sel gabungan diganti dengan nilai berulang agar bisa ditulis streaming.
+    `header=False` hanya menghasilkan baris data (untuk potongan lanjutan).
+    """
+    n_index = pivot.index.nlevels
+    pad = [None] * (n_index - 1)
+    if header:
+        for level in range(pivot.columns.nlevels):
+            level_name = pivot.columns.names[level]
+            yield pad + [level_name] + [_cell(v) for v in pivot.columns.get_level_values(level)]
+        yield list(pivot.index.names) + [None] * len(pivot.columns)
+    for row in pivot.itertuples(index=True, name=None):
+        keys = row[0] if n_index > 1 else (row[0],)
+        yield [_cell(k) for k in keys] + [_cell(v) for v in row[1:]]
+
+
+def write_pivots_xlsx(pivots, fh):
+    """
+    Menulis pivot ke workbook dengan mode write-only openpyxl: baris ditulis
+    langsung ke file sementara per sheet sehingga memori tetap konstan, berapa
+    pun lebar rentang tanggalnya.
+    """
+    wb = Workbook(write_only=True)
+    for sheet_name, pivot in pivots:
+        ws = wb.create_sheet(title=sheet_name[:31])
+        for row in pivot_rows(pivot):
+            ws.append(row)
+    if not wb.worksheets:
+        wb.create_sheet(title="Kosong")
+    wb.save(fh)
+
+
+def write_pivot_chunks_xlsx(sheet_name, pivots, fh):
+    """
+    Satu sheet dari beberapa potongan pivot berkolom sama (mis. potongan SKU dari
+    mode terpartisi), ditulis berurutan; header hanya dari potongan pertama.
+    """
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet(title=sheet_name[:31])
+    for i, pivot in enumerate(pivots):
+        for row in pivot_rows(pivot, header=(i == 0)):
+            ws.append(row)
+    wb.save(fh)
+
+
+def write_pivots_csv_zip(pivots, fh):
+    with zipfile.ZipFile(fh, 'w', compression=zipfile.ZIP_DEFLATED) as zf:
+        for sheet_name, pivot in pivots:
+            with zf.open(f"{sheet_name}.csv", 'w') as member:
+                member.write(pivot.to_csv().encode('utf-8'))
+
+
+def write_long_parquet(result_df, fh):
+    """Hasil dalam format panjang (satu baris per kota x barang x tanggal)."""
+    cols = ['City'] + PIVOT_INDEX_COLS + ['Date', 'Kategori ABC', 'ROP', 'SO']
+    long_df = result_df[[c for c in cols if c in result_df.columns]].copy()
+    long_df['Date'] = pd.to_datetime(long_df['Date'])
+    if 'Kategori ABC' in long_df.columns:
+        long_df['Kategori ABC'] = long_df['Kategori ABC'].astype(str)
+    long_df.to_parquet(fh, index=False)
+
+
+def export_rop_result(result_df, fmt, fh):
+    """Menulis hasil ROP ke file-like `fh` dalam format EXPORT_FORMATS yang dipilih."""
+    if fmt == 'xlsx':
+        write_pivots_xlsx(iter_city_pivots(result_df), fh)
+    elif fmt == 'csv_zip':
+        write_pivots_csv_zip(iter_city_pivots(result_df), fh)
+    elif fmt == 'parquet':
+        write_long_parquet(result_df, fh)
+    else:
+        raise ValueError(f"Format ekspor tidak dikenal: {fmt}")
@@ -0,0 +1,136 @@
+import hashlib
+import logging
+import os
+import threading
+
+import pandas as pd
+
+DEFAULT_CACHE_DIR = os.environ.get("ROP_CACHE_DIR", ".rop_cache")
+DEFAULT_MAX_BYTES = int(os.environ.get("ROP_CACHE_MAX_MB", "2048")) * 1024 * 1024
+# Dinaikkan bila bentuk frame hasil parse berubah, agar entri lama tidak dipakai lagi
+CACHE_FORMAT = 2
+
+logger = logging.getLogger(__name__)
+
+
+def parquet_safe(df):
+    """Kolom object campuran (mis. angka & teks di 'No. Barang') diubah ke teks agar bisa ditulis parquet."""
+    df = df.copy()
+    df.columns = [str(c) for c in df.columns]
+    for col in df.columns:
+        if df[col].dtype == object and pd.api.types.infer_dtype(df[col], skipna=True).startswith('mixed'):
+            df[col] = df[col].where(df[col].isna(), df[col].astype(str))
+    return df
+
+
+class ParsedFileCache:
+    """
+    Cache disk untuk file penjualan yang sudah di-parse, disimpan sebagai parquet.
+
+    Kunci cache adalah id file Drive ditambah versinya (md5Checksum, atau modifiedTime
+    untuk file tanpa checksum), sehingga file historis yang tidak berubah tidak perlu
+    diunduh dan di-parse ulang setelah aplikasi restart. Ukuran total dibatasi
+    `max_bytes`; file yang paling lama tidak dipakai dihapus lebih dulu (LRU).
+    """
+
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR, max_bytes=DEFAULT_MAX_BYTES):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.write_errors = 0
+        self._lock = threading.Lock()
+        os.makedirs(cache_dir, exist_ok=True)
+
+    @staticmethod
+    def version_of(file_info):
+        return file_info.get('md5Checksum') or file_info.get('modifiedTime') or ''
+
+    def _path(self, file_info):
+        version = hashlib.sha1(f"{CACHE_FORMAT}:{self.version_of(file_info)}".encode()).hexdigest()[:16]
+        return os.path.join(self.cache_dir, f"{file_info['id']}__{version}.parquet")
+
+    def get(self, file_info):
+        path = self._path(file_info)
+        if not self.version_of(file_info) or not os.path.exists(path):
+            with self._lock:
+                self.misses += 1
+            return None
+        try:
+            df = pd.read_parquet(path)
+        except Exception:
+            # File rusak (mis. penulisan terputus) diperlakukan sebagai miss
+            self._remove(path)
+            with self._lock:
+                self.misses += 1
+            return None
+        os.utime(path)
+        with self._lock:
+            self.hits += 1
+        return df
+
+    def put(self, file_info, df):
+        if not self.version_of(file_info):
+            return
+        path = self._path(file_info)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        try:
+            parquet_safe(df).to_parquet(tmp_path, index=False)
+            os.replace(tmp_path, path)
+        except Exception as e:
+            # Cache hanya percepatan: gagal menulis (mis. pyarrow tidak ada, disk penuh) tidak boleh menggagalkan muat
+            self._remove(tmp_path)
+            with self._lock:
+                self.write_errors += 1
+            logger.warning("Gagal menyimpan cache untuk %s: %s", file_info.get('name', file_info['id']), e)
+            return
+        # Versi lama dari file yang sama tidak akan dipakai lagi
+        prefix = f"{file_info['id']}__"
+        for name in os.listdir(self.cache_dir):
+            if name.startswith(prefix) and name.endswith('.parquet') and os.path.join(self.cache_dir, name) != path:
+                self._remove(os.path.join(self.cache_dir, name))
+        self.evict()
+
+    def _entries(self):
+        entries = []
+        for name in os.listdir(self.cache_dir):
+            if name.endswith('.parquet'):
+                path = os.path.join(self.cache_dir, name)
+                try:
+                    stat = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, path))
+        return entries
+
+    def _remove(self, path):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+    def size_bytes(self):
+        return sum(size for _, size, _ in self._entries())
+
+    def evict(self):
+        with self._lock:
+            entries = sorted(self._entries())
+            total = sum(size for _, size, _ in entries)
+            for _, size, path in entries:
+                if total <= self.max_bytes:
+                    break
+                self._remove(path)
+                total -= size
+                self.evictions += 1
+
+    def stats(self):
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'write_errors': self.write_errors,
+            'files': len(self._entries()),
+            'size_bytes': self.size_bytes(),
+            'max_bytes': self.max_bytes,
+        }
@@ -0,0 +1,72 @@
+import numpy as np
+import pandas as pd
+
+FILTER_COLUMNS = ['Kategori Barang', 'BRAND Barang', 'Nama Barang']
+
+
+class ResultIndex:
+    """
+    Indeks filter untuk hasil ROP yang dibangun sekali saat hasil disimpan.
+
+    Setiap kolom filter (dan City) difaktorkan menjadi kode integer beserta label
+    string-nya, dan daftar opsi filter dihitung di muka. Filter kemudian cukup
+    berupa lookup boolean pada kode, tanpa salinan frame atau konversi string.
+    Nilai kosong (NaN) tidak pernah cocok dengan pilihan mana pun, sama seperti
+    sebelumnya.
+    """
+
+    def __init__(self, result_df):
+        self.frame = result_df
+        self._codes = {}
+        self._labels = {}
+        for col in FILTER_COLUMNS + ['City']:
+            codes, uniques = pd.factorize(result_df[col], sort=False)
+            self._codes[col] = codes
+            self._labels[col] = np.array([str(u) for u in uniques], dtype=object)
+        self.options = {col: sorted(set(self._labels[col])) for col in FILTER_COLUMNS}
+
+    def _lookup_mask(self, col, selected):
+        # Elemen terakhir (False) menampung kode -1 untuk nilai kosong
+        lut = np.zeros(len(self._labels[col]) + 1, dtype=bool)
+        lut[:-1] = np.isin(self._labels[col], list(selected))
+        return lut[self._codes[col]]
+
+    def mask(self, selections, city=None):
+        """
+        Mask baris untuk {kolom: daftar pilihan}; pilihan kosong berarti semua.
+        Mengembalikan None bila tidak ada filter sama sekali (semua baris).
+        """
+        mask = None
+        criteria = [(col, selected) for col, selected in selections.items() if selected]
+        if city is not None:
+            criteria.append(('City', [city]))
+        for col, selected in criteria:
+            col_mask = self._lookup_mask(col, selected)
+            mask = col_mask if mask is None else mask & col_mask
+        return mask
+
+    def subset(self, selections, city=None):
+        """Frame hasil yang sudah difilter; tanpa filter, frame asli dikembalikan apa adanya."""
+        mask = self.mask(selections, city)
+        if mask is None:
+            return self.frame
+        return self.frame.take(np.flatnonzero(mask))
+
+    def cities(self, selections):
+        """Kota yang masih punya baris setelah filter, terurut."""
+        codes = self._codes['City']
+        mask = self.mask(selections)
+        if mask is not None:
+            codes = codes[mask]
+        present = np.bincount(codes[codes >= 0], minlength=len(self._labels['City'])) > 0
+        return sorted(set(self._labels['City'][present]))
+
+    @property
+    def nbytes(self):
+        """Memori kode dan label indeks; frame hasil sendiri tidak ikut dihitung."""
+        return sum(codes.nbytes for codes in self._codes.values()) + sum(
+            len(label) for labels in self._labels.values() for label in labels)
+
+    def count(self, selections):
+        mask = self.mask(selections)
+        return len(self.frame) if mask is None else int(mask.sum())
@@ -0,0 +1,104 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from io import BytesIO
+
+from googleapiclient.http import MediaIoBaseDownload
+
+from .readers import read_sales_bytes
+
+FOLDER_MIME = 'application/vnd.google-apps.folder'
+DEFAULT_MAX_WORKERS = 8
+
+
+def list_all_files(drive_service, folder_id, fields="id, name", page_size=1000):
+    """Mengambil semua file di dalam folder dengan mengikuti setiap nextPageToken."""
+    query = f"'{folder_id}' in parents and mimeType != '{FOLDER_MIME}'"
+    files = []
+    page_token = None
+    while True:
+        response = drive_service.files().list(
+            q=query,
+            fields=f"nextPageToken, files({fields})",
+            pageSize=page_size,
+            pageToken=page_token,
+        ).execute()
+        files.extend(response.get('files', []))
+        page_token = response.get('nextPageToken')
+        if not page_token:
+            return files
+
+
+def download_bytes(drive_service, file_id):
+    request = drive_service.files().get_media(fileId=file_id)
+    fh = BytesIO()
+    downloader = MediaIoBaseDownload(fh, request)
+    done = False
+    while not done: _, done = downloader.next_chunk()
+    fh.seek(0)
+    return fh
+
+
+def download_and_parse(service, file_info, profiler=None):
+    """Unduh lalu parse satu file; waktu unduh dan parse dicatat terpisah bila ada profiler."""
+    t0 = time.perf_counter()
+    fh = download_bytes(service, file_info['id'])
+    t1 = time.perf_counter()
+    df = read_sales_bytes(fh, file_info['name'])
+    if profiler is not None:
+        profiler.record('drive_download', t1 - t0)
+        profiler.record('parse_file', time.perf_counter() - t1, rows=len(df))
+    return df
+
+
+def read_with_cache(cache, service, file_info, profiler=None):
+    """Membaca dari cache disk bila versi file sama; jika tidak, unduh, parse, lalu simpan."""
+    t0 = time.perf_counter()
+    df = cache.get(file_info)
+    if df is not None:
+        if profiler is not None:
+            profiler.record('cache_disk_hit', time.perf_counter() - t0, rows=len(df))
+        return df
+    df = download_and_parse(service, file_info, profiler)
+    cache.put(file_info, df)
+    return df
+
+
+def load_files_concurrently(service_factory, files, max_workers=DEFAULT_MAX_WORKERS, on_progress=None, read_fn=None, cache=None, profiler=None):
+    """
+    Mengunduh dan membaca file Drive secara paralel dengan worker pool terbatas.
+
+    Klien httplib2 di balik service Drive tidak thread-safe, sehingga setiap worker
+    membuat service sendiri lewat `service_factory()`. `on_progress(done, total,
+    file_info, error)` dipanggil dari thread pemanggil setiap kali satu file selesai,
+    jadi aman untuk memperbarui widget Streamlit.
+    Jika `cache` (ParsedFileCache) diberikan, file yang versinya tidak berubah
+    dibaca dari cache disk tanpa diunduh ulang.
+    Mengembalikan (list DataFrame sesuai urutan `files`, list (file_info, exception)).
+    """
+    if read_fn is None:
+        if cache is not None:
+            read_fn = lambda service, info: read_with_cache(cache, service, info, profiler)
+        else:
+            read_fn = lambda service, info: download_and_parse(service, info, profiler)
+    local = threading.local()
+
+    def worker(file_info):
+        if not hasattr(local, 'service'):
+            local.service = service_factory()
+        return read_fn(local.service, file_info)
+
+    results = [None] * len(files)
+    errors = []
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(files) or 1))) as pool:
+        futures = {pool.submit(worker, info): i for i, info in enumerate(files)}
+        for done, future in enumerate(as_completed(futures), start=1):
+            i = futures[future]
+            error = future.exception()
+            if error is None:
+                results[i] = future.result()
+            else:
+                errors.append((files[i], error))
+            if on_progress is not None:
+                on_progress(done, len(files), files[i], error)
+    return [df for df in results if df is not None], errors
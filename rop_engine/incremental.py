@@ -0,0 +1,328 @@
+"""
+Pembaruan ROP harian secara inkremental dari state rolling yang disimpan.
+
+Contoh (sekali di awal, lalu setiap ada file penjualan baru):
+    python -m rop_engine.incremental init --sales-dir data/penjualan --produk data/produk.xlsx \
+        --start 2024-01-01 --end 2024-05-31 --state state_rop.npz --out hasil_harian
+    python -m rop_engine.incremental update --sales-dir data/penjualan_baru --produk data/produk.xlsx \
+        --state state_rop.npz --out hasil_harian
+
+Dengan --verify (dan --sales-dir berisi seluruh histori), hari-hari baru
+dibandingkan dengan perhitungan penuh compute_rolling_frame. Mode klasifikasi
+ABC dipilih saat init (--abc-mode 'rentang' atau 'harian') dan disimpan di state;
+'mingguan' tidak didukung, karena kelas hari baru bisa bergantung pada awal
+minggu yang jendelanya sudah digeser keluar dari state.
+"""
+import argparse
+import json
+import logging
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+from .batch import read_sales_folder
+from .file_cache import parquet_safe
+from .normalize import normalize_sales, normalize_produk
+from .profiling import profile_stage
+from .readers import parse_produk_excel
+from .rolling import (
+    ABC_MODES, ITEM_KEYS, LOOKAHEAD_DAYS, ROLLING_WINDOW_DAYS, assemble_rolling_frame, classify_abc,
+    classify_abc_by_date, compute_rolling_frame, prefix_sums, window_std,
+)
+from .rop import ROP_METHODS, apply_rop_method
+
+logger = logging.getLogger(__name__)
+
+ONE_DAY = pd.Timedelta(days=1)
+# Mode ABC yang bisa diperpanjang dari state (lihat docstring modul)
+INCREMENTAL_ABC_MODES = ['rentang', 'harian']
+
+
+def _day(value):
+    return pd.Timestamp(value).normalize()
+
+
+def _n_days(first, last):
+    """Jumlah hari dari `first` ke `last` (last - first)."""
+    return int((last - first) // ONE_DAY)
+
+
+class RollingState:
+    """
+    State rolling per (City, No. Barang) untuk rentang analisis yang diawali
+    `start_date` dan sudah dihitung sampai `end_date`.
+
+    - `buffer`: penjualan harian (item x hari) untuk hari [buffer_start, data_until];
+      hanya hari yang masih dibutuhkan jendela 90 hari berikutnya yang disimpan,
+      sisanya digeser keluar setiap pembaruan.
+    - `settled_total`: jumlah penjualan 90 hari untuk setiap hari di
+      [awal rentang, settled_until] yang datanya sudah lengkap; bahan rata-rata
+      ADS untuk klasifikasi ABC tanpa menghitung ulang seluruh histori.
+    - `abc_mode`: 'rentang' (dari `settled_total`) atau 'harian' (per hari baru
+      dari buffer), tetap sama sepanjang umur state.
+
+    Penjualan baru dianggap hanya menambah hari setelah `data_until`.
+    """
+
+    def __init__(self, items, start_date, end_date, data_until, settled_until, settled_total, buffer_start, buffer,
+                 abc_mode='rentang'):
+        if abc_mode not in INCREMENTAL_ABC_MODES:
+            raise ValueError(f"Mode ABC '{abc_mode}' tidak didukung pembaruan inkremental; "
+                             f"gunakan {' atau '.join(INCREMENTAL_ABC_MODES)}.")
+        self.items = items
+        self.start_date = _day(start_date)
+        self.end_date = _day(end_date)
+        self.data_until = _day(data_until)
+        self.settled_until = _day(settled_until)
+        self.settled_total = settled_total
+        self.buffer_start = _day(buffer_start)
+        self.buffer = buffer
+        self.abc_mode = abc_mode
+
+    @property
+    def range_start(self):
+        return self.start_date - pd.Timedelta(days=ROLLING_WINDOW_DAYS)
+
+    @classmethod
+    def empty(cls, start_date, abc_mode='rentang'):
+        """State awal sebelum ada hari yang dihitung."""
+        start = _day(start_date)
+        range_start = start - pd.Timedelta(days=ROLLING_WINDOW_DAYS)
+        items = pd.DataFrame({col: pd.Series([], dtype=str) for col in ITEM_KEYS})
+        return cls(items, start, start - ONE_DAY, range_start - ONE_DAY, range_start - ONE_DAY,
+                   np.zeros(0), range_start, np.zeros((0, 0)), abc_mode)
+
+    def save(self, path):
+        meta = {
+            'start_date': str(self.start_date.date()),
+            'end_date': str(self.end_date.date()),
+            'data_until': str(self.data_until.date()),
+            'settled_until': str(self.settled_until.date()),
+            'buffer_start': str(self.buffer_start.date()),
+            'abc_mode': self.abc_mode,
+        }
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'wb') as f:
+            np.savez_compressed(
+                f, meta=np.array(json.dumps(meta)), buffer=self.buffer, settled_total=self.settled_total,
+                **{f"item_{i}": self.items[col].to_numpy(dtype=str) for i, col in enumerate(ITEM_KEYS)}
+            )
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            meta = json.loads(str(data['meta']))
+            items = pd.DataFrame({col: data[f"item_{i}"].astype(str) for i, col in enumerate(ITEM_KEYS)})
+            return cls(items, meta['start_date'], meta['end_date'], meta['data_until'], meta['settled_until'],
+                       data['settled_total'], meta['buffer_start'], data['buffer'], meta.get('abc_mode', 'rentang'))
+
+
+def _merge_items(state, penjualan_df):
+    """Item state + item di data penjualan, terurut seperti groupby; beserta posisi baru item lama."""
+    sales_items = penjualan_df.groupby(ITEM_KEYS, observed=True).size().index.to_frame(index=False)
+    sales_items = sales_items.astype({col: str for col in ITEM_KEYS})
+    items = (pd.concat([state.items, sales_items], ignore_index=True)
+             .drop_duplicates().sort_values(ITEM_KEYS).reset_index(drop=True))
+    old_pos = pd.MultiIndex.from_frame(items).get_indexer(pd.MultiIndex.from_frame(state.items))
+    return items, old_pos
+
+
+def _add_daily_sales(matrix, penjualan_df, items, first_day):
+    """Menambahkan penjualan (hanya tanggal tepat tengah malam di dalam rentang matriks) ke matriks item x hari."""
+    if penjualan_df.empty:
+        return
+    daily = penjualan_df.groupby(['Tgl Faktur'] + ITEM_KEYS, observed=True)['Kuantitas'].sum().reset_index()
+    dates = pd.to_datetime(daily['Tgl Faktur'])
+    day_idx = ((dates - first_day) // ONE_DAY).to_numpy()
+    ok = ((dates == dates.dt.normalize()) & (day_idx >= 0) & (day_idx < matrix.shape[1])).to_numpy()
+    rows = pd.MultiIndex.from_frame(items).get_indexer(
+        pd.MultiIndex.from_frame(daily[ITEM_KEYS].astype({col: str for col in ITEM_KEYS})))
+    qty = daily['Kuantitas'].to_numpy(dtype=np.float64)
+    np.add.at(matrix, (rows[ok], day_idx[ok]), qty[ok])
+
+
+def extend_state(state, penjualan_df, produk_df, end_date, profiler=None):
+    """
+    Memperpanjang state sampai `end_date` dengan penjualan yang lebih baru dari
+    `state.data_until`.
+
+    Mengembalikan (state baru, frame hari baru, jumlah baris penjualan lama yang
+    dilewati). Frame berisi kolom yang sama dengan compute_rolling_frame untuk
+    hari (state.end_date, end_date]; ABC-nya dihitung dari rata-rata ADS seluruh
+    rentang [start_date, end_date], jadi nilainya sama dengan perhitungan penuh
+    untuk rentang itu. Pada state mode 'harian' kelas setiap hari baru dihitung
+    dari 90 hari sampai hari itu, sama dengan compute_rolling_frame mode 'harian'.
+    Waktu proses sebanding dengan data baru plus satu jendela 90 hari, bukan
+    dengan panjang histori.
+    """
+    window = ROLLING_WINDOW_DAYS
+    end_day = max(_day(end_date), state.end_date)
+    range_start = state.range_start
+    range_end = end_day + pd.Timedelta(days=LOOKAHEAD_DAYS)
+
+    with profile_stage(profiler, 'gabung_item', rows=len(penjualan_df)):
+        items, old_pos = _merge_items(state, penjualan_df)
+        sale_dates = pd.to_datetime(penjualan_df['Tgl Faktur'])
+        is_new = (sale_dates >= state.data_until + ONE_DAY).to_numpy()
+        new_sales = penjualan_df[is_new]
+        skipped_rows = int((~is_new & (sale_dates >= range_start).to_numpy()).sum())
+        data_until = max(state.data_until, _day(sale_dates[is_new].max())) if is_new.any() else state.data_until
+
+    with profile_stage(profiler, 'matriks_penjualan', rows=len(new_sales)):
+        matrix_start = state.buffer_start
+        n_days = _n_days(matrix_start, max(data_until, range_end)) + 1
+        matrix = np.zeros((len(items), n_days))
+        matrix[old_pos, :state.buffer.shape[1]] = state.buffer
+        _add_daily_sales(matrix, new_sales, items, matrix_start)
+        prefix, prefix_sq = prefix_sums(matrix)
+        dates = pd.date_range(start=matrix_start, periods=n_days, freq='D')
+        # Jendela tidak melewati awal rentang, sama seperti perhitungan penuh
+        first_pos = max(_n_days(matrix_start, range_start), 0)
+        end_pos = _n_days(matrix_start, range_end)
+
+    with profile_stage(profiler, 'rolling_stats', rows=len(items)):
+        out_cols = np.arange(_n_days(matrix_start, state.end_date) + 1, _n_days(matrix_start, end_day) + 1)
+        hi = out_cols + 1
+        lo = np.maximum(hi - window, first_pos)
+        sales = prefix[:, hi] - prefix[:, lo]
+        ahead_hi = np.minimum(out_cols + LOOKAHEAD_DAYS, end_pos + 1)
+        stats = {
+            'sales_90d': sales,
+            'std_dev_90d': window_std(sales, prefix_sq[:, hi] - prefix_sq[:, lo], hi - lo),
+            'ADS': sales / window,
+            'Penjualan_Aktual_21_Hari': prefix[:, ahead_hi] - prefix[:, out_cols],
+        }
+
+        # Jumlah penjualan 90 hari untuk hari-hari setelah settled_until (belum lengkap sebelumnya)
+        tail = np.arange(_n_days(matrix_start, state.settled_until) + 1, end_pos + 1)
+        tail_sales = prefix[:, tail + 1] - prefix[:, np.maximum(tail + 1 - window, first_pos)]
+        settled_total = np.zeros(len(items))
+        settled_total[old_pos] = state.settled_total
+
+    with profile_stage(profiler, 'klasifikasi_abc', rows=len(items)):
+        if state.abc_mode == 'harian':
+            # Jendela [hari - 90, hari] setiap hari baru selalu ada di buffer + data baru
+            abc = classify_abc_by_date(items, matrix, out_cols)
+        else:
+            n_range_days = _n_days(range_start, range_end) + 1
+            abc = classify_abc(items, (settled_total + tail_sales.sum(axis=1)) / (window * n_range_days))
+
+    with profile_stage(profiler, 'gabung_abc_produk') as info:
+        new_frame = assemble_rolling_frame(items, matrix, stats, abc, dates, out_cols, produk_df) if len(items) else pd.DataFrame()
+        info['rows'] = len(new_frame)
+
+    settled_until = min(data_until, range_end)
+    n_settled = _n_days(state.settled_until, settled_until)
+    buffer_start = max(range_start, min(end_day, settled_until) - pd.Timedelta(days=window - 1))
+    buffer_pos = _n_days(matrix_start, buffer_start)
+    new_state = RollingState(
+        items, state.start_date, end_day, data_until, settled_until,
+        settled_total + tail_sales[:, :n_settled].sum(axis=1),
+        buffer_start, matrix[:, buffer_pos:_n_days(matrix_start, data_until) + 1].copy(), state.abc_mode,
+    )
+    return new_state, new_frame, skipped_rows
+
+
+def verify_extension(new_frame, penjualan_df, produk_df, start_date, previous_end, end_date, rtol=1e-9,
+                     abc_mode='rentang'):
+    """
+    Membandingkan hari-hari baru hasil extend_state dengan compute_rolling_frame
+    penuh untuk [start_date, end_date] dengan mode ABC yang sama. Mengembalikan
+    daftar selisih (kosong = cocok).
+    """
+    full = compute_rolling_frame(penjualan_df, produk_df, start_date, end_date, abc_mode=abc_mode)
+    expected = full[full['Date'] > _day(previous_end)].reset_index(drop=True) if not full.empty else full
+    if len(expected) != len(new_frame):
+        return [f"Jumlah baris berbeda: inkremental {len(new_frame)}, penuh {len(expected)}"]
+    if list(expected.columns) != list(new_frame.columns):
+        return [f"Kolom berbeda: inkremental {list(new_frame.columns)}, penuh {list(expected.columns)}"]
+    problems = []
+    for col in expected.columns:
+        exp, got = expected[col], new_frame[col]
+        if pd.api.types.is_numeric_dtype(exp) and pd.api.types.is_numeric_dtype(got):
+            same = np.isclose(exp.to_numpy(dtype=float), got.to_numpy(dtype=float), rtol=rtol, atol=1e-9, equal_nan=True)
+        else:
+            same = (exp.isna().to_numpy() & got.isna().to_numpy()) | (exp.astype(str).to_numpy() == got.astype(str).to_numpy())
+        if not same.all():
+            problems.append(f"Kolom '{col}': {int((~same).sum())} baris berbeda")
+    return problems
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Perbarui ROP harian secara inkremental dari state rolling tersimpan.")
+    parser.add_argument('command', choices=['init', 'update'], help="init: buat state baru; update: tambah hari baru")
+    parser.add_argument('--sales-dir', required=True, help="Folder file penjualan (untuk update cukup file baru)")
+    parser.add_argument('--produk', required=True, help="Workbook produk referensi (.xlsx)")
+    parser.add_argument('--sheet', default="Sheet1 (2)", help="Nama sheet produk referensi")
+    parser.add_argument('--skip-rows', type=int, default=6, help="Jumlah baris header produk yang dilewati")
+    parser.add_argument('--state', required=True, help="File state rolling (.npz)")
+    parser.add_argument('--start', help="Tanggal awal rentang analisis (wajib untuk init)")
+    parser.add_argument('--end', help="Tanggal akhir baru (YYYY-MM-DD); default tanggal faktur terakhir")
+    parser.add_argument('--method', default="ABC Bertingkat", choices=list(ROP_METHODS))
+    parser.add_argument('--abc-mode', choices=INCREMENTAL_ABC_MODES,
+                        help=f"Klasifikasi ABC untuk init: 'rentang' ({ABC_MODES['rentang']}, bawaan) atau 'harian' "
+                             f"({ABC_MODES['harian']}); update memakai mode yang tersimpan di state. 'mingguan' tidak "
+                             "didukung pembaruan inkremental, gunakan rop_engine.batch")
+    parser.add_argument('--out', required=True, help="Folder output hasil hari-hari baru (parquet)")
+    parser.add_argument('--verify', action='store_true',
+                        help="Bandingkan dengan perhitungan penuh (--sales-dir harus berisi seluruh histori)")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+
+    penjualan = normalize_sales(read_sales_folder(args.sales_dir))
+    produk_ref = normalize_produk(parse_produk_excel(args.produk, args.sheet, args.skip_rows))
+    if args.command == 'init':
+        if not args.start:
+            parser.error("--start wajib untuk init.")
+        state = RollingState.empty(args.start, args.abc_mode or 'rentang')
+    else:
+        if not os.path.exists(args.state):
+            parser.error(f"State {args.state} belum ada; jalankan init terlebih dahulu.")
+        state = RollingState.load(args.state)
+        if args.abc_mode and args.abc_mode != state.abc_mode:
+            parser.error(f"State {args.state} dibuat dengan mode ABC '{state.abc_mode}'; "
+                         f"jalankan init ulang untuk mode '{args.abc_mode}'.")
+
+    if args.end:
+        end_date = _day(args.end)
+    elif not penjualan.empty:
+        end_date = _day(penjualan['Tgl Faktur'].max())
+    else:
+        end_date = state.end_date
+    if end_date <= state.end_date:
+        logger.info("Tidak ada hari baru: state sudah sampai %s.", state.end_date.date())
+        return 0
+
+    previous_end = state.end_date
+    logger.info("Memperpanjang ROP dari %s sampai %s", (previous_end + ONE_DAY).date(), end_date.date())
+    new_state, new_frame, skipped_rows = extend_state(state, penjualan, produk_ref, end_date)
+    if skipped_rows:
+        logger.warning("%d baris penjualan bertanggal <= %s dilewati (sudah tercakup state).",
+                       skipped_rows, state.data_until.date())
+
+    status = 0
+    if args.verify:
+        problems = verify_extension(new_frame, penjualan, produk_ref, state.start_date, previous_end, end_date,
+                                    abc_mode=state.abc_mode)
+        for problem in problems:
+            logger.error("Verifikasi: %s", problem)
+        if problems:
+            status = 1
+        else:
+            logger.info("Verifikasi: %d baris identik dengan perhitungan penuh.", len(new_frame))
+
+    if not new_frame.empty:
+        os.makedirs(args.out, exist_ok=True)
+        path = os.path.join(args.out, f"rop_{(previous_end + ONE_DAY).date()}_{end_date.date()}.parquet")
+        parquet_safe(apply_rop_method(new_frame, args.method)).to_parquet(path, index=False)
+        logger.info("%d baris ditulis ke %s", len(new_frame), path)
+    new_state.save(args.state)
+    return status
+
+
+if __name__ == '__main__':
+    sys.exit(main())
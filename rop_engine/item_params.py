@@ -0,0 +1,97 @@
+"""
+Lead time dan jendela permintaan per item dan/atau per kota.
+
+Tabel parameter berisi kolom kunci 'City' dan/atau 'No. Barang' serta kolom
+nilai 'Lead Time' dan/atau 'Jendela' (hari). Sel kunci kosong berarti berlaku
+untuk semua, sel nilai kosong berarti tidak diatur pada baris itu. Untuk setiap
+(City, No. Barang) dipakai baris paling spesifik: (City, No. Barang), lalu
+No. Barang saja, lalu City saja, lalu baris tanpa kunci (semua item), lalu nilai
+bawaan (21 dan 90 hari).
+
+'Lead Time' menentukan horizon ROP sekaligus penjualan aktual pembanding;
+'Jendela' menentukan panjang jendela ADS/std sekaligus periode safety stock.
+"""
+import numpy as np
+import pandas as pd
+
+from .rop import FORECAST_PERIOD_DAYS, LEAD_TIME_DAYS
+
+PARAM_KEYS = ['City', 'No. Barang']
+# Kolom nilai -> nilai bawaan bila tidak diatur
+PARAM_COLUMNS = {'Lead Time': LEAD_TIME_DAYS, 'Jendela': FORECAST_PERIOD_DAYS}
+MAX_PARAM_DAYS = 365
+# Tingkat kunci dari yang paling umum ke yang paling spesifik (yang spesifik menimpa)
+PARAM_LEVELS = [[], ['City'], ['No. Barang'], ['City', 'No. Barang']]
+
+
+class ItemParamsError(ValueError):
+    pass
+
+
+def normalize_item_params(df):
+    """
+    Tabel parameter siap pakai: kunci sebagai teks tanpa spasi ('' = semua),
+    nilai sebagai bilangan bulat 1..365 hari (NaN = tidak diatur).
+    """
+    if not any(col in df.columns for col in PARAM_KEYS):
+        raise ItemParamsError("Kolom kunci ('City' atau 'No. Barang') tidak ditemukan.")
+    if not any(col in df.columns for col in PARAM_COLUMNS):
+        raise ItemParamsError("Kolom parameter ('Lead Time' atau 'Jendela') tidak ditemukan.")
+    params = pd.DataFrame(index=df.index)
+    for col in PARAM_KEYS:
+        if col in df.columns:
+            params[col] = df[col].astype(object).where(df[col].notna(), '').astype(str).str.strip()
+        else:
+            params[col] = ''
+    for col in PARAM_COLUMNS:
+        values = pd.to_numeric(df[col], errors='coerce') if col in df.columns else pd.Series(np.nan, index=df.index)
+        invalid = values.notna() & ((values != values.round()) | (values < 1) | (values > MAX_PARAM_DAYS))
+        if col in df.columns and (invalid.any() or (values.isna() & df[col].notna()).any()):
+            raise ItemParamsError(f"Kolom '{col}' harus berisi bilangan bulat 1-{MAX_PARAM_DAYS} hari.")
+        params[col] = values.astype('Int64')
+    return params.reset_index(drop=True)
+
+
+def read_item_params(fh, file_name):
+    """Membaca tabel parameter dari CSV atau Excel (path atau file-like)."""
+    df = pd.read_csv(fh) if file_name.lower().endswith('.csv') else pd.read_excel(fh)
+    return normalize_item_params(df)
+
+
+def has_item_params(params_df):
+    return params_df is not None and not params_df.empty
+
+
+def param_bounds(params_df):
+    """(jendela terpanjang, lead time terpanjang) yang mungkin dipakai, termasuk nilai bawaan."""
+    bounds = {}
+    for col, default in PARAM_COLUMNS.items():
+        values = params_df[col].dropna() if has_item_params(params_df) else []
+        bounds[col] = max([default] + [int(v) for v in values])
+    return bounds['Jendela'], bounds['Lead Time']
+
+
+def resolve_item_params(items, params_df):
+    """Array 'Lead Time' dan 'Jendela' untuk setiap baris `items` (City, No. Barang)."""
+    resolved = {col: np.full(len(items), default, dtype=np.int64) for col, default in PARAM_COLUMNS.items()}
+    if not has_item_params(params_df) or items.empty:
+        return resolved
+    item_keys = items[PARAM_KEYS].astype(str)
+    is_set = {col: params_df[col] != '' for col in PARAM_KEYS}
+    for keys in PARAM_LEVELS:
+        level = params_df
+        for col in PARAM_KEYS:
+            level = level[is_set[col].loc[level.index] == (col in keys)]
+        for col in PARAM_COLUMNS:
+            rows = level.dropna(subset=[col])
+            if rows.empty:
+                continue
+            if not keys:
+                # Baris tanpa kunci berlaku untuk semua item (baris terakhir yang menang)
+                resolved[col][:] = int(rows[col].iloc[-1])
+                continue
+            rows = rows.drop_duplicates(keys, keep='last')
+            pos = pd.MultiIndex.from_frame(rows[keys]).get_indexer(pd.MultiIndex.from_frame(item_keys[keys]))
+            hit = pos >= 0
+            resolved[col][hit] = rows[col].to_numpy(dtype=np.int64)[pos[hit]]
+    return resolved
@@ -0,0 +1,117 @@
+import hashlib
+import os
+import threading
+import weakref
+from collections import OrderedDict
+
+import pandas as pd
+
+DEFAULT_MEMO_BYTES = int(os.environ.get("ROP_MEMO_MAX_MB", "1024")) * 1024 * 1024
+
+_fingerprints = {}
+_fingerprint_lock = threading.Lock()
+
+
+def frame_fingerprint(df):
+    """
+    Sidik jari isi DataFrame (kolom, dtype, dan hash seluruh nilai).
+
+    Hash dihitung vectorized dengan pd.util.hash_pandas_object dan disimpan per
+    objek frame, sehingga frame yang sama (yang diperlakukan read-only di session)
+    hanya di-hash sekali.
+    """
+    key = id(df)
+    with _fingerprint_lock:
+        cached = _fingerprints.get(key)
+        if cached is not None and cached[0]() is df:
+            return cached[1]
+
+    h = hashlib.sha1()
+    h.update(repr((df.shape, list(map(str, df.columns)), list(map(str, df.dtypes)))).encode())
+    if len(df):
+        h.update(pd.util.hash_pandas_object(df, index=False).to_numpy().tobytes())
+    fingerprint = h.hexdigest()
+
+    try:
+        ref = weakref.ref(df, lambda _, key=key: _fingerprints.pop(key, None))
+    except TypeError:
+        return fingerprint
+    with _fingerprint_lock:
+        _fingerprints[key] = (ref, fingerprint)
+    return fingerprint
+
+
+def object_nbytes(value):
+    """Perkiraan memori sebuah nilai (frame, array, bytes, atau wadah berisi nilai-nilai itu)."""
+    if isinstance(value, pd.DataFrame):
+        return int(value.memory_usage(deep=True).sum())
+    if isinstance(value, pd.Series):
+        return int(value.memory_usage(deep=True))
+    if isinstance(value, (bytes, bytearray)):
+        return len(value)
+    if isinstance(value, dict):
+        return sum(object_nbytes(v) for v in value.values())
+    if isinstance(value, (list, tuple)):
+        return sum(object_nbytes(v) for v in value)
+    return int(getattr(value, 'nbytes', 0) or 0)
+
+
+class LRUMemo:
+    """
+    Memoization LRU dengan batas memori.
+
+    Hasil yang paling lama tidak dipakai dibuang lebih dulu saat total ukurannya
+    melebihi `max_bytes`. Nilai yang dikembalikan dipakai bersama, jadi pemanggil
+    tidak boleh mengubahnya di tempat.
+    """
+
+    def __init__(self, max_bytes=DEFAULT_MEMO_BYTES):
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()
+        self._total = 0
+        self._lock = threading.Lock()
+
+    def get_or_compute(self, key, compute):
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key][0]
+            self.misses += 1
+        value = compute()
+        self.put(key, value)
+        return value
+
+    def put(self, key, value):
+        size = object_nbytes(value)
+        with self._lock:
+            if key in self._entries:
+                self._total -= self._entries.pop(key)[1]
+            if size > self.max_bytes:
+                # Terlalu besar untuk disimpan; tetap dikembalikan ke pemanggil
+                return
+            self._entries[key] = (value, size)
+            self._total += size
+            while self._total > self.max_bytes and self._entries:
+                _, (_, old_size) = self._entries.popitem(last=False)
+                self._total -= old_size
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._total = 0
+
+    def stats(self):
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'entries': len(self._entries),
+                'size_bytes': self._total,
+                'max_bytes': self.max_bytes,
+            }
@@ -0,0 +1,124 @@
+import numpy as np
+import pandas as pd
+
+# --- MAPPING DEPT & KOTA ---
+DEPT_MAPPING = {'B': 'B - JKT', 'C': 'C - PUSAT', 'D': 'D - SMG', 'E': 'E - JOG', 'F': 'F - MLG', 'G': 'G - PROJECT', 'H': 'H - BALI', 'X': 'X'}
+ITC_CUSTOMERS = ['A - CASH', 'AIRPAY INTERNATIONAL INDONESIA', 'TOKOPEDIA']
+CITY_MAPPING = {
+    'A - ITC': 'Surabaya', 'A - RETAIL': 'Surabaya', 'C - PUSAT': 'Surabaya', 'G - PROJECT': 'Surabaya',
+    'B - JKT': 'Jakarta', 'D - SMG': 'Semarang', 'E - JOG': 'Jogja', 'F - MLG': 'Malang', 'H - BALI': 'Bali',
+}
+QUANTITY_COLUMNS = ['Kuantitas', 'Qty']
+# Kolom penjualan yang dipakai pipeline; kolom lain dibuang setelah normalisasi
+SALES_COLUMNS = ['Tgl Faktur', 'City', 'Nama Dept', 'No. Barang', 'Kuantitas']
+CATEGORY_COLUMNS = ['City', 'Nama Dept', 'No. Barang']
+
+
+class SalesSchemaError(ValueError):
+    pass
+
+
+def _clean_codes(series, upper=False):
+    """
+    Membersihkan teks lewat kategori: strip (dan upper) hanya dijalankan pada nilai
+    unik, lalu dipetakan kembali ke setiap baris lewat kode kategori.
+    Nilai kosong diperlakukan sebagai teks 'nan' seperti str(NaN) pada versi lama.
+    """
+    cat = pd.Categorical(series)
+    cats = pd.Index(np.append(cat.categories.astype(str), 'nan')).str.strip()
+    if upper:
+        cats = cats.str.upper()
+    return cats, cat.codes
+
+
+def map_nama_dept_vectorized(df):
+    """Padanan vectorized dari map_nama_dept untuk seluruh frame."""
+    if 'Dept.' in df.columns:
+        dept_cats, dept_codes = _clean_codes(df['Dept.'], upper=True)
+    else:
+        dept_cats, dept_codes = pd.Index(['']), np.zeros(len(df), dtype=np.int8)
+    if 'Nama Pelanggan' in df.columns:
+        pel_cats, pel_codes = _clean_codes(df['Nama Pelanggan'], upper=True)
+    else:
+        pel_cats, pel_codes = pd.Index(['']), np.zeros(len(df), dtype=np.int8)
+
+    dept_names = np.asarray(dept_cats.map(lambda d: DEPT_MAPPING.get(d, 'X')), dtype=object)
+    is_dept_a = np.asarray(dept_cats == 'A')[dept_codes]
+    is_itc = np.asarray(pel_cats.isin(ITC_CUSTOMERS))[pel_codes]
+    nama_dept = dept_names[dept_codes]
+    nama_dept = np.where(is_dept_a, np.where(is_itc, 'A - ITC', 'A - RETAIL'), nama_dept)
+    return pd.Series(nama_dept, index=df.index, dtype=object)
+
+
+def _parse_dates(series):
+    """'Tgl Faktur' ke datetime; kolom kategori (hasil read_sales_bytes) cukup di-parse per nilai unik."""
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        dates = pd.DatetimeIndex(pd.to_datetime(series.cat.categories, errors='coerce'))
+        codes = series.cat.codes.to_numpy()
+        values = dates.take(codes, allow_fill=True, fill_value=pd.NaT) if len(dates) else pd.DatetimeIndex([pd.NaT] * len(codes))
+        return pd.Series(values, index=series.index)
+    return pd.to_datetime(series, errors='coerce')
+
+
+def map_city_vectorized(nama_dept):
+    return nama_dept.map(CITY_MAPPING).fillna('Others')
+
+
+def normalize_sales(penjualan_df):
+    """
+    Tahap normalisasi data penjualan yang dijalankan sekali saat data dimuat.
+
+    Menghasilkan frame siap pakai untuk halaman analisis: 'No. Barang' sudah
+    berupa teks tanpa spasi, kolom kuantitas bernama 'Kuantitas', 'Nama Dept' dan
+    'City' sudah dipetakan (baris 'Others' dibuang), dan 'Tgl Faktur' sudah berupa
+    datetime. Frame dikembalikan dalam bentuk ringkas (lihat compact_sales).
+    """
+    quantity_col = next((c for c in QUANTITY_COLUMNS if c in penjualan_df.columns), None)
+    if quantity_col is None:
+        raise SalesSchemaError("Kolom kuantitas ('Qty' atau 'Kuantitas') tidak ditemukan.")
+    if 'Tgl Faktur' not in penjualan_df.columns:
+        raise SalesSchemaError("Kolom 'Tgl Faktur' tidak ditemukan.")
+    if 'No. Barang' not in penjualan_df.columns:
+        raise SalesSchemaError("Kolom 'No. Barang' tidak ditemukan.")
+
+    df = penjualan_df.rename(columns={quantity_col: 'Kuantitas'}) if quantity_col != 'Kuantitas' else penjualan_df.copy()
+    barang_cats, barang_codes = _clean_codes(df['No. Barang'])
+    df['No. Barang'] = np.asarray(barang_cats, dtype=object)[barang_codes]
+    df['Nama Dept'] = map_nama_dept_vectorized(df)
+    df['City'] = map_city_vectorized(df['Nama Dept'])
+    df = df[df['City'] != 'Others']
+    df['Tgl Faktur'] = _parse_dates(df['Tgl Faktur'])
+    df = df.dropna(subset=['Tgl Faktur', 'City'])
+    return compact_sales(df)
+
+
+def _downcast_quantity(quantity):
+    """Kuantitas bulat tanpa nilai kosong disimpan sebagai integer terkecil yang cukup."""
+    if not pd.api.types.is_numeric_dtype(quantity) or pd.api.types.is_bool_dtype(quantity):
+        return quantity
+    values = quantity.to_numpy()
+    if pd.api.types.is_float_dtype(quantity) and not (np.isfinite(values).all() and (values == np.round(values)).all()):
+        return quantity
+    return pd.to_numeric(quantity.astype(np.int64), downcast='integer')
+
+
+def compact_sales(df):
+    """
+    Representasi ringkas data penjualan untuk disimpan di session: hanya kolom
+    SALES_COLUMNS, City/Nama Dept/No. Barang sebagai kategori, kuantitas sebagai
+    integer kecil, dan 'Tgl Faktur' datetime64. Frame ini dipakai bersama oleh
+    semua halaman dan diperlakukan read-only.
+    """
+    compact = pd.DataFrame({col: df[col] for col in SALES_COLUMNS if col in df.columns}).reset_index(drop=True)
+    for col in CATEGORY_COLUMNS:
+        if col in compact.columns:
+            compact[col] = compact[col].astype('category')
+    compact['Kuantitas'] = _downcast_quantity(compact['Kuantitas'])
+    return compact
+
+
+def normalize_produk(produk_df):
+    df = produk_df.copy()
+    if 'No. Barang' in df.columns:
+        df['No. Barang'] = df['No. Barang'].astype(str).str.strip()
+    return df
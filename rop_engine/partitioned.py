@@ -0,0 +1,111 @@
+"""
+Mode terpartisi untuk data penjualan yang terlalu besar untuk diproses sekaligus.
+
+Alih-alih satu frame (semua item x semua hari) untuk seluruh kota, data dialirkan
+per kota dan per potongan SKU melalui tahap rolling, ABC, dan ROP. Setiap potongan
+bisa langsung ditulis ke disk (parquet), sehingga puncak memori ditentukan oleh
+`chunk_rows` dan matriks penjualan harian satu kota, bukan oleh ukuran hasil total.
+"""
+import glob
+import os
+
+import numpy as np
+import pandas as pd
+
+from .file_cache import parquet_safe
+from .pivots import pivot_sheet_name
+from .profiling import profile_stage
+from .item_params import has_item_params, param_bounds
+from .rolling import (
+    ABC_EVERY, abc_avg_ads, analysis_dates, assemble_rolling_frame, build_sales_matrix, classify_abc, classify_abc_by_date,
+    item_rolling_stats, rolling_stats,
+)
+from .rop import apply_rop_method
+
+# Jumlah baris hasil (item x hari) maksimum per potongan
+DEFAULT_CHUNK_ROWS = int(os.environ.get("ROP_PARTITION_ROWS", "1000000"))
+
+
+def iter_rop_chunks(penjualan_df, produk_df, start_date, end_date, method, chunk_rows=DEFAULT_CHUNK_ROWS, profiler=None,
+                    abc_mode='rentang', item_params=None):
+    """
+    Menghasilkan (kota, potongan hasil ROP) satu per satu.
+
+    Klasifikasi ABC per kota butuh rata-rata ADS semua item di kota itu, jadi
+    setiap kota dilalui dua kali: lintasan pertama hanya menghitung rata-rata ADS
+    per potongan, lintasan kedua membangun frame hasil per potongan. Statistik
+    rolling dihitung per baris item sehingga hasil gabungan semua potongan sama
+    persis dengan compute_rolling_frame + apply_rop_method. Pada mode ABC per tanggal
+    ('harian'/'mingguan') lintasan pertama menghasilkan kode kelas per (item, hari), satu byte per baris,
+    dengan skor dan pengurutan per blok tanggal berisi sekitar `chunk_rows` baris.
+    `item_params` sama dengan compute_rolling_frame.
+    """
+    date_range_full, out_cols = analysis_dates(start_date, end_date, *param_bounds(item_params))
+    items_per_chunk = max(1, chunk_rows // max(len(out_cols), 1))
+
+    for city, city_sales in penjualan_df.groupby('City', observed=True, sort=True):
+        with profile_stage(profiler, 'matriks_penjualan', rows=len(city_sales)):
+            items, matrix = build_sales_matrix(city_sales, date_range_full)
+        if items.empty:
+            continue
+        slices = [slice(start, start + items_per_chunk) for start in range(0, len(items), items_per_chunk)]
+
+        with profile_stage(profiler, 'klasifikasi_abc', rows=len(items)):
+            if abc_mode in ABC_EVERY:
+                # Peringkat per tanggal butuh semua item kota, jadi dipotong per blok tanggal
+                block_cols = max(1, chunk_rows // len(items))
+                abc = classify_abc_by_date(items, matrix, out_cols, every=ABC_EVERY[abc_mode], block_cols=block_cols)
+                n_out = len(out_cols)
+            elif has_item_params(item_params):
+                abc = classify_abc(items, np.concatenate([abc_avg_ads(matrix[sl], out_cols) for sl in slices]))
+                n_out = 1
+            else:
+                abc = classify_abc(items, np.concatenate([rolling_stats(matrix[sl], out_cols[:0])['avg_ads'] for sl in slices]))
+                n_out = 1
+
+        for sl in slices:
+            with profile_stage(profiler, 'rolling_stats', rows=matrix[sl].size):
+                stats = item_rolling_stats(items.iloc[sl], matrix[sl], out_cols, item_params)
+                stats.pop('avg_ads', None)
+            with profile_stage(profiler, 'gabung_abc_produk') as info:
+                chunk_abc = abc[sl.start * n_out:sl.stop * n_out]
+                chunk = assemble_rolling_frame(items.iloc[sl], matrix[sl], stats, chunk_abc, date_range_full, out_cols, produk_df)
+                info['rows'] = len(chunk)
+            with profile_stage(profiler, 'apply_rop', rows=len(chunk)):
+                yield str(city), apply_rop_method(chunk, method)
+
+
+def spill_path(out_dir, city, part):
+    return os.path.join(out_dir, f"{pivot_sheet_name(city)}-{part:05d}.parquet")
+
+
+def spill_chunk(chunk, out_dir, city, part):
+    path = spill_path(out_dir, city, part)
+    parquet_safe(chunk).to_parquet(path, index=False)
+    return path
+
+
+def spill_rop_chunks(chunks, out_dir):
+    """
+    Menulis setiap potongan (kota, frame) ke parquet terpisah di `out_dir` begitu
+    selesai dihitung, lalu membuangnya dari memori. Mengembalikan manifest
+    (satu dict per file: City, part, rows, path).
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    parts = {}
+    manifest = []
+    for city, chunk in chunks:
+        part = parts.get(city, 0)
+        parts[city] = part + 1
+        path = spill_chunk(chunk, out_dir, city, part)
+        manifest.append({'City': city, 'part': part, 'rows': len(chunk), 'path': path})
+    return manifest
+
+
+def read_spilled(out_dir, city=None, columns=None):
+    """Membaca kembali hasil yang sudah ditulis spill_rop_chunks (semua kota atau satu kota)."""
+    pattern = f"{pivot_sheet_name(city)}-*.parquet" if city is not None else "*.parquet"
+    paths = sorted(glob.glob(os.path.join(out_dir, pattern)))
+    if not paths:
+        return pd.DataFrame()
+    return pd.concat([pd.read_parquet(path, columns=columns) for path in paths], ignore_index=True)
@@ -0,0 +1,130 @@
+from html import escape
+
+import numpy as np
+import pandas as pd
+
+PIVOT_INDEX_COLS = ['No. Barang', 'Nama Barang', 'BRAND Barang', 'Kategori Barang']
+MISSING_LABEL = 'Data Tidak Ditemukan'
+
+
+def pivot_sheet_name(city):
+    return f"ROP_{city.replace(' ', '_')}"
+
+
+def city_pivot(city_df):
+    """
+    Tabel ROP & SO satu kota: baris = produk, kolom = (Tanggal, ROP/SO).
+    """
+    city_df = city_df[PIVOT_INDEX_COLS + ['Date', 'ROP', 'SO']].copy()
+    for col in PIVOT_INDEX_COLS:
+        city_df[col] = city_df[col].fillna(MISSING_LABEL)
+    if pd.api.types.is_datetime64_any_dtype(city_df['Date']):
+        city_df['Date'] = city_df['Date'].dt.strftime('%Y-%m-%d')
+    pivot_city = city_df.pivot_table(
+        index=PIVOT_INDEX_COLS,
+        columns='Date',
+        values=['ROP', 'SO']
+    ).fillna(0).astype(int)
+    pivot_city.columns = pivot_city.columns.swaplevel(0, 1)
+    pivot_city.sort_index(axis=1, level=0, inplace=True)
+    return pivot_city
+
+
+# Warna gradien per metrik, sama seperti tampilan Styler sebelumnya
+PIVOT_CMAPS = {'ROP': 'Greens', 'SO': 'Blues'}
+PIVOT_SORT_OPTIONS = {
+    'rop': "Total ROP (terbesar)",
+    'so': "Total SO (terbesar)",
+    'barang': "No. Barang",
+}
+TEXT_COLOR_THRESHOLD = 0.408
+
+
+def city_pivot_view(city_df):
+    """
+    Pivot satu kota beserta ringkasan yang dipakai untuk paginasi dan pewarnaan:
+    total ROP/SO per produk (untuk urutan dan top-N) serta nilai min/max per
+    kolom (untuk gradien), sehingga setiap halaman bisa digambar tanpa menghitung
+    ulang apa pun dari seluruh pivot.
+    """
+    pivot = city_pivot(city_df)
+    values = pivot.to_numpy()
+    metrics = pivot.columns.get_level_values(1)
+    return {
+        'pivot': pivot,
+        'total_rop': values[:, metrics == 'ROP'].sum(axis=1),
+        'total_so': values[:, metrics == 'SO'].sum(axis=1),
+        'col_min': values.min(axis=0) if len(values) else np.zeros(values.shape[1]),
+        'col_max': values.max(axis=0) if len(values) else np.zeros(values.shape[1]),
+    }
+
+
+def pivot_page_rows(view, sort_by='rop', top_n=0, page=1, page_size=50):
+    """
+    Posisi baris pivot untuk satu halaman. Top-N selalu diambil menurut total
+    ROP, lalu hasilnya diurutkan sesuai `sort_by`. Mengembalikan (posisi baris,
+    jumlah baris setelah top-N, jumlah halaman).
+    """
+    n_rows = len(view['pivot'])
+    rows = np.arange(n_rows)
+    if top_n and top_n < n_rows:
+        rows = np.sort(np.argsort(-view['total_rop'], kind='stable')[:top_n])
+    if sort_by == 'rop':
+        rows = rows[np.argsort(-view['total_rop'][rows], kind='stable')]
+    elif sort_by == 'so':
+        rows = rows[np.argsort(-view['total_so'][rows], kind='stable')]
+    n_pages = max(1, -(-len(rows) // page_size))
+    page = min(max(1, page), n_pages)
+    return rows[(page - 1) * page_size:page * page_size], len(rows), n_pages
+
+
+def _gradient_css(values, col_min, col_max, cmap_name):
+    """
+    CSS latar + warna teks per sel, setara Styler.background_gradient (skala per
+    kolom), tetapi memakai min/max yang sudah dihitung untuk seluruh pivot.
+    """
+    from matplotlib import colormaps
+
+    span = col_max - col_min
+    norm = np.where(span > 0, (values - col_min) / np.where(span > 0, span, 1), 0.0)
+    rgba = colormaps[cmap_name](norm)
+    rgb = rgba[..., :3]
+    linear = np.where(rgb <= 0.04045, rgb / 12.92, ((rgb + 0.055) / 1.055) ** 2.4)
+    luminance = linear @ np.array([0.2126, 0.7152, 0.0722])
+    channels = np.round(rgb * 255).astype(int).reshape(-1, 3)
+    dark = (luminance < TEXT_COLOR_THRESHOLD).ravel()
+    css = [
+        f"background-color: #{r:02x}{g:02x}{b:02x};color: {'#f1f1f1' if d else '#000000'};"
+        for (r, g, b), d in zip(channels.tolist(), dark.tolist())
+    ]
+    return np.array(css, dtype=object).reshape(values.shape)
+
+
+def pivot_html(view, rows):
+    """Tabel HTML untuk baris-baris terpilih dari pivot, dengan gradien ROP (hijau) dan SO (biru)."""
+    pivot = view['pivot']
+    page = pivot.iloc[rows]
+    values = page.to_numpy()
+    metrics = pivot.columns.get_level_values(1)
+    css = np.empty(values.shape, dtype=object)
+    for metric, cmap_name in PIVOT_CMAPS.items():
+        cols = np.flatnonzero(metrics == metric)
+        if len(cols) and len(values):
+            css[:, cols] = _gradient_css(values[:, cols], view['col_min'][cols], view['col_max'][cols], cmap_name)
+
+    n_index = pivot.index.nlevels
+    dates = pivot.columns.get_level_values(0)
+    head = ['<table class="rop-pivot"><thead><tr>']
+    head += [f'<th rowspan="2">{escape(str(name))}</th>' for name in pivot.index.names]
+    head += [f'<th colspan="2">{escape(str(date))}</th>' for date in dates[::2]]
+    head.append('</tr><tr>')
+    head += [f'<th>{escape(str(metric))}</th>' for metric in metrics]
+    head.append('</tr></thead><tbody>')
+
+    body = []
+    for keys, row_values, row_css in zip(page.index, values, css):
+        keys = keys if n_index > 1 else (keys,)
+        cells = ''.join(f'<th>{escape(str(k))}</th>' for k in keys)
+        cells += ''.join(f'<td style="{c}">{v}</td>' for v, c in zip(row_values.tolist(), row_css))
+        body.append(f'<tr>{cells}</tr>')
+    return ''.join(head) + ''.join(body) + '</tbody></table>'
@@ -0,0 +1,96 @@
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from datetime import datetime
+
+import pandas as pd
+
+DEFAULT_PROFILE_LOG = os.environ.get("ROP_PROFILE_LOG", os.path.join("logs", "rop_profile.jsonl"))
+
+
+def rss_bytes():
+    """Memori resident proses saat ini (Linux: /proc/self/statm), atau None bila tidak tersedia."""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+class RunProfiler:
+    """
+    Pencatat waktu, jumlah baris, dan selisih memori per tahap dalam satu run.
+
+    Tahap yang sama boleh dicatat berkali-kali (mis. unduhan per file dari banyak
+    thread); waktu dan baris dijumlahkan, sehingga untuk tahap paralel angka
+    detiknya adalah total waktu kerja semua worker.
+    """
+
+    def __init__(self, run_name, **metadata):
+        self.run_name = run_name
+        self.metadata = metadata
+        self.started_at = datetime.now().isoformat(timespec='seconds')
+        self.stages = {}
+        self._lock = threading.Lock()
+
+    def record(self, name, seconds, rows=None, mem_delta=None):
+        with self._lock:
+            entry = self.stages.setdefault(name, {'seconds': 0.0, 'calls': 0, 'rows': None, 'mem_delta_mb': None})
+            entry['seconds'] += seconds
+            entry['calls'] += 1
+            if rows is not None:
+                entry['rows'] = (entry['rows'] or 0) + int(rows)
+            if mem_delta is not None:
+                entry['mem_delta_mb'] = round((entry['mem_delta_mb'] or 0) + mem_delta / 1024 ** 2, 2)
+
+    @contextmanager
+    def stage(self, name, rows=None):
+        """
+        Context manager untuk satu tahap. Jumlah baris bisa diisi belakangan lewat
+        `info['rows'] = ...` di dalam blok.
+        """
+        info = {'rows': rows}
+        mem_before = rss_bytes()
+        t0 = time.perf_counter()
+        try:
+            yield info
+        finally:
+            mem_after = rss_bytes()
+            mem_delta = mem_after - mem_before if mem_before is not None and mem_after is not None else None
+            self.record(name, time.perf_counter() - t0, info['rows'], mem_delta)
+
+    def to_record(self):
+        return {
+            'run': self.run_name,
+            'started_at': self.started_at,
+            'total_seconds': round(sum(s['seconds'] for s in self.stages.values()), 3),
+            'rss_mb': round(rss_bytes() / 1024 ** 2, 1) if rss_bytes() is not None else None,
+            **self.metadata,
+            'stages': self.stages,
+        }
+
+    def append_jsonl(self, path=DEFAULT_PROFILE_LOG):
+        """Menambahkan satu baris JSON per run ke log lokal untuk analisis tren."""
+        if not self.stages:
+            return
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(path, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(self.to_record(), default=str) + "\n")
+
+
+def profile_stage(profiler, name, rows=None):
+    """profiler.stage(...) bila ada profiler, selain itu context kosong."""
+    return profiler.stage(name, rows) if profiler is not None else nullcontext({'rows': rows})
+
+
+def profile_frame(record):
+    """Tabel ringkas dari satu record profil (hasil RunProfiler.to_record)."""
+    return pd.DataFrame([
+        {'Tahap': name, 'Detik': round(stage['seconds'], 3), 'Panggilan': stage['calls'],
+         'Baris': stage['rows'], 'Δ Memori (MB)': stage['mem_delta_mb']}
+        for name, stage in record['stages'].items()
+    ], columns=['Tahap', 'Detik', 'Panggilan', 'Baris', 'Δ Memori (MB)']).set_index('Tahap')
@@ -0,0 +1,133 @@
+import os
+from importlib.util import find_spec
+
+import numpy as np
+import pandas as pd
+
+from .normalize import QUANTITY_COLUMNS, SalesSchemaError
+
+PRODUK_COLUMNS = ['No. Barang', 'BRAND Barang', 'Kategori Barang', 'Nama Barang']
+SALES_EXTENSIONS = ('.csv', '.xlsx', '.xls')
+# Kolom ekspor penjualan yang dibaca; kolom lain tidak di-parse sama sekali
+SALES_SOURCE_COLUMNS = ['Tgl Faktur', 'Dept.', 'Nama Pelanggan', 'No. Barang'] + QUANTITY_COLUMNS
+SALES_REQUIRED_COLUMNS = ['Tgl Faktur', 'No. Barang']
+# Kolom kode dibaca sebagai teks apa adanya (mis. '007' tidak menjadi 7 atau 7.0)
+SALES_TEXT_COLUMNS = ['Dept.', 'Nama Pelanggan', 'No. Barang']
+# Format 'Tgl Faktur' (mis. '%d/%m/%Y'); bila kosong, tanggal di-parse saat normalisasi
+SALES_DATE_FORMAT = os.environ.get("ROP_SALES_DATE_FORMAT") or None
+CSV_CHUNK_ROWS = int(os.environ.get("ROP_CSV_CHUNK_ROWS", "500000"))
+# Backend xlsx yang lebih cepat dipakai bila terpasang; jika tidak, default pandas
+EXCEL_ENGINE = 'calamine' if find_spec('python_calamine') else None
+
+
+def validate_sales_columns(columns):
+    """Memastikan satu file punya kolom wajib; SalesSchemaError menyebut semua kolom yang hilang."""
+    missing = [f"'{col}'" for col in SALES_REQUIRED_COLUMNS if col not in columns]
+    if not any(col in columns for col in QUANTITY_COLUMNS):
+        missing.append(' atau '.join(f"'{col}'" for col in QUANTITY_COLUMNS))
+    if missing:
+        raise SalesSchemaError(f"Kolom wajib tidak ditemukan: {', '.join(missing)}.")
+
+
+def _compact_chunk(df):
+    """Kolom teks satu potongan disimpan sebagai kategori; tanggal di-parse bila formatnya ditentukan."""
+    validate_sales_columns(df.columns)
+    for col in SALES_TEXT_COLUMNS:
+        if col in df.columns:
+            df[col] = df[col].astype('category')
+    if not pd.api.types.is_datetime64_any_dtype(df['Tgl Faktur']):
+        # Tanggal teks (CSV): hanya nilai unik yang di-parse
+        df['Tgl Faktur'] = df['Tgl Faktur'].astype('category')
+        if SALES_DATE_FORMAT:
+            df['Tgl Faktur'] = pd.to_datetime(df['Tgl Faktur'], format=SALES_DATE_FORMAT, errors='coerce')
+    return df
+
+
+def _text_categories(series):
+    """Kategori dengan label teks (str per nilai unik); label yang sama setelah str digabung jadi satu."""
+    inverse, labels = pd.factorize(series.cat.categories.astype(str))
+    codes = np.append(inverse, -1)[series.cat.codes.to_numpy()]
+    return pd.Series(pd.Categorical.from_codes(codes, categories=labels), index=series.index, name=series.name)
+
+
+def _concat_categorical(frames, text_columns=()):
+    """
+    Menggabungkan frame; kolom yang berupa kategori di semua frame yang memilikinya
+    digabung lewat union kategori agar tetap ringkas (frame tanpa kolom itu diisi
+    kosong). Kategori dengan tipe label berbeda antar frame (mis. kolom kosong
+    semua, atau frame dari cache parquet), serta kolom `text_columns`, disamakan
+    dulu sebagai teks.
+    """
+    columns = list(dict.fromkeys(col for frame in frames for col in frame.columns))
+    categorical = [col for col in columns
+                   if all(isinstance(frame[col].dtype, pd.CategoricalDtype) for frame in frames if col in frame.columns)]
+    df = pd.concat([frame.drop(columns=categorical, errors='ignore') for frame in frames], ignore_index=True)
+    for col in categorical:
+        present = next(frame[col] for frame in frames if col in frame.columns)
+        empty = present.cat.categories[:0]
+        parts = [frame[col] if col in frame.columns
+                 else pd.Series(pd.Categorical.from_codes(np.full(len(frame), -1), categories=empty), name=col)
+                 for frame in frames]
+        if col in text_columns or len({part.cat.categories.dtype for part in parts}) > 1:
+            parts = [_text_categories(part) for part in parts]
+        df[col] = pd.api.types.union_categoricals(parts)
+    return df[columns]
+
+
+def _concat_chunks(chunks):
+    """Menggabungkan potongan CSV; kolom kategori digabung lewat union kategori agar tetap ringkas."""
+    if len(chunks) == 1:
+        return chunks[0]
+    return _concat_categorical(chunks)
+
+
+def read_sales_bytes(fh, file_name, chunk_rows=CSV_CHUNK_ROWS, **kwargs):
+    """
+    Membaca satu file ekspor penjualan (CSV atau Excel) dari path atau file-like.
+
+    Hanya SALES_SOURCE_COLUMNS yang dibaca; kolom kode dan tanggal teks disimpan
+    sebagai kategori. CSV dibaca per `chunk_rows` baris dan setiap potongan
+    diringkas begitu dibaca, sehingga file besar tidak pernah ada dalam bentuk teks
+    mentah seluruhnya. File tanpa kolom wajib langsung ditolak dengan SalesSchemaError.
+    """
+    options = {
+        'usecols': lambda col: col in SALES_SOURCE_COLUMNS,
+        'dtype': {col: str for col in SALES_TEXT_COLUMNS},
+    }
+    options.update(kwargs)
+    if file_name.lower().endswith('.csv'):
+        # Tanggal CSV juga dibaca sebagai teks: potongan yang tanggalnya kosong semua (mis. baris
+        # penutup ekspor) tidak boleh menjadi float, karena kategorinya harus sama antar potongan
+        options['dtype'] = {'Tgl Faktur': str, **options['dtype']}
+        with pd.read_csv(fh, chunksize=chunk_rows, **options) as reader:
+            chunks = [_compact_chunk(chunk) for chunk in reader]
+        if not chunks:
+            # File tanpa baris data: header tetap divalidasi
+            if hasattr(fh, 'seek'):
+                fh.seek(0)
+            return _compact_chunk(pd.read_csv(fh, nrows=0, **options))
+        return _concat_chunks(chunks)
+    if EXCEL_ENGINE is not None:
+        options.setdefault('engine', EXCEL_ENGINE)
+    return _compact_chunk(pd.read_excel(fh, **options))
+
+
+def concat_sales_frames(dfs):
+    """
+    Menggabungkan frame penjualan per file. Kolom kode dan tanggal teks yang
+    berupa kategori di semua file (hasil read_sales_bytes) tetap kategori setelah
+    digabung; 'No. Barang' disamakan sebagai teks (sel kosong tetap kosong,
+    normalize_sales memperlakukannya sebagai 'nan' seperti sebelumnya).
+    """
+    df_penjualan = _concat_categorical(dfs, text_columns=['No. Barang'])
+    barang = df_penjualan.get('No. Barang')
+    if barang is not None and not isinstance(barang.dtype, pd.CategoricalDtype):
+        df_penjualan['No. Barang'] = barang.astype(str)
+    return df_penjualan
+
+
+def parse_produk_excel(fh, sheet_name, skip_rows):
+    """Membaca workbook produk referensi: 4 kolom pertama setelah baris header dilewati."""
+    df = pd.read_excel(fh, sheet_name=sheet_name, skiprows=skip_rows, usecols=[0, 1, 2, 3])
+    df.columns = PRODUK_COLUMNS
+    return df
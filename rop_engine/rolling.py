@@ -0,0 +1,339 @@
+import numpy as np
+import pandas as pd
+
+from .item_params import has_item_params, param_bounds, resolve_item_params
+from .profiling import profile_stage
+
+# Parameter jendela yang dipakai oleh preprocess_sales_data
+ROLLING_WINDOW_DAYS = 90
+LOOKAHEAD_DAYS = 21
+ITEM_KEYS = ['City', 'No. Barang']
+ABC_LABELS = ['A', 'B', 'C', 'D']
+# Cara klasifikasi ABC: satu kelas per item dari seluruh rentang (perilaku lama,
+# ikut memakai 21 hari setelah tanggal akhir) atau kelas per tanggal/minggu dari
+# penjualan sampai tanggal itu saja
+ABC_MODES = {
+    'rentang': "Satu kelas per item dari seluruh rentang",
+    'harian': "Per tanggal, dari penjualan sampai tanggal itu",
+    'mingguan': "Per minggu, dari penjualan sampai awal minggu itu",
+}
+DEFAULT_ABC_MODE = 'harian'
+# Mode ABC per tanggal -> kelas dihitung ulang setiap berapa hari keluaran
+ABC_EVERY = {'harian': 1, 'mingguan': 7}
+
+
+def build_sales_matrix(penjualan_df, date_range):
+    """
+    Menyusun matriks penjualan harian berukuran (jumlah item x jumlah hari).
+
+    Setiap baris adalah satu pasangan (City, No. Barang), diurutkan seperti hasil
+    groupby. Penjualan di luar `date_range` tidak dimasukkan ke matriks, tetapi
+    item-nya tetap ikut (sama seperti cross join pada versi lama).
+    Mengembalikan tuple (items_df, matrix).
+    """
+    daily_sales = penjualan_df.groupby(['Tgl Faktur'] + ITEM_KEYS, observed=True)['Kuantitas'].sum().reset_index()
+    daily_sales['Tgl Faktur'] = pd.to_datetime(daily_sales['Tgl Faktur'])
+
+    grouped = daily_sales.groupby(ITEM_KEYS, sort=True, observed=True)
+    items = grouped.size().index.to_frame(index=False)
+    # Kunci kategori (data penjualan ringkas) dikembalikan ke teks biasa untuk frame hasil
+    for col in ITEM_KEYS:
+        if isinstance(items[col].dtype, pd.CategoricalDtype):
+            items[col] = items[col].astype(items[col].cat.categories.dtype)
+    item_codes = grouped.ngroup().to_numpy()
+
+    matrix = np.zeros((len(items), len(date_range)), dtype=np.float64)
+    if items.empty:
+        return items, matrix
+
+    # Hanya tanggal tepat tengah malam di dalam rentang yang cocok dengan date_range
+    dates = daily_sales['Tgl Faktur']
+    in_range = (dates >= date_range[0]) & (dates <= date_range[-1]) & (dates == dates.dt.normalize())
+    in_range = in_range.to_numpy()
+    day_idx = ((dates[in_range] - date_range[0]) // pd.Timedelta(days=1)).to_numpy()
+    qty = daily_sales['Kuantitas'].to_numpy(dtype=np.float64)[in_range]
+    np.add.at(matrix, (item_codes[in_range], day_idx), qty)
+    return items, matrix
+
+
+def prefix_sums(matrix):
+    """Prefix sum penjualan dan kuadratnya per item: kolom k = jumlah hari [0, k)."""
+    n_items, n_days = matrix.shape
+    prefix = np.zeros((n_items, n_days + 1), dtype=np.float64)
+    np.cumsum(matrix, axis=1, out=prefix[:, 1:])
+    prefix_sq = np.zeros((n_items, n_days + 1), dtype=np.float64)
+    np.cumsum(matrix * matrix, axis=1, out=prefix_sq[:, 1:])
+    return prefix, prefix_sq
+
+
+def window_std(sales, sum_sq, count):
+    """Std sampel (ddof=1) dari jumlah & jumlah kuadrat jendela; jendela satu hari menghasilkan 0 seperti fillna(0)."""
+    count = np.asarray(count, dtype=np.float64)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        var = (count * sum_sq - sales * sales) / (count * (count - 1))
+    var = np.where(count > 1, var, 0.0)
+    return np.sqrt(np.clip(var, 0.0, None))
+
+
+def rolling_stats(matrix, out_cols=None, window=ROLLING_WINDOW_DAYS, lookahead=LOOKAHEAD_DAYS):
+    """
+    Menghitung statistik rolling semua item sekaligus dengan prefix sum.
+
+    Hasilnya identik dengan rolling(window, min_periods=1).sum()/.std().fillna(0)
+    dan reversed rolling(lookahead, min_periods=0).sum() per item. `out_cols`
+    membatasi kolom (hari) yang dikembalikan; ADS rata-rata untuk klasifikasi ABC
+    tetap dihitung dari seluruh rentang. `window` dan `lookahead` boleh berupa
+    array per item (lihat item_params); biayanya sama dengan jendela tunggal,
+    tetapi 'avg_ads' tidak ikut dihitung (pakai abc_avg_ads).
+    """
+    n_days = matrix.shape[1]
+    if out_cols is None:
+        out_cols = np.arange(n_days)
+
+    prefix, prefix_sq = prefix_sums(matrix)
+    if np.ndim(window) or np.ndim(lookahead):
+        return item_window_stats(prefix, prefix_sq, out_cols, window, lookahead)
+
+    hi_all = np.arange(1, n_days + 1)
+    lo_all = np.maximum(hi_all - window, 0)
+    sales_all = prefix[:, hi_all] - prefix[:, lo_all]
+    # Dijumlahkan dulu baru dibagi agar item dengan ADS sama persis tetap seri
+    ads_mean = sales_all.sum(axis=1) / (window * max(n_days, 1))
+
+    hi = hi_all[out_cols]
+    lo = lo_all[out_cols]
+    sales = sales_all[:, out_cols]
+    std = window_std(sales, prefix_sq[:, hi] - prefix_sq[:, lo], hi - lo)
+
+    ahead_hi = np.minimum(np.asarray(out_cols) + lookahead, n_days)
+    forward = prefix[:, ahead_hi] - prefix[:, out_cols]
+
+    return {
+        'sales_90d': sales,
+        'std_dev_90d': std,
+        'ADS': sales / window,
+        'Penjualan_Aktual_21_Hari': forward,
+        'avg_ads': ads_mean,
+    }
+
+
+def item_window_stats(prefix, prefix_sq, out_cols, window, lookahead):
+    """
+    Statistik rolling dengan panjang jendela dan lookahead per item: setiap
+    jumlah jendela tetap satu selisih prefix sum, hanya batas bawah (atau atas)
+    yang diambil per item lewat take_along_axis.
+    """
+    n_items, n_days = prefix.shape[0], prefix.shape[1] - 1
+    out_cols = np.asarray(out_cols)
+    window = np.broadcast_to(np.asarray(window, dtype=np.int64), (n_items,))[:, None]
+    lookahead = np.broadcast_to(np.asarray(lookahead, dtype=np.int64), (n_items,))[:, None]
+
+    hi = out_cols + 1
+    lo = np.maximum(hi[None, :] - window, 0)
+    sales = prefix[:, hi] - np.take_along_axis(prefix, lo, axis=1)
+    std = window_std(sales, prefix_sq[:, hi] - np.take_along_axis(prefix_sq, lo, axis=1), hi[None, :] - lo)
+    ahead_hi = np.minimum(out_cols[None, :] + lookahead, n_days)
+    forward = np.take_along_axis(prefix, ahead_hi, axis=1) - prefix[:, out_cols]
+    return {
+        'sales_90d': sales,
+        'std_dev_90d': std,
+        'ADS': sales / window,
+        'Penjualan_Aktual_21_Hari': forward,
+    }
+
+
+def _kahan_cumsum(values):
+    """
+    Jumlah kumulatif per kolom dengan penjumlahan Kahan, urutan operasinya sama
+    dengan groupby().cumsum()/sum() pandas, agar batas 70/90% jatuh persis sama.
+    Loop berjalan per baris (item), setiap langkah vectorized atas semua kolom.
+    """
+    cum = np.empty_like(values)
+    total = np.zeros(values.shape[1:], dtype=values.dtype)
+    compensation = np.zeros_like(total)
+    for i, row in enumerate(values):
+        y = row - compensation
+        t = total + y
+        compensation = t - total - y
+        total = t
+        cum[i] = t
+    return cum
+
+
+def abc_rank_codes(city_codes, scores):
+    """
+    Kode ABC (0..3 = A..D, -1 = di luar bin) untuk setiap kolom `scores`
+    (item x k) sekaligus. Per kota dan per kolom, item diurutkan menurut skor
+    menurun (seri tetap pada urutan item), lalu persentase kumulatif dipotong di
+    70/90/101%; kota dengan total skor 0 menjadi D.
+    """
+    scores = np.asarray(scores, dtype=np.float64)
+    codes = np.full(scores.shape, ABC_LABELS.index('D'), dtype=np.int8)
+    for city in np.unique(city_codes):
+        rows = np.flatnonzero(city_codes == city)
+        block = scores[rows]
+        order = np.argsort(-block, axis=0, kind='stable')
+        cum = _kahan_cumsum(np.take_along_axis(block, order, axis=0))
+        total = cum[-1]
+        perc = 100 * cum / np.where(total != 0, total, 1)
+        # Sama dengan pd.cut(bins=[-1, 70, 90, 101], right=True)
+        ranked = np.select([(perc > -1) & (perc <= 70), (perc > 70) & (perc <= 90), (perc > 90) & (perc <= 101)],
+                           [0, 1, 2], -1).astype(np.int8)
+        ranked[:, total == 0] = ABC_LABELS.index('D')
+        block_codes = np.empty_like(ranked)
+        np.put_along_axis(block_codes, order, ranked, axis=0)
+        codes[rows] = block_codes
+    return codes
+
+
+def classify_abc(items, avg_ads):
+    """Klasifikasi ABC per kota berdasarkan rata-rata ADS (kumulatif 70/90/100%)."""
+    if items.empty:
+        return pd.Categorical([], categories=ABC_LABELS)
+    city_codes = pd.factorize(items['City'])[0]
+    codes = abc_rank_codes(city_codes, np.asarray(avg_ads)[:, None])[:, 0]
+    return pd.Categorical.from_codes(codes, categories=ABC_LABELS)
+
+
+def prefix_cumsum(prefix):
+    """Kumulatif prefix sum per item: kolom k = jumlah prefix[:, :k] (bahan range_avg_ads)."""
+    prefix_cum = np.zeros((prefix.shape[0], prefix.shape[1] + 1), dtype=np.float64)
+    np.cumsum(prefix, axis=1, out=prefix_cum[:, 1:])
+    return prefix_cum
+
+
+def range_avg_ads(prefix, prefix_cum, range_start, range_end, window=ROLLING_WINDOW_DAYS):
+    """
+    Rata-rata ADS untuk klasifikasi ABC atas rentang hari [range_start, range_end]
+    (posisi kolom matriks; skalar atau array), sama dengan avg_ads rolling_stats
+    pada matriks yang dimulai di range_start: jendela 90 hari di awal rentang
+    dipotong. Untuk kuantitas bulat semua jumlah eksak, jadi hasilnya identik.
+    """
+    start, end = np.asarray(range_start), np.asarray(range_end)
+    # Jumlah penjualan rolling hari t = prefix[t + 1] - prefix[max(t + 1 - window, start)]
+    upper = prefix_cum[:, end + 2] - prefix_cum[:, start + 1]
+    n_head = np.minimum(end, start + window - 1) - start + 1
+    tail_lo = start + 1
+    tail_hi = np.maximum(end + 2 - window, tail_lo)
+    lower = n_head * prefix[:, start] + prefix_cum[:, tail_hi] - prefix_cum[:, tail_lo]
+    return (upper - lower) / (window * (end - start + 1))
+
+
+def abc_avg_ads(matrix, out_cols):
+    """
+    Rata-rata ADS untuk klasifikasi ABC mode 'rentang' bila matriks lebih panjang
+    dari rentang standar (jendela/lead time per item): tetap jendela 90 hari atas
+    [hari keluaran pertama - 90, hari keluaran terakhir + 21], sama dengan avg_ads
+    rolling_stats pada matriks standar.
+    """
+    prefix = np.zeros((matrix.shape[0], matrix.shape[1] + 1), dtype=np.float64)
+    np.cumsum(matrix, axis=1, out=prefix[:, 1:])
+    return range_avg_ads(prefix, prefix_cumsum(prefix), out_cols[0] - ROLLING_WINDOW_DAYS, out_cols[-1] + LOOKAHEAD_DAYS)
+
+
+def classify_abc_by_date(items, matrix, out_cols, lookahead=0, every=1, window=ROLLING_WINDOW_DAYS, block_cols=None):
+    """
+    Kategori ABC per (item, hari keluaran), urut item lalu hari seperti frame hasil.
+
+    Kelas hari d dihitung dari rata-rata ADS rentang [d - 90, d + lookahead],
+    persis seperti klasifikasi lama untuk rentang satu tanggal d (dengan
+    lookahead=21 hasilnya identik dengan menjalankan versi lama pada tanggal d
+    saja). lookahead=0 berarti hanya penjualan sampai tanggal d yang dipakai.
+    Dengan `every` > 1 kelas dihitung setiap `every` hari keluaran (mis. 7 =
+    mingguan) dan berlaku sampai perhitungan berikutnya. `block_cols` membatasi
+    jumlah tanggal evaluasi yang diberi skor dan diurutkan sekaligus (bawaan:
+    semuanya), sehingga array sementara berukuran item x `block_cols`; yang
+    disimpan untuk seluruh rentang hanya kode kelas, satu byte per baris.
+    """
+    out_cols = np.asarray(out_cols)
+    eval_cols = out_cols[::every]
+    prefix = np.zeros((matrix.shape[0], matrix.shape[1] + 1), dtype=np.float64)
+    np.cumsum(matrix, axis=1, out=prefix[:, 1:])
+    prefix_cum = prefix_cumsum(prefix)
+    city_codes = pd.factorize(items['City'])[0]
+    block_cols = max(1, block_cols or len(eval_cols))
+    codes = np.empty((len(items), len(eval_cols)), dtype=np.int8)
+    for lo in range(0, len(eval_cols), block_cols):
+        cols = eval_cols[lo:lo + block_cols]
+        scores = range_avg_ads(prefix, prefix_cum, cols - window, cols + lookahead, window)
+        codes[:, lo:lo + block_cols] = abc_rank_codes(city_codes, scores)
+    codes = codes[:, np.arange(len(out_cols)) // every]
+    return pd.Categorical.from_codes(codes.ravel(), categories=ABC_LABELS)
+
+
+def analysis_dates(start_date, end_date, window=ROLLING_WINDOW_DAYS, lookahead=LOOKAHEAD_DAYS):
+    """
+    Rentang hari lengkap (`window` hari ke belakang + `lookahead` hari ke depan,
+    standar 90 dan 21) dan posisi hari di dalam [start_date, end_date] yang
+    dijadikan baris hasil.
+    """
+    analysis_start_date = pd.to_datetime(start_date) - pd.DateOffset(days=window)
+    extended_end_date = pd.to_datetime(end_date) + pd.DateOffset(days=lookahead)
+    date_range_full = pd.date_range(start=analysis_start_date, end=extended_end_date, freq='D')
+    day_dates = date_range_full.date
+    out_mask = (day_dates >= pd.to_datetime(start_date).date()) & (day_dates <= pd.to_datetime(end_date).date())
+    return date_range_full, np.flatnonzero(out_mask)
+
+
+def assemble_rolling_frame(items, matrix, stats, abc, date_range_full, out_cols, produk_df):
+    """
+    Frame panjang (item x hari keluaran) dari statistik rolling, ABC, dan produk
+    referensi. `abc` berisi satu kelas per item (mode rentang) atau satu kelas per
+    baris hasil (mode harian, lihat classify_abc_by_date).
+    """
+    n_items, n_out = len(items), len(out_cols)
+    item_pos = np.repeat(np.arange(n_items), n_out)
+    final_df = items.iloc[item_pos].reset_index(drop=True)
+    final_df['Date'] = np.tile(date_range_full[out_cols].to_numpy(), n_items)
+    final_df['SO'] = matrix[:, out_cols].ravel()
+    for col, values in stats.items():
+        final_df[col] = values.ravel()
+    final_df['Kategori ABC'] = abc.take(item_pos) if len(abc) == n_items else abc
+    return pd.merge(final_df, produk_df, on='No. Barang', how='left')
+
+
+def item_rolling_stats(items, matrix, out_cols, item_params=None):
+    """
+    rolling_stats dengan jendela dan lead time dari tabel `item_params` (bila
+    ada); kolom 'Lead Time' dan 'Jendela' ikut ditambahkan ke statistik hasil.
+    """
+    if not has_item_params(item_params):
+        return rolling_stats(matrix, out_cols)
+    params = resolve_item_params(items, item_params)
+    stats = rolling_stats(matrix, out_cols, window=params['Jendela'], lookahead=params['Lead Time'])
+    shape = (len(items), len(out_cols))
+    for col, values in params.items():
+        stats[col] = np.broadcast_to(values[:, None], shape)
+    return stats
+
+
+def compute_rolling_frame(penjualan_df, produk_df, start_date, end_date, profiler=None, abc_mode='rentang', abc_every=None,
+                          item_params=None):
+    """
+    Versi vectorized dari preprocess_sales_data: satu matriks item x hari untuk
+    semua kota, lalu hanya hari di dalam [start_date, end_date] yang dijadikan frame.
+    `profiler` (RunProfiler, opsional) mencatat waktu setiap tahap. `abc_mode`
+    memilih klasifikasi ABC (lihat ABC_MODES); pada mode per tanggal kelas dihitung
+    setiap `abc_every` hari (bawaan: ABC_EVERY mode tersebut). `item_params` (lihat item_params) mengatur lead time
+    dan jendela per item/kota; klasifikasi ABC tetap memakai jendela standar.
+    """
+    date_range_full, out_cols = analysis_dates(start_date, end_date, *param_bounds(item_params))
+
+    with profile_stage(profiler, 'matriks_penjualan', rows=len(penjualan_df)):
+        items, matrix = build_sales_matrix(penjualan_df, date_range_full)
+    if items.empty:
+        return pd.DataFrame()
+
+    with profile_stage(profiler, 'rolling_stats', rows=matrix.size):
+        stats = item_rolling_stats(items, matrix, out_cols, item_params)
+    with profile_stage(profiler, 'klasifikasi_abc', rows=len(items)):
+        avg_ads = stats.pop('avg_ads', None)
+        if abc_mode in ABC_EVERY:
+            abc = classify_abc_by_date(items, matrix, out_cols, every=abc_every or ABC_EVERY[abc_mode])
+        else:
+            abc = classify_abc(items, avg_ads if avg_ads is not None else abc_avg_ads(matrix, out_cols))
+
+    with profile_stage(profiler, 'gabung_abc_produk') as info:
+        final_df = assemble_rolling_frame(items, matrix, stats, abc, date_range_full, out_cols, produk_df)
+        info['rows'] = len(final_df)
+    return final_df
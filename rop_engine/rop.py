@@ -0,0 +1,204 @@
+"""
+Perhitungan ROP dan penilaian metode z-score per kelas ABC.
+
+ROP = ADS x lead time + z x std x sqrt(lead time / periode), dengan z dari
+tabel per kelas A/B/C/D (lihat ROP_METHODS). Untuk analisis error,
+evaluate_z_grid meringkas error setiap kelas untuk setiap nilai z dalam satu
+lintasan; dari ringkasan itu score_methods menilai metode bawaan dan
+search_z_table mencari tabel z dengan MAE terendah untuk target stockout
+tertentu, tanpa menghitung ulang ROP per baris.
+"""
+import math
+
+import numpy as np
+import pandas as pd
+
+LEAD_TIME_DAYS = 21
+FORECAST_PERIOD_DAYS = 90
+ABC_CLASSES = ['A', 'B', 'C', 'D']
+ROP_METHODS = {
+    "ABC Bertingkat": {'A': 1.65, 'B': 1.0, 'C': 0.0, 'D': 0.0},
+    "Uniform": {'A': 1.0, 'B': 1.0, 'C': 1.0, 'D': 1.0},
+    "ROP = Min Stock": {'A': 0.0, 'B': 0.0, 'C': 0.0, 'D': 0.0},
+}
+# Grid z-score untuk pencarian; nilai dari metode bawaan selalu ikut di dalamnya
+DEFAULT_Z_GRID = np.unique(np.round(np.concatenate([
+    np.arange(0.0, 3.0001, 0.05),
+    [z for table in ROP_METHODS.values() for z in table.values()],
+]), 2))
+
+
+def safety_factor(lead_time=LEAD_TIME_DAYS, period=FORECAST_PERIOD_DAYS):
+    """sqrt(lead time / periode); skalar, atau array bila salah satunya per item/baris."""
+    if np.ndim(lead_time) or np.ndim(period):
+        return np.sqrt(np.asarray(lead_time, dtype=np.float64) / np.asarray(period, dtype=np.float64))
+    return math.sqrt(lead_time / period)
+
+
+def row_lead_times(df):
+    """(lead time, periode) per baris dari kolom 'Lead Time'/'Jendela' bila ada, selain itu nilai bawaan."""
+    lead_time = df['Lead Time'].to_numpy() if 'Lead Time' in df.columns else LEAD_TIME_DAYS
+    period = df['Jendela'].to_numpy() if 'Jendela' in df.columns else FORECAST_PERIOD_DAYS
+    return lead_time, period
+
+
+def abc_codes(kategori):
+    """Kode 0..3 untuk kelas A/B/C/D; kelas kosong atau tidak dikenal dianggap D."""
+    codes = pd.Categorical(np.asarray(kategori, dtype=object), categories=ABC_CLASSES).codes.astype(np.int8)
+    codes[codes < 0] = ABC_CLASSES.index('D')
+    return codes
+
+
+def z_table_array(z_scores):
+    return np.array([z_scores[c] for c in ABC_CLASSES], dtype=np.float64)
+
+
+def compute_rop(ads, std, codes, z_scores, lead_time=LEAD_TIME_DAYS, period=FORECAST_PERIOD_DAYS):
+    """ROP = ADS x lead time + z x std x sqrt(lead time / periode), dibulatkan; lead time/periode boleh per baris."""
+    z = z_table_array(z_scores)[codes]
+    return np.round(np.asarray(ads) * lead_time + z * np.asarray(std) * safety_factor(lead_time, period))
+
+
+def apply_rop_method(df, method):
+    df_copy = df.copy()
+    z_scores = ROP_METHODS.get(method, ROP_METHODS["ROP = Min Stock"])
+
+    # Mengubah Kategori ABC menjadi tipe data string biasa untuk menghindari error
+    df_copy['Kategori ABC'] = df_copy['Kategori ABC'].astype(str).fillna('D')
+
+    df_copy['Z_Score'] = df_copy['Kategori ABC'].map(z_scores)
+    lead_time, period = row_lead_times(df_copy)
+    df_copy['Prediksi_Stok_Minimal'] = df_copy['ADS'] * lead_time
+    df_copy['Safety_Stock'] = df_copy['Z_Score'] * df_copy['std_dev_90d'] * safety_factor(lead_time, period)
+    df_copy['ROP'] = df_copy['Prediksi_Stok_Minimal'] + df_copy['Safety_Stock']
+    df_copy['ROP'] = df_copy['ROP'].round().astype(int)
+    df_copy['SO'] = df_copy['SO'].astype(int)
+    return df_copy
+
+
+def evaluate_z_grid(ads, std, actual, codes, z_values=DEFAULT_Z_GRID, chunk_rows=250_000,
+                    lead_time=LEAD_TIME_DAYS, period=FORECAST_PERIOD_DAYS):
+    """
+    Statistik error untuk setiap kelas ABC x setiap nilai z dalam satu lintasan.
+
+    Karena MAE, bias, dan jumlah stockout bisa dijumlahkan per kelas, tabel
+    (kelas x z) ini cukup untuk menilai kombinasi z-score A/B/C/D apa pun tanpa
+    menghitung ulang ROP. Baris diproses per potongan `chunk_rows` agar memori
+    broadcast (baris x grid) tetap terbatas. Frame tidak disalin. `lead_time` dan
+    `period` boleh berupa array per baris (lihat item_params).
+    """
+    ads = np.asarray(ads, dtype=np.float64)
+    std = np.asarray(std, dtype=np.float64)
+    actual = np.asarray(actual, dtype=np.float64)
+    z_values = np.asarray(z_values, dtype=np.float64)
+    n_classes, n_z = len(ABC_CLASSES), len(z_values)
+
+    count = np.zeros(n_classes, dtype=np.int64)
+    sum_err = np.zeros((n_classes, n_z))
+    sum_abs_err = np.zeros((n_classes, n_z))
+    stockouts = np.zeros((n_classes, n_z), dtype=np.int64)
+    factor = np.broadcast_to(safety_factor(lead_time, period), ads.shape)
+    lead_time = np.broadcast_to(np.asarray(lead_time, dtype=np.float64), ads.shape)
+
+    valid = ~np.isnan(actual)
+    for k in range(n_classes):
+        rows = np.flatnonzero((codes == k) & valid)
+        count[k] = len(rows)
+        for start in range(0, len(rows), chunk_rows):
+            idx = rows[start:start + chunk_rows]
+            base = (ads[idx] * lead_time[idx])[:, None]
+            spread = (std[idx] * factor[idx])[:, None]
+            err = np.round(base + spread * z_values[None, :]) - actual[idx, None]
+            sum_err[k] += err.sum(axis=0)
+            sum_abs_err[k] += np.abs(err).sum(axis=0)
+            stockouts[k] += (err < 0).sum(axis=0)
+
+    return {
+        'z_values': z_values,
+        'count': count,
+        'sum_err': sum_err,
+        'sum_abs_err': sum_abs_err,
+        'stockouts': stockouts,
+    }
+
+
+def _z_index(stats, z_tables):
+    z_values = stats['z_values']
+    z_tables = np.atleast_2d(np.asarray(z_tables, dtype=np.float64))
+    idx = np.clip(np.searchsorted(z_values, z_tables), 0, len(z_values) - 1)
+    if not np.allclose(z_values[idx], z_tables):
+        raise ValueError("Nilai z-score tidak ada di grid evaluasi.")
+    return idx
+
+
+def score_z_tables(stats, z_tables):
+    """
+    MAE, bias, dan hari stockout untuk setiap tabel z (baris = konfigurasi,
+    kolom = kelas A/B/C/D), dihitung dari statistik evaluate_z_grid.
+    """
+    idx = _z_index(stats, z_tables)
+    classes = np.arange(len(ABC_CLASSES))
+    total = max(int(stats['count'].sum()), 1)
+    sum_err = stats['sum_err'][classes, idx].sum(axis=1)
+    sum_abs_err = stats['sum_abs_err'][classes, idx].sum(axis=1)
+    stockouts = stats['stockouts'][classes, idx].sum(axis=1)
+    return pd.DataFrame({
+        'MAE': sum_abs_err / total,
+        'Rata-rata Error (Bias)': sum_err / total,
+        'Jumlah Hari Stockout': stockouts,
+        'Tingkat Stockout (%)': 100 * stockouts / total,
+    })
+
+
+def score_methods(stats, methods=ROP_METHODS):
+    z_tables = [z_table_array(z_scores) for z_scores in methods.values()]
+    return score_z_tables(stats, z_tables).set_axis(list(methods), axis=0)
+
+
+def _pair_stats(stats, first, second):
+    n_z = len(stats['z_values'])
+    abs_err = (stats['sum_abs_err'][first][:, None] + stats['sum_abs_err'][second][None, :]).ravel()
+    stockouts = (stats['stockouts'][first][:, None] + stats['stockouts'][second][None, :]).ravel()
+    z_idx = np.stack(np.unravel_index(np.arange(n_z * n_z), (n_z, n_z)), axis=1)
+    return abs_err, stockouts, z_idx
+
+
+def search_z_table(stats, target_stockout_rate):
+    """
+    Mencari tabel z A/B/C/D dengan MAE terendah yang tingkat stockout-nya
+    (persen baris dengan ROP < penjualan aktual) tidak melebihi target.
+
+    Pencarian eksak atas seluruh grid dengan meet-in-the-middle: pasangan (A, B)
+    digabung dengan pasangan (C, D) yang diurutkan menurut jumlah stockout, lalu
+    untuk setiap pasangan (A, B) dipilih (C, D) dengan error terkecil yang masih
+    muat dalam sisa batas stockout. Jika target tidak tercapai, dikembalikan tabel
+    dengan stockout paling rendah.
+    """
+    total = max(int(stats['count'].sum()), 1)
+    budget = np.floor(target_stockout_rate / 100 * total + 1e-9)
+    abs_ab, so_ab, idx_ab = _pair_stats(stats, 0, 1)
+    abs_cd, so_cd, idx_cd = _pair_stats(stats, 2, 3)
+
+    order = np.lexsort((abs_cd, so_cd))
+    so_cd_sorted = so_cd[order]
+    # Posisi (C, D) dengan error terkecil di antara semua yang stockout-nya <= so_cd_sorted[i]
+    best_abs = np.minimum.accumulate(abs_cd[order])
+    is_new_best = np.concatenate([[True], abs_cd[order][1:] < best_abs[:-1]])
+    running_best = np.maximum.accumulate(np.where(is_new_best, np.arange(len(order)), 0))
+
+    pos = np.searchsorted(so_cd_sorted, budget - so_ab, side='right') - 1
+    feasible = pos >= 0
+    if feasible.any():
+        cd_choice = order[running_best[np.clip(pos, 0, None)]]
+        combined = np.where(feasible, abs_ab + abs_cd[cd_choice], np.inf)
+        ab = int(combined.argmin())
+        cd = int(cd_choice[ab])
+    else:
+        ab, cd = int(so_ab.argmin()), int(so_cd.argmin())
+
+    z_idx = np.concatenate([idx_ab[ab], idx_cd[cd]])
+    z_table = stats['z_values'][z_idx]
+    result = score_z_tables(stats, [z_table]).iloc[0].to_dict()
+    result['z_scores'] = dict(zip(ABC_CLASSES, z_table.tolist()))
+    result['target_tercapai'] = bool(feasible.any())
+    return result
@@ -0,0 +1,204 @@
+"""
+Data penjualan bersama untuk semua session dalam satu proses aplikasi.
+
+Folder penjualan di Drive dimuat dan dinormalisasi sekali per proses, bukan
+sekali per session. Setiap hasil muat adalah satu versi (SalesDataVersion)
+yang tidak diubah lagi: frame-nya dipakai bersama oleh semua session secara
+read-only. Versi ditentukan oleh isi folder (id + md5Checksum/modifiedTime
+setiap file), jadi folder yang tidak berubah tidak pernah dimuat ulang.
+
+Pemeriksaan dan pemuatan ulang berjalan di satu thread latar belakang. Selama
+versi baru dimuat, session tetap memakai versi lama; begitu selesai, versi baru
+dipasang dengan satu pertukaran referensi dan run berikutnya di setiap session
+otomatis memakainya. Versi lama dilepas dari memori setelah tidak ada lagi yang
+memegangnya.
+"""
+import hashlib
+import os
+import threading
+import time
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+from .file_cache import ParsedFileCache
+from .gdrive import DEFAULT_MAX_WORKERS, load_files_concurrently
+from .memo import object_nbytes
+from .normalize import SalesSchemaError, normalize_sales
+from .profiling import RunProfiler
+from .readers import concat_sales_frames
+
+# Jeda minimum antar pemeriksaan folder; pemeriksaan dipicu oleh run session, bukan timer
+DEFAULT_REFRESH_SECONDS = int(os.environ.get("ROP_SHARED_REFRESH_SECONDS", "300"))
+
+
+def folder_version(files):
+    """Versi isi folder: hash dari (id, versi) semua file, tidak bergantung urutan listing."""
+    h = hashlib.sha1()
+    for file_id, version in sorted((info['id'], ParsedFileCache.version_of(info)) for info in files):
+        h.update(f"{file_id}:{version}\n".encode())
+    return h.hexdigest()[:12]
+
+
+class SalesDataVersion:
+    """Satu versi data penjualan ternormalisasi; diperlakukan read-only oleh semua session."""
+
+    def __init__(self, number, version, files, penjualan, load_seconds):
+        self.number = number
+        self.version = version
+        self.files = files
+        self.penjualan = penjualan
+        self.load_seconds = load_seconds
+        self.loaded_at = datetime.now()
+        self.nbytes = object_nbytes(penjualan)
+
+    @property
+    def label(self):
+        return f"#{self.number} ({self.version})"
+
+
+class SharedSalesData:
+    """
+    Pemegang versi data penjualan aktif untuk seluruh proses.
+
+    `list_files()` mengembalikan listing folder (dengan md5Checksum/modifiedTime)
+    dan `service_factory()` membuat service Drive per thread worker. `current`
+    tidak pernah menunggu unduhan; `maybe_refresh` dan `refresh_in_background`
+    hanya menjadwalkan pekerjaan di thread latar belakang (paling banyak satu
+    berjalan sekaligus).
+    """
+
+    def __init__(self, list_files, service_factory, cache=None, refresh_seconds=DEFAULT_REFRESH_SECONDS,
+                 max_workers=DEFAULT_MAX_WORKERS):
+        self.list_files = list_files
+        self.service_factory = service_factory
+        self.cache = cache
+        self.refresh_seconds = refresh_seconds
+        self.max_workers = max_workers
+        self.checked_at = None
+        self.last_error = None
+        self.progress = None
+        # Profil pemuatan terakhir (RunProfiler.to_record), juga ditulis ke log profil
+        self.last_profile = None
+        self._current = None
+        # Versi folder yang gagal dinormalisasi tidak dicoba lagi sampai foldernya berubah
+        self._failed_version = None
+        self._retired = []
+        self._future = None
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='rop_shared_data')
+
+    @property
+    def current(self):
+        return self._current
+
+    @property
+    def refreshing(self):
+        future = self._future
+        return future is not None and not future.done()
+
+    def refresh_in_background(self):
+        """Menjadwalkan pemeriksaan folder sekarang; bila sudah ada yang berjalan, itu yang dikembalikan."""
+        with self._lock:
+            if self._future is None or self._future.done():
+                self._future = self._executor.submit(self.refresh)
+            return self._future
+
+    def maybe_refresh(self):
+        """Menjadwalkan pemeriksaan bila pemeriksaan terakhir lebih lama dari `refresh_seconds`."""
+        checked_at = self.checked_at
+        if checked_at is None or (datetime.now() - checked_at).total_seconds() >= self.refresh_seconds:
+            return self.refresh_in_background()
+        return None
+
+    def refresh(self):
+        """
+        Memeriksa folder lalu memuat versi baru bila isinya berubah (dijalankan di
+        thread latar belakang). Bila gagal, versi aktif tetap dipakai dan
+        kesalahannya dicatat di `last_error`. Mengembalikan versi aktif.
+        """
+        self.checked_at = datetime.now()
+        version = None
+        try:
+            files = self.list_files()
+            version = folder_version(files)
+            current = self._current
+            if (current is not None and current.version == version) or version == self._failed_version:
+                return current
+            if not files:
+                self.last_error = "Tidak ada file penjualan ditemukan di folder Google Drive."
+                return current
+            self._publish(self._load(files, version))
+            self.last_error = None
+        except SalesSchemaError as e:
+            self._failed_version = version
+            self.last_error = f"Data penjualan tidak bisa dipakai: {e}"
+        except Exception as e:
+            self.last_error = f"Gagal memuat data penjualan: {e}"
+        finally:
+            self.progress = None
+        return self._current
+
+    def _load(self, files, version):
+        """
+        Unduh/parse semua file, gabungkan, lalu normalisasi. Waktu setiap tahap
+        (termasuk unduh dan parse per file) dicatat dengan profiler sendiri dan
+        ditambahkan ke log profil begitu pemuatan selesai, berhasil atau gagal.
+        """
+        t0 = time.perf_counter()
+        self.progress = (0, len(files))
+        profiler = RunProfiler('shared_sales_load', version=version)
+
+        def update_progress(done, total, file_info, error):
+            self.progress = (done, total)
+
+        try:
+            with profiler.stage('muat_semua_file', rows=len(files)):
+                dfs, errors = load_files_concurrently(self.service_factory, files, max_workers=self.max_workers,
+                                                      on_progress=update_progress, cache=self.cache, profiler=profiler)
+            if errors:
+                names = '; '.join(f"{info['name']}: {error}" for info, error in errors)
+                # File dengan kolom yang salah tidak akan berhasil dicoba ulang; gangguan unduhan bisa
+                error_type = SalesSchemaError if all(isinstance(e, SalesSchemaError) for _, e in errors) else RuntimeError
+                raise error_type(f"{len(errors)} dari {len(files)} file gagal dimuat. {names}")
+            with profiler.stage('gabung_file') as info:
+                df_penjualan = concat_sales_frames(dfs)
+                del dfs
+                info['rows'] = len(df_penjualan)
+            with profiler.stage('normalisasi', rows=len(df_penjualan)):
+                penjualan = normalize_sales(df_penjualan)
+            del df_penjualan
+        finally:
+            profiler.append_jsonl()
+            self.last_profile = profiler.to_record()
+        number = self._current.number + 1 if self._current is not None else 1
+        return SalesDataVersion(number, version, files, penjualan, time.perf_counter() - t0)
+
+    def _publish(self, new_version):
+        with self._lock:
+            old = self._current
+            self._current = new_version
+            if old is not None:
+                # Hanya dipantau (weakref); dilepas begitu session terakhir selesai memakainya
+                self._retired.append((old.label, old.nbytes, weakref.ref(old.penjualan)))
+            self._retired = [entry for entry in self._retired if entry[2]() is not None]
+
+    def stats(self):
+        current = self._current
+        with self._lock:
+            retired = [(label, nbytes) for label, nbytes, ref in self._retired if ref() is not None]
+        return {
+            'version': current.label if current is not None else None,
+            'files': len(current.files) if current is not None else 0,
+            'rows': len(current.penjualan) if current is not None else 0,
+            'size_bytes': current.nbytes if current is not None else 0,
+            'loaded_at': current.loaded_at if current is not None else None,
+            'checked_at': self.checked_at,
+            'load_seconds': current.load_seconds if current is not None else None,
+            'retired_versions': len(retired),
+            'retired_bytes': sum(nbytes for _, nbytes in retired),
+            'refreshing': self.refreshing,
+            'progress': self.progress,
+            'last_error': self.last_error,
+            'last_profile': self.last_profile,
+        }
@@ -0,0 +1,188 @@
+"""
+Simulasi persediaan harian untuk menilai metode ROP berdasarkan hasil stok riil.
+
+Penjualan harian historis (SO) diputar ulang terhadap setiap metode ROP:
+setiap akhir hari, bila posisi persediaan (stok di tangan + pesanan dalam
+perjalanan) <= ROP hari itu, barang dipesan sampai ROP + kebutuhan
+`order_days` hari (ADS x order_days) dan tiba LEAD_TIME_DAYS hari kemudian
+(atau sesuai 'Lead Time' per item, lihat item_params).
+Permintaan yang melebihi stok di tangan hilang (tidak di-backorder). Stok awal
+setiap item sama dengan ROP hari pertama.
+
+Waktu disimulasikan hari demi hari, tetapi setiap hari diproses sekaligus untuk
+semua metode x (City, No. Barang) sebagai array numpy; tidak ada loop per item.
+"""
+import numpy as np
+import pandas as pd
+
+from .rop import ABC_CLASSES, FORECAST_PERIOD_DAYS, LEAD_TIME_DAYS, ROP_METHODS, abc_codes, safety_factor, z_table_array
+
+DEFAULT_ORDER_DAYS = 30
+SIMULATION_GROUPS = {
+    'Metode': [],
+    'Kategori ABC': ['Kategori ABC'],
+    'City': ['City'],
+    'City & Kategori ABC': ['City', 'Kategori ABC'],
+}
+
+
+def simulation_arrays(rolling_df):
+    """
+    Matriks item x hari (SO, ADS, std_dev_90d, dan kode ABC 'abc') dari frame
+    compute_rolling_frame, plus tabel item (City, No. Barang, Kategori ABC pada
+    hari terakhir). Hari tanpa baris diisi 0 (kelas D). Bila frame memuat 'Lead
+    Time'/'Jendela' per item, keduanya ikut sebagai array per item.
+    """
+    city_codes, cities = pd.factorize(rolling_df['City'], sort=True)
+    barang_codes, barang = pd.factorize(rolling_df['No. Barang'], sort=True)
+    items, item_codes = np.unique(city_codes.astype(np.int64) * len(barang) + barang_codes, return_inverse=True)
+    day_codes, days = pd.factorize(rolling_df['Date'], sort=True)
+    shape = (len(items), len(days))
+    arrays = {}
+    for col in ['SO', 'ADS', 'std_dev_90d']:
+        matrix = np.zeros(shape)
+        matrix[item_codes, day_codes] = rolling_df[col].to_numpy(dtype=np.float64)
+        arrays[col] = matrix
+
+    # Kelas ABC bisa berubah per hari (mode ABC 'harian')
+    codes = np.full(shape, ABC_CLASSES.index('D'), dtype=np.int8)
+    codes[item_codes, day_codes] = abc_codes(rolling_df['Kategori ABC'])
+    arrays['abc'] = codes
+    for col in ['Lead Time', 'Jendela']:
+        if col in rolling_df.columns:
+            values = np.zeros(len(items), dtype=np.int64)
+            values[item_codes] = rolling_df[col].to_numpy()
+            arrays[col] = values
+    item_df = pd.DataFrame({
+        'City': np.asarray(cities, dtype=object)[items // len(barang)],
+        'No. Barang': np.asarray(barang, dtype=object)[items % len(barang)],
+    })
+    item_df['Kategori ABC'] = np.asarray(ABC_CLASSES, dtype=object)[codes[:, -1]] if len(days) else None
+    return item_df, pd.DatetimeIndex(days), arrays
+
+
+def simulate_inventory(demand, ads, std, codes, methods=ROP_METHODS, order_days=DEFAULT_ORDER_DAYS,
+                       lead_time=LEAD_TIME_DAYS, period=FORECAST_PERIOD_DAYS):
+    """
+    Simulasi persediaan untuk semua metode sekaligus.
+
+    `demand`, `ads`, `std` berbentuk item x hari; `codes` adalah kode ABC per
+    item, atau per item x hari bila kelasnya berubah dari hari ke hari.
+    `lead_time` (>= 1 bila per item) dan `period` boleh berupa array per item.
+    Mengembalikan dict array berbentuk metode x item: permintaan, terpenuhi, hari stockout (permintaan tidak terpenuhi penuh), jumlah stok akhir hari
+    (untuk rata-rata persediaan), dan jumlah pesanan.
+    """
+    demand = np.asarray(demand, dtype=np.float64)
+    n_items, n_days = demand.shape
+    if np.ndim(lead_time):
+        lead_time = np.asarray(lead_time, dtype=np.int64)
+    z_tables = np.stack([z_table_array(z_scores) for z_scores in methods.values()])
+    codes = np.asarray(codes)
+    n_methods = len(z_tables)
+    factor = safety_factor(lead_time, period)
+    per_item = np.ndim(lead_time) > 0
+
+    def rop_on(day):
+        z = z_tables[:, codes[:, day] if codes.ndim == 2 else codes]
+        return np.round(ads[None, :, day] * lead_time + z * std[None, :, day] * factor)
+
+    shape = (n_methods, n_items)
+    on_hand = np.maximum(rop_on(0), 0) if n_days else np.zeros(shape)
+    on_order = np.zeros(shape)
+    # Ring buffer kedatangan: slot (hari % panjang buffer) berisi barang yang tiba hari itu
+    arrivals = np.zeros((max(int(np.max(lead_time, initial=0)), 1),) + shape)
+    filled = np.zeros(shape)
+    stockout_days = np.zeros(shape, dtype=np.int64)
+    stock_sum = np.zeros(shape)
+    orders = np.zeros(shape, dtype=np.int64)
+
+    for day in range(n_days):
+        slot = day % len(arrivals)
+        on_hand += arrivals[slot]
+        on_order -= arrivals[slot]
+        arrivals[slot] = 0
+
+        day_demand = demand[None, :, day]
+        sold = np.minimum(on_hand, day_demand)
+        on_hand -= sold
+        filled += sold
+        stockout_days += sold < day_demand
+        stock_sum += on_hand
+
+        rop = rop_on(day)
+        position = on_hand + on_order
+        quantity = np.where(position <= rop, np.ceil(rop + ads[None, :, day] * order_days - position), 0)
+        quantity = np.maximum(quantity, 0)
+        if per_item:
+            # Setiap item tiba di slot hari kedatangannya sendiri
+            arrivals[(day + lead_time) % len(arrivals), :, np.arange(n_items)] += quantity.T
+            on_order += quantity
+        elif lead_time > 0:
+            arrivals[slot] += quantity
+            on_order += quantity
+        else:
+            on_hand += quantity
+        orders += quantity > 0
+
+    return {
+        'Permintaan': np.broadcast_to(demand.sum(axis=1), shape).copy(),
+        'Terpenuhi': filled,
+        'Hari Stockout': stockout_days,
+        'Total Stok': stock_sum,
+        'Jumlah Pesanan': orders,
+        'n_days': n_days,
+    }
+
+
+def summarize_simulation(item_df, sim, methods=ROP_METHODS, by=()):
+    """
+    Ringkasan hasil simulasi per metode (dan per kolom `by` dari tabel item):
+    fill rate, hari stockout, rata-rata persediaan, dan jumlah pesanan.
+    """
+    by = list(by)
+    n_days = max(sim['n_days'], 1)
+    if by:
+        group_codes, groups = pd.factorize(pd.MultiIndex.from_frame(item_df[by].astype(object)), sort=True)
+        n_groups = len(groups)
+    else:
+        group_codes, groups, n_groups = np.zeros(len(item_df), dtype=np.int64), None, 1
+
+    frames = []
+    for m, method in enumerate(methods):
+        def total(name):
+            return np.bincount(group_codes, weights=sim[name][m], minlength=n_groups)
+        n_items = np.bincount(group_codes, minlength=n_groups)
+        demand, filled, stockouts = total('Permintaan'), total('Terpenuhi'), total('Hari Stockout')
+        item_days = np.maximum(n_items * n_days, 1)
+        frame = pd.DataFrame({
+            'Metode': method,
+            'Jumlah Item': n_items,
+            'Permintaan': demand,
+            'Terpenuhi': filled,
+            'Fill Rate (%)': 100 * filled / np.where(demand > 0, demand, np.nan),
+            'Hari Stockout': stockouts.astype(np.int64),
+            'Tingkat Hari Stockout (%)': 100 * stockouts / item_days,
+            'Rata-rata Persediaan': total('Total Stok') / item_days,
+            'Jumlah Pesanan': total('Jumlah Pesanan').astype(np.int64),
+        })
+        if by:
+            frame = pd.concat([pd.DataFrame(list(groups), columns=by), frame], axis=1)
+        frames.append(frame[frame['Jumlah Item'] > 0])
+    summary = pd.concat(frames, ignore_index=True)
+    index = ['Metode'] + by
+    if 'Kategori ABC' in by:
+        summary['Kategori ABC'] = pd.Categorical(summary['Kategori ABC'], categories=ABC_CLASSES)
+    summary['Metode'] = pd.Categorical(summary['Metode'], categories=list(methods))
+    return summary.sort_values(index).set_index(index)
+
+
+def run_simulation(rolling_df, methods=ROP_METHODS, order_days=DEFAULT_ORDER_DAYS, lead_time=LEAD_TIME_DAYS):
+    """
+    Simulasi dari frame compute_rolling_frame; mengembalikan (tabel item, hasil
+    simulasi). 'Lead Time'/'Jendela' per item di frame menggantikan `lead_time`.
+    """
+    item_df, _, arrays = simulation_arrays(rolling_df)
+    sim = simulate_inventory(arrays['SO'], arrays['ADS'], arrays['std_dev_90d'], arrays['abc'],
+                             methods, order_days, arrays.get('Lead Time', lead_time),
+                             arrays.get('Jendela', FORECAST_PERIOD_DAYS))
+    return item_df, sim
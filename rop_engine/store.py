@@ -0,0 +1,288 @@
+"""
+Penyimpanan hasil ROP per run di SQLite lokal, untuk dibaca sistem pembelian.
+
+Setiap run dicatat di tabel `runs` (metode, rentang tanggal, sidik jari input,
+waktu simpan) dan barisnya di tabel `rop` dengan kunci utama
+(City, No. Barang, Date, run_id). Pencarian ROP terakhir satu item maupun scan
+rentang tanggal cukup membaca indeks, tanpa memuat seluruh run ke memori.
+Hanya `keep_runs` run selesai terbaru yang disimpan (ROP_STORE_KEEP_RUNS, 0 =
+simpan semua); run yang lebih lama dihapus setiap kali run baru selesai.
+
+Contoh:
+    store = ResultStore('rop_results.sqlite')
+    store.latest_rop('Surabaya', 'BRG-001')
+    store.item_history('Surabaya', 'BRG-001', start='2024-05-01', end='2024-05-31')
+"""
+import os
+import sqlite3
+from contextlib import closing
+from datetime import datetime
+
+import pandas as pd
+
+DEFAULT_STORE_PATH = os.environ.get("ROP_STORE_PATH", "rop_results.sqlite")
+DEFAULT_KEEP_RUNS = int(os.environ.get("ROP_STORE_KEEP_RUNS", "30"))
+# Kolom hasil ROP -> kolom tabel `rop`
+STORE_COLUMNS = {
+    'City': 'city',
+    'No. Barang': 'no_barang',
+    'Date': 'date',
+    'Kategori ABC': 'kategori_abc',
+    'SO': 'so',
+    'ADS': 'ads',
+    'std_dev_90d': 'std_dev_90d',
+    'Safety_Stock': 'safety_stock',
+    'ROP': 'rop',
+}
+RUN_COLUMNS = ['run_id', 'created_at', 'method', 'start_date', 'end_date', 'input_fingerprint', 'source', 'rows', 'status']
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    run_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    created_at TEXT NOT NULL,
+    method TEXT NOT NULL,
+    start_date TEXT NOT NULL,
+    end_date TEXT NOT NULL,
+    input_fingerprint TEXT NOT NULL DEFAULT '',
+    source TEXT NOT NULL DEFAULT '',
+    rows INTEGER NOT NULL DEFAULT 0,
+    status TEXT NOT NULL DEFAULT 'berjalan'
+);
+CREATE TABLE IF NOT EXISTS rop (
+    city TEXT NOT NULL,
+    no_barang TEXT NOT NULL,
+    date TEXT NOT NULL,
+    run_id INTEGER NOT NULL REFERENCES runs(run_id),
+    kategori_abc TEXT,
+    so INTEGER,
+    ads REAL,
+    std_dev_90d REAL,
+    safety_stock REAL,
+    rop INTEGER,
+    PRIMARY KEY (city, no_barang, date, run_id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS rop_run_city_date ON rop (run_id, city, date);
+"""
+
+
+def _date_text(value):
+    return None if value is None else pd.Timestamp(value).strftime('%Y-%m-%d')
+
+
+def _store_records(result_df, run_id):
+    """Baris hasil sebagai tuple siap insert (tanggal sebagai teks YYYY-MM-DD, NaN -> NULL)."""
+    columns = []
+    for col in STORE_COLUMNS:
+        if col not in result_df.columns:
+            values = [None] * len(result_df)
+        elif pd.api.types.is_numeric_dtype(result_df[col]):
+            # NaN disimpan SQLite sebagai NULL
+            values = result_df[col].to_numpy().tolist()
+        else:
+            # Teks dan tanggal dikonversi per nilai unik saja, lalu dipetakan lewat kode
+            codes, uniques = pd.factorize(result_df[col])
+            if col == 'Date':
+                labels = pd.DatetimeIndex(uniques).strftime('%Y-%m-%d')
+            else:
+                labels = [str(u) for u in uniques]
+            labels = pd.Series(list(labels) + [None], dtype=object)
+            values = labels.take(codes).tolist()
+        columns.append(values)
+    columns.insert(3, [run_id] * len(result_df))
+    return zip(*columns)
+
+
+class ResultStore:
+    """
+    Akses ke file SQLite hasil ROP. Koneksi dibuka per operasi sehingga objek ini
+    aman dipakai dari beberapa thread maupun proses (penulisan diserialkan SQLite
+    dengan mode WAL dan batas tunggu `timeout` detik).
+    """
+
+    def __init__(self, path=DEFAULT_STORE_PATH, timeout=300, keep_runs=DEFAULT_KEEP_RUNS):
+        self.path = path
+        self.timeout = timeout
+        self.keep_runs = keep_runs
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        with closing(self._connect()) as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(SCHEMA)
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=self.timeout)
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    # --- Penulisan ---
+
+    def begin_run(self, method, start_date, end_date, input_fingerprint='', source=''):
+        """Mencatat run baru (status 'berjalan') dan mengembalikan run_id-nya."""
+        with closing(self._connect()) as conn, conn:
+            cursor = conn.execute(
+                "INSERT INTO runs (created_at, method, start_date, end_date, input_fingerprint, source) VALUES (?, ?, ?, ?, ?, ?)",
+                (datetime.now().isoformat(timespec='seconds'), method, _date_text(start_date), _date_text(end_date),
+                 input_fingerprint or '', source or ''),
+            )
+            return cursor.lastrowid
+
+    def add_rows(self, run_id, result_df):
+        """Menambahkan baris hasil ke run; dipanggil sekali atau per potongan (mis. per kota)."""
+        records = _store_records(result_df, run_id)
+        placeholders = ', '.join('?' * (len(STORE_COLUMNS) + 1))
+        columns = list(STORE_COLUMNS.values())
+        columns.insert(3, 'run_id')
+        sql = f"INSERT INTO rop ({', '.join(columns)}) VALUES ({placeholders})"
+        with closing(self._connect()) as conn, conn:
+            conn.executemany(sql, records)
+            conn.execute("UPDATE runs SET rows = rows + ? WHERE run_id = ?", (len(result_df), run_id))
+        return len(result_df)
+
+    def finish_run(self, run_id):
+        """Menandai run selesai, lalu membuang run selesai di luar `keep_runs` terbaru."""
+        with closing(self._connect()) as conn, conn:
+            conn.execute("UPDATE runs SET status = 'selesai' WHERE run_id = ?", (run_id,))
+        self.prune_runs()
+
+    def find_run(self, method, start_date, end_date, input_fingerprint):
+        """run_id run selesai terakhir dengan metode, rentang, dan input yang sama (atau None)."""
+        if not input_fingerprint:
+            return None
+        with closing(self._connect()) as conn:
+            row = conn.execute(
+                "SELECT run_id FROM runs WHERE status = 'selesai' AND method = ? AND start_date = ? AND end_date = ? "
+                "AND input_fingerprint = ? ORDER BY run_id DESC LIMIT 1",
+                (method, _date_text(start_date), _date_text(end_date), input_fingerprint),
+            ).fetchone()
+        return None if row is None else row[0]
+
+    def save_run(self, result_df, method, start_date, end_date, input_fingerprint='', source=''):
+        """
+        Menyimpan satu hasil ROP utuh sebagai run baru. Hasil dengan metode, rentang
+        tanggal, dan sidik jari input yang sama dengan run tersimpan tidak ditulis
+        ulang; run_id yang sudah ada dikembalikan.
+        """
+        existing = self.find_run(method, start_date, end_date, input_fingerprint)
+        if existing is not None:
+            return existing
+        run_id = self.begin_run(method, start_date, end_date, input_fingerprint, source)
+        self.add_rows(run_id, result_df)
+        self.finish_run(run_id)
+        return run_id
+
+    def delete_run(self, run_id):
+        with closing(self._connect()) as conn, conn:
+            conn.execute("DELETE FROM rop WHERE run_id = ?", (run_id,))
+            conn.execute("DELETE FROM runs WHERE run_id = ?", (run_id,))
+
+    def prune_runs(self, keep=None):
+        """
+        Menghapus run selesai selain `keep` (default `keep_runs`) yang terbaru dan
+        mengembalikan run_id yang dihapus. Run yang masih berjalan tidak disentuh;
+        `keep` 0 berarti semua run disimpan.
+        """
+        keep = self.keep_runs if keep is None else keep
+        if not keep:
+            return []
+        with closing(self._connect()) as conn, conn:
+            stale = [row[0] for row in conn.execute(
+                "SELECT run_id FROM runs WHERE status = 'selesai' ORDER BY run_id DESC LIMIT -1 OFFSET ?", (keep,)
+            )]
+            if stale:
+                placeholders = ', '.join('?' * len(stale))
+                conn.execute(f"DELETE FROM rop WHERE run_id IN ({placeholders})", stale)
+                conn.execute(f"DELETE FROM runs WHERE run_id IN ({placeholders})", stale)
+        return stale
+
+    # --- Query ---
+
+    def _query(self, sql, params):
+        with closing(self._connect()) as conn:
+            return pd.read_sql_query(sql, conn, params=params)
+
+    @staticmethod
+    def _to_result_columns(df):
+        df = df.rename(columns={v: k for k, v in STORE_COLUMNS.items()})
+        if 'Date' in df.columns:
+            df['Date'] = pd.to_datetime(df['Date'])
+        return df
+
+    def runs(self, method=None):
+        """Daftar run tersimpan, terbaru lebih dulu."""
+        sql = f"SELECT {', '.join(RUN_COLUMNS)} FROM runs"
+        params = []
+        if method is not None:
+            sql += " WHERE method = ?"
+            params.append(method)
+        return self._query(sql + " ORDER BY run_id DESC", params)
+
+    @staticmethod
+    def _run_filter(method, run_id):
+        if run_id is not None:
+            return " AND r.run_id = ?", [run_id]
+        clause = " AND r.run_id IN (SELECT run_id FROM runs WHERE status = 'selesai'"
+        params = []
+        if method is not None:
+            clause += " AND method = ?"
+            params.append(method)
+        return clause + ")", params
+
+    def latest_rop(self, city, no_barang, method=None, as_of=None):
+        """
+        ROP terakhir untuk satu item di satu kota (tanggal terbaru, lalu run
+        terbaru), opsional hanya untuk `method` dan tanggal <= `as_of`. Mengembalikan
+        dict kolom hasil ditambah metadata run, atau None bila tidak ada.
+        """
+        run_clause, run_params = self._run_filter(method, None)
+        sql = (
+            f"SELECT {', '.join('r.' + c for c in STORE_COLUMNS.values())}, r.run_id, runs.method, runs.created_at "
+            "FROM rop AS r JOIN runs ON runs.run_id = r.run_id "
+            "WHERE r.city = ? AND r.no_barang = ?"
+        )
+        params = [city, str(no_barang)]
+        if as_of is not None:
+            sql += " AND r.date <= ?"
+            params.append(_date_text(as_of))
+        sql += run_clause + " ORDER BY r.date DESC, r.run_id DESC LIMIT 1"
+        df = self._query(sql, params + run_params)
+        if df.empty:
+            return None
+        return self._to_result_columns(df).iloc[0].to_dict()
+
+    def item_history(self, city, no_barang, start=None, end=None, method=None, run_id=None):
+        """
+        Scan rentang tanggal satu item. Tanpa `run_id`, setiap tanggal diambil dari
+        run selesai terbaru yang memuat tanggal itu (opsional hanya untuk `method`).
+        """
+        run_clause, run_params = self._run_filter(method, run_id)
+        columns = ', '.join(STORE_COLUMNS.values())
+        sql = (
+            f"SELECT {', '.join('r.' + c for c in STORE_COLUMNS.values())}, r.run_id, "
+            "ROW_NUMBER() OVER (PARTITION BY r.date ORDER BY r.run_id DESC) AS urutan "
+            "FROM rop AS r WHERE r.city = ? AND r.no_barang = ?"
+        )
+        params = [city, str(no_barang)]
+        if start is not None:
+            sql += " AND r.date >= ?"
+            params.append(_date_text(start))
+        if end is not None:
+            sql += " AND r.date <= ?"
+            params.append(_date_text(end))
+        # Per tanggal hanya baris dari run_id terbesar (urutan 1)
+        sql = f"SELECT {columns}, run_id FROM ({sql}{run_clause}) WHERE urutan = 1 ORDER BY date"
+        return self._to_result_columns(self._query(sql, params + run_params))
+
+    def run_rows(self, run_id, city=None, start=None, end=None):
+        """Baris satu run, opsional dibatasi kota dan rentang tanggal (memakai indeks run/kota/tanggal)."""
+        sql = f"SELECT {', '.join(STORE_COLUMNS.values())} FROM rop WHERE run_id = ?"
+        params = [run_id]
+        if city is not None:
+            sql += " AND city = ?"
+            params.append(city)
+        if start is not None:
+            sql += " AND date >= ?"
+            params.append(_date_text(start))
+        if end is not None:
+            sql += " AND date <= ?"
+            params.append(_date_text(end))
+        return self._to_result_columns(self._query(sql + " ORDER BY city, no_barang, date", params))
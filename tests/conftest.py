@@ -0,0 +1,5 @@
+import os
+import sys
+
+# Paket rop_engine dan benchmarks diimpor dari akar repo tanpa instalasi
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
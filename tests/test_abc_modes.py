@@ -0,0 +1,92 @@
+"""Klasifikasi ABC per tanggal ('harian') dan per minggu ('mingguan')."""
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from benchmarks.synthetic import generate_produk, generate_sales
+from rop_engine.normalize import normalize_produk, normalize_sales
+from rop_engine.partitioned import iter_rop_chunks
+from rop_engine.rolling import analysis_dates, build_sales_matrix, classify_abc_by_date, compute_rolling_frame
+from rop_engine.rop import apply_rop_method
+
+KEYS = ['City', 'No. Barang', 'Date']
+START, END = '2024-05-01', '2024-06-14'
+
+
+@pytest.fixture(scope='module')
+def sales_data():
+    penjualan = normalize_sales(generate_sales(n_skus=60, n_cities=2, n_days=200, sparsity=0.8, seed=3))
+    produk = normalize_produk(generate_produk(n_skus=60, seed=3))
+    return penjualan, produk
+
+
+def test_weekly_classes_repeat_class_of_week_start(sales_data):
+    penjualan, produk = sales_data
+    daily = compute_rolling_frame(penjualan, produk, START, END, abc_mode='harian').sort_values(KEYS)
+    weekly = compute_rolling_frame(penjualan, produk, START, END, abc_mode='mingguan').sort_values(KEYS)
+    day_index = (weekly['Date'] - pd.Timestamp(START)).dt.days
+    week_start = daily[(daily['Date'] - pd.Timestamp(START)).dt.days % 7 == 0].copy()
+    week_start['Minggu'] = (week_start['Date'] - pd.Timestamp(START)).dt.days // 7
+    week_start = week_start.set_index(['City', 'No. Barang', 'Minggu'])['Kategori ABC']
+    expected = week_start.reindex(pd.MultiIndex.from_arrays([weekly['City'], weekly['No. Barang'], day_index // 7]))
+    assert (weekly['Kategori ABC'].astype(str).to_numpy() == expected.astype(str).to_numpy()).all()
+    # Kelas memang berubah antar minggu pada data ini, jadi pengujian di atas tidak trivial
+    assert (daily['Kategori ABC'].astype(str).to_numpy() != weekly['Kategori ABC'].astype(str).to_numpy()).any()
+
+
+@pytest.mark.parametrize('abc_mode', ['harian', 'mingguan'])
+def test_partitioned_matches_full_frame(sales_data, abc_mode):
+    penjualan, produk = sales_data
+    full = apply_rop_method(compute_rolling_frame(penjualan, produk, START, END, abc_mode=abc_mode), "ABC Bertingkat")
+    chunks = pd.concat([chunk for _, chunk in iter_rop_chunks(penjualan, produk, START, END, "ABC Bertingkat",
+                                                               chunk_rows=500, abc_mode=abc_mode)])
+    full, chunks = full.sort_values(KEYS).reset_index(drop=True), chunks.sort_values(KEYS).reset_index(drop=True)
+    assert (full['ROP'].to_numpy() == chunks['ROP'].to_numpy()).all()
+    assert (full['Kategori ABC'].astype(str).to_numpy() == chunks['Kategori ABC'].astype(str).to_numpy()).all()
+
+
+@pytest.mark.parametrize('every', [1, 7])
+@pytest.mark.parametrize('block_cols', [1, 4, 13, 1000])
+def test_blocked_classification_matches_single_block(sales_data, every, block_cols):
+    penjualan, _ = sales_data
+    date_range_full, out_cols = analysis_dates(START, END)
+    items, matrix = build_sales_matrix(penjualan, date_range_full)
+    whole = classify_abc_by_date(items, matrix, out_cols, every=every)
+    blocked = classify_abc_by_date(items, matrix, out_cols, every=every, block_cols=block_cols)
+    assert (np.asarray(blocked.codes) == np.asarray(whole.codes)).all()
+
+
+def traced_peak(fn):
+    tracemalloc.start()
+    try:
+        fn()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def test_partitioned_daily_peak_memory_bounded_by_chunk():
+    # Satu kota, rentang setahun: pada mode 'harian' array skor/peringkat per tanggal tidak boleh
+    # dibuat untuk seluruh rentang sekaligus, jadi puncak memori jauh di bawah perhitungan penuh
+    penjualan = normalize_sales(generate_sales(n_skus=400, n_cities=1, n_days=500, sparsity=0.9, seed=1))
+    produk = normalize_produk(generate_produk(n_skus=400, seed=1))
+    start, end = '2024-04-01', '2025-03-31'
+    date_range_full, out_cols = analysis_dates(start, end)
+    items, matrix = build_sales_matrix(penjualan, date_range_full)
+
+    def consume():
+        for _, chunk in iter_rop_chunks(penjualan, produk, start, end, "ABC Bertingkat", chunk_rows=5000,
+                                        abc_mode='harian'):
+            del chunk
+
+    full_peak = traced_peak(lambda: compute_rolling_frame(penjualan, produk, start, end, abc_mode='harian'))
+    partitioned_peak = traced_peak(consume)
+    assert partitioned_peak < full_peak / 4
+    # Matriks kota dan prefix sum-nya (3 x matriks) ditambah beberapa potongan hasil
+    assert partitioned_peak < 4 * matrix.nbytes + 5000 * 400
+
+    block_peak = traced_peak(lambda: classify_abc_by_date(items, matrix, out_cols, block_cols=12))
+    whole_peak = traced_peak(lambda: classify_abc_by_date(items, matrix, out_cols))
+    assert block_peak < whole_peak / 2
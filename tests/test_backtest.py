@@ -0,0 +1,51 @@
+"""run_backtest: proses paralel sama dengan serial, dan satu jendela sama dengan perhitungan halaman error."""
+import numpy as np
+import pandas as pd
+import pytest
+
+from benchmarks.synthetic import generate_produk, generate_sales
+from rop_engine import compute_rolling_frame
+from rop_engine.backtest import backtest_windows, run_backtest
+from rop_engine.normalize import normalize_produk, normalize_sales
+from rop_engine.rop import ROP_METHODS, abc_codes, evaluate_z_grid, score_methods
+
+
+@pytest.fixture(scope='module')
+def data():
+    penjualan = normalize_sales(generate_sales(n_skus=40, n_cities=3, n_days=300, sparsity=0.85, seed=9))
+    produk = normalize_produk(generate_produk(n_skus=40, seed=9))
+    return penjualan, produk
+
+
+@pytest.mark.parametrize('abc_mode', ['rentang', 'harian'])
+def test_process_pool_matches_serial(data, abc_mode):
+    penjualan, _ = data
+    windows = backtest_windows('2024-05-01', '2024-09-30', window_days=30, step_days=21)
+    assert len(windows) == 6
+    serial = run_backtest(penjualan, windows, max_workers=1, abc_mode=abc_mode)
+    parallel = run_backtest(penjualan, windows, max_workers=3, abc_mode=abc_mode)
+    assert len(serial) == len(windows) * len(ROP_METHODS)
+    pd.testing.assert_frame_equal(parallel, serial)
+
+
+def page_scores(penjualan, produk, start, end, abc_mode):
+    """Ringkasan halaman Analisis Error untuk rentang yang sama."""
+    df = compute_rolling_frame(penjualan, produk, start, end, abc_mode=abc_mode)
+    actual = df['Penjualan_Aktual_21_Hari'].to_numpy(dtype=float)
+    valid = ~np.isnan(actual)
+    stats = evaluate_z_grid(df['ADS'].to_numpy(dtype=float)[valid], df['std_dev_90d'].to_numpy(dtype=float)[valid],
+                            actual[valid], abc_codes(df['Kategori ABC'])[valid])
+    return score_methods(stats)
+
+
+@pytest.mark.parametrize('abc_mode', ['rentang', 'harian', 'mingguan'])
+def test_single_window_matches_error_page(data, abc_mode):
+    penjualan, produk = data
+    start, end = pd.Timestamp('2024-06-03'), pd.Timestamp('2024-07-14')
+    result = run_backtest(penjualan, [(start, end)], abc_mode=abc_mode).set_index('Metode')
+    expected = page_scores(penjualan, produk, start, end, abc_mode)
+    assert (result['Awal'] == start).all() and (result['Akhir'] == end).all()
+    assert list(result.index) == list(expected.index)
+    assert (result['Jumlah Hari Stockout'] == expected['Jumlah Hari Stockout']).all()
+    for col in ['MAE', 'Rata-rata Error (Bias)', 'Tingkat Stockout (%)']:
+        np.testing.assert_allclose(result[col].to_numpy(), expected[col].to_numpy(), rtol=1e-12, err_msg=col)
@@ -0,0 +1,102 @@
+"""ErrorCube.rollup terhadap groupby pandas atas frame detail, untuk setiap tingkat drill-down."""
+import numpy as np
+import pandas as pd
+import pytest
+
+from rop_engine.cube import CUBE_DIMENSIONS, MISSING_LABEL, ErrorCube
+
+METHODS = ['Uniform', 'Dynamic', 'ABC Bertingkat']
+# Tingkat drill-down seperti di halaman Analisis Error, plus beberapa kombinasi lain
+LEVELS = [
+    [],
+    ['City'],
+    ['City', 'Kategori ABC'],
+    ['City', 'Kategori ABC', 'BRAND Barang'],
+    CUBE_DIMENSIONS,
+    ['Kategori Barang'],
+    ['BRAND Barang', 'Kategori ABC'],
+]
+
+
+@pytest.fixture(scope='module')
+def detail():
+    rng = np.random.default_rng(21)
+    n = 5000
+    df = pd.DataFrame({
+        'City': rng.choice(['Surabaya', 'Jakarta', 'Bali', 'Semarang'], size=n),
+        'Kategori ABC': pd.Categorical(rng.choice(['A', 'B', 'C', 'D'], size=n, p=[0.2, 0.3, 0.4, 0.1]),
+                                       categories=['A', 'B', 'C', 'D']),
+        # Barang yang tidak ada di produk referensi: BRAND/kategori kosong
+        'BRAND Barang': rng.choice(np.array(['Merek A', 'Merek B', 'Merek C', None], dtype=object), size=n),
+        'Kategori Barang': rng.choice(np.array(['Logam', 'Plastik', np.nan], dtype=object), size=n),
+        'ROP': rng.integers(0, 50, size=n),
+    })
+    errors = {method: np.round(rng.normal(shift, 6, size=n)) for method, shift in zip(METHODS, [-2, 0, 3])}
+    return df, errors
+
+
+def expected_rollup(df, errors, by, filters=None):
+    """Metrik yang sama langsung dari baris detail: satu baris per (baris detail, metode)."""
+    dims = df[CUBE_DIMENSIONS].astype(object).where(df[CUBE_DIMENSIONS].notna(), MISSING_LABEL).astype(str)
+    long = pd.concat([dims.assign(Metode=method, Error=err) for method, err in errors.items()], ignore_index=True)
+    long['Metode'] = pd.Categorical(long['Metode'], categories=list(errors))
+    for dim, selected in (filters or {}).items():
+        if selected:
+            long = long[long[dim].isin(selected)]
+    long['Error Absolut'] = long['Error'].abs()
+    long['Stockout'] = long['Error'] < 0
+    grouped = long.groupby(by + ['Metode'], observed=True).agg(
+        MAE=('Error Absolut', 'mean'), Bias=('Error', 'mean'), Stockout=('Stockout', 'sum'),
+        Tingkat=('Stockout', 'mean'), Baris=('Error', 'size'),
+    )
+    return pd.DataFrame({
+        'MAE': grouped['MAE'],
+        'Rata-rata Error (Bias)': grouped['Bias'],
+        'Jumlah Hari Stockout': grouped['Stockout'],
+        'Tingkat Stockout (%)': 100 * grouped['Tingkat'],
+        'Jumlah Baris': grouped['Baris'],
+    })
+
+
+def assert_rollup_matches(cube, df, errors, by, filters=None):
+    result = cube.rollup(by=by, filters=filters)
+    expected = expected_rollup(df, errors, by, filters)
+    assert len(result) == len(expected) > 0
+    assert list(result.index.names) == by + ['Metode']
+    expected = expected.reindex(result.index)
+    for col in ['Jumlah Hari Stockout', 'Jumlah Baris']:
+        assert (result[col].to_numpy() == expected[col].to_numpy()).all(), col
+    for col in ['MAE', 'Rata-rata Error (Bias)', 'Tingkat Stockout (%)']:
+        np.testing.assert_allclose(result[col].to_numpy(), expected[col].to_numpy(), rtol=1e-12, err_msg=col)
+    return result
+
+
+@pytest.mark.parametrize('by', LEVELS, ids=lambda by: '+'.join(by) or 'total')
+def test_rollup_matches_groupby(detail, by):
+    df, errors = detail
+    cube = ErrorCube(df, errors)
+    result = assert_rollup_matches(cube, df, errors, by)
+    # Urutan: nilai dimensi terurut (kosong terakhir), metode sesuai urutan asli
+    methods = result.index.get_level_values('Metode')
+    assert list(methods[:len(METHODS)]) == METHODS
+    if by:
+        first = result.index.get_level_values(by[0]).unique()
+        assert list(first) == sorted(first, key=lambda v: (v == MISSING_LABEL, v))
+
+
+@pytest.mark.parametrize('by', [[], ['City'], ['Kategori ABC', 'BRAND Barang']], ids=lambda by: '+'.join(by) or 'total')
+def test_filtered_rollup_matches_groupby(detail, by):
+    df, errors = detail
+    cube = ErrorCube(df, errors)
+    filters = {'City': ['Surabaya', 'Bali'], 'Kategori ABC': ['A', 'B'], 'BRAND Barang': [], 'Kategori Barang': [MISSING_LABEL]}
+    assert_rollup_matches(cube, df, errors, by, filters)
+    assert cube.rollup(by=by, filters={'City': ['Medan']}).empty
+
+
+def test_cube_is_much_smaller_than_detail(detail):
+    df, errors = detail
+    cube = ErrorCube(df, errors)
+    assert cube.methods == METHODS
+    assert cube.options['BRAND Barang'] == sorted(['Merek A', 'Merek B', 'Merek C', MISSING_LABEL])
+    assert len(cube.cells) == len(METHODS) * len(df[CUBE_DIMENSIONS].astype(str).drop_duplicates())
+    assert len(cube.cells) < len(df) * len(METHODS) / 10
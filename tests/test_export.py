@@ -0,0 +1,85 @@
+"""Ekspor pivot ROP/SO: workbook streaming dibaca ulang sama dengan to_excel lama; CSV zip dan parquet."""
+import io
+import zipfile
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from rop_engine.export import export_rop_result
+from rop_engine.pivots import PIVOT_INDEX_COLS, city_pivot, pivot_sheet_name
+
+INDEX_COL = list(range(len(PIVOT_INDEX_COLS)))
+
+
+@pytest.fixture(scope='module')
+def result_df():
+    rng = np.random.default_rng(3)
+    items = pd.DataFrame({
+        'No. Barang': ['007', 'BRG-1', 'BRG-2'],
+        'Nama Barang': ['Baut', 'Mur', 'Ring'],
+        'BRAND Barang': ['Merek A', None, 'Merek B'],
+        'Kategori Barang': ['Logam', 'Logam', None],
+    })
+    frames = []
+    for city in ['Surabaya', 'Kota Baru']:
+        for date in pd.date_range('2024-05-01', periods=3):
+            frame = items.assign(City=city, Date=date, **{'Kategori ABC': ['A', 'B', 'C']})
+            frame['ROP'] = rng.integers(0, 500, size=len(items))
+            frame['SO'] = rng.integers(0, 50, size=len(items))
+            frames.append(frame)
+    result = pd.concat(frames, ignore_index=True)
+    # Satu item tidak punya baris di salah satu tanggal kota kedua
+    return result.drop(index=result.index[(result['City'] == 'Kota Baru') & (result['No. Barang'] == 'BRG-2')][:1])
+
+
+def legacy_xlsx(result_df):
+    """Ekspor versi lama: ExcelWriter + DataFrame.to_excel per kota."""
+    output = io.BytesIO()
+    with pd.ExcelWriter(output, engine='openpyxl') as writer:
+        for city in sorted(str(c) for c in result_df['City'].dropna().unique()):
+            city_pivot(result_df[result_df['City'] == city]).to_excel(writer, sheet_name=pivot_sheet_name(city), index=True)
+    output.seek(0)
+    return output
+
+
+def export_bytes(result_df, fmt):
+    fh = io.BytesIO()
+    export_rop_result(result_df, fmt, fh)
+    fh.seek(0)
+    return fh
+
+
+def test_xlsx_reads_back_like_legacy_to_excel(result_df):
+    new = pd.read_excel(export_bytes(result_df, 'xlsx'), sheet_name=None, header=[0, 1], index_col=INDEX_COL)
+    old = pd.read_excel(legacy_xlsx(result_df), sheet_name=None, header=[0, 1], index_col=INDEX_COL)
+    assert list(new) == list(old) == ['ROP_Kota_Baru', 'ROP_Surabaya']
+    for sheet in old:
+        pd.testing.assert_frame_equal(new[sheet], old[sheet])
+        assert new[sheet].shape == (3, 6)
+
+
+def test_csv_zip_holds_one_pivot_per_city(result_df):
+    with zipfile.ZipFile(export_bytes(result_df, 'csv_zip')) as zf:
+        assert sorted(zf.namelist()) == ['ROP_Kota_Baru.csv', 'ROP_Surabaya.csv']
+        for city in ['Surabaya', 'Kota Baru']:
+            with zf.open(f"{pivot_sheet_name(city)}.csv") as member:
+                back = pd.read_csv(member, header=[0, 1], index_col=INDEX_COL, dtype={0: str})
+            expected = city_pivot(result_df[result_df['City'] == city])
+            assert back.index.tolist() == expected.index.tolist()
+            assert back.columns.tolist() == expected.columns.tolist()
+            assert (back.to_numpy() == expected.to_numpy()).all()
+
+
+def test_parquet_is_long_format(result_df):
+    back = pd.read_parquet(export_bytes(result_df, 'parquet'))
+    assert back.columns.tolist() == ['City'] + PIVOT_INDEX_COLS + ['Date', 'Kategori ABC', 'ROP', 'SO']
+    assert len(back) == len(result_df)
+    expected = result_df[back.columns].reset_index(drop=True)
+    pd.testing.assert_frame_equal(back.astype({'Kategori ABC': object}), expected.astype({'Kategori ABC': object}),
+                                  check_dtype=False)
+
+
+def test_unknown_format_is_rejected(result_df):
+    with pytest.raises(ValueError):
+        export_rop_result(result_df, 'pdf', io.BytesIO())
@@ -0,0 +1,41 @@
+"""ParsedFileCache: simpan/baca parquet per versi file, dan kegagalan tulis yang tidak fatal."""
+import os
+
+import pandas as pd
+
+from rop_engine.file_cache import ParsedFileCache
+from rop_engine.gdrive import read_with_cache
+
+FILE_INFO = {'id': 'f1', 'name': 'a.csv', 'md5Checksum': 'v1'}
+
+
+def sample_frame():
+    return pd.DataFrame({'Tgl Faktur': ['2024-01-01'], 'No. Barang': ['007'], 'Kuantitas': [3]})
+
+
+def test_put_then_get_same_version(tmp_path):
+    cache = ParsedFileCache(cache_dir=str(tmp_path))
+    cache.put(FILE_INFO, sample_frame())
+    pd.testing.assert_frame_equal(cache.get(FILE_INFO), sample_frame())
+    assert cache.get({**FILE_INFO, 'md5Checksum': 'v2'}) is None
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_failed_write_does_not_block_load(tmp_path, monkeypatch):
+    def broken_to_parquet(self, *args, **kwargs):
+        raise ImportError("Unable to find a usable engine; tried using: 'pyarrow'")
+
+    monkeypatch.setattr(pd.DataFrame, 'to_parquet', broken_to_parquet)
+    cache = ParsedFileCache(cache_dir=str(tmp_path))
+    cache.put(FILE_INFO, sample_frame())
+    assert cache.write_errors == 1
+    assert os.listdir(tmp_path) == []
+
+    class Service:
+        pass
+
+    monkeypatch.setattr('rop_engine.gdrive.download_bytes', lambda service, file_id: None)
+    monkeypatch.setattr('rop_engine.gdrive.read_sales_bytes', lambda fh, file_name: sample_frame())
+    df = read_with_cache(cache, Service(), FILE_INFO)
+    pd.testing.assert_frame_equal(df, sample_frame())
+    assert cache.stats()['write_errors'] == 2
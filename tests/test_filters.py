@@ -0,0 +1,74 @@
+"""ResultIndex terhadap filter lama halaman hasil (astype(str).isin per kolom, lalu per kota)."""
+import itertools
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from rop_engine.filters import FILTER_COLUMNS, ResultIndex
+
+
+@pytest.fixture(scope='module')
+def result_df():
+    rng = np.random.default_rng(12)
+    n = 600
+    df = pd.DataFrame({
+        'City': rng.choice(['Surabaya', 'Jakarta', 'Bali'], size=n),
+        'Kategori Barang': rng.choice(np.array(['Logam', 'Plastik', 'Kayu', None], dtype=object), size=n),
+        # Angka dan teks yang sama-sama menjadi '123' setelah astype(str)
+        'BRAND Barang': rng.choice(np.array(['Merek A', 'Merek B', 123, '123', np.nan], dtype=object), size=n),
+        'Nama Barang': [f"Barang {i % 17}" for i in range(n)],
+        'ROP': rng.integers(0, 100, size=n),
+    })
+    df['Kategori Barang'] = df['Kategori Barang'].astype('category')
+    return df
+
+
+def legacy_options(df):
+    return {col: sorted(df[col].dropna().unique().astype(str)) for col in FILTER_COLUMNS}
+
+
+def legacy_filter(df, selections):
+    for col, selected in selections.items():
+        if selected:
+            df = df[df[col].astype(str).isin(selected)]
+    return df
+
+
+def legacy_cities(df):
+    return sorted(str(city) for city in df['City'].dropna().unique())
+
+
+SELECTIONS = {
+    'Kategori Barang': [[], ['Logam'], ['Plastik', 'Kayu'], ['Tidak Ada']],
+    'BRAND Barang': [[], ['123'], ['Merek A', '123'], ['Merek B']],
+    'Nama Barang': [[], ['Barang 3'], ['Barang 0', 'Barang 16', 'Barang 5']],
+}
+
+
+def test_options_match_legacy(result_df):
+    # Versi lama bisa menampilkan label yang sama dua kali (123 dan '123'); indeks menyatukannya
+    assert ResultIndex(result_df).options == {col: sorted(set(opts)) for col, opts in legacy_options(result_df).items()}
+
+
+@pytest.mark.parametrize('kategori, brand, nama', list(itertools.product(*SELECTIONS.values())))
+def test_filters_match_legacy(result_df, kategori, brand, nama):
+    index = ResultIndex(result_df)
+    selections = {'Kategori Barang': kategori, 'BRAND Barang': brand, 'Nama Barang': nama}
+    expected = legacy_filter(result_df, selections)
+
+    subset = index.subset(selections)
+    assert subset.index.tolist() == expected.index.tolist()
+    assert index.count(selections) == len(expected)
+    assert index.cities(selections) == legacy_cities(expected)
+    for city in ['Surabaya', 'Jakarta', 'Bali', 'Medan']:
+        by_city = index.subset(selections, city=city)
+        assert by_city.index.tolist() == expected[expected['City'] == city].index.tolist()
+
+
+def test_no_selection_returns_frame_unchanged(result_df):
+    index = ResultIndex(result_df)
+    empty = {col: [] for col in FILTER_COLUMNS}
+    assert index.mask(empty) is None
+    assert index.subset(empty) is result_df
+    assert index.count(empty) == len(result_df)
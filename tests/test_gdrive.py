@@ -0,0 +1,124 @@
+"""rop_engine.gdrive terhadap service Drive palsu (tanpa jaringan)."""
+import threading
+import time
+
+import httplib2
+import pytest
+
+from rop_engine.gdrive import download_bytes, list_all_files, load_files_concurrently
+
+
+class FakeHttp:
+    def __init__(self, content):
+        self.content = content
+
+    def request(self, uri, method='GET', **kwargs):
+        return httplib2.Response({'status': 200, 'content-length': str(len(self.content))}), self.content
+
+
+class FakeMediaRequest:
+    def __init__(self, content):
+        self.uri = 'https://fake.drive/media'
+        self.headers = {}
+        self.http = FakeHttp(content)
+
+
+class FakeCall:
+    def __init__(self, fn):
+        self.fn = fn
+
+    def execute(self):
+        return self.fn()
+
+
+class FakeFiles:
+    def __init__(self, drive):
+        self.drive = drive
+
+    def list(self, q, fields, pageSize, pageToken=None):
+        def run():
+            self.drive.list_calls.append(pageToken)
+            page = int(pageToken or 0)
+            start = page * pageSize
+            response = {'files': self.drive.listing[start:start + pageSize]}
+            if start + pageSize < len(self.drive.listing):
+                response['nextPageToken'] = str(page + 1)
+            return response
+        return FakeCall(run)
+
+    def get_media(self, fileId):
+        if fileId not in self.drive.contents:
+            raise RuntimeError(f"file {fileId} tidak ada")
+        delay = self.drive.delays.get(fileId, 0)
+        if delay:
+            time.sleep(delay)
+        return FakeMediaRequest(self.drive.contents[fileId])
+
+
+class FakeDrive:
+    """Service Drive palsu: files().list() berhalaman dan get_media() dari dict id -> isi file."""
+
+    def __init__(self, listing=(), contents=None, delays=None):
+        self.listing = list(listing)
+        self.contents = contents or {}
+        self.delays = delays or {}
+        self.list_calls = []
+
+    def files(self):
+        return FakeFiles(self)
+
+
+def sales_csv(qty):
+    return f"Tgl Faktur,Dept.,Nama Pelanggan,No. Barang,Kuantitas\n2024-01-01,C,Budi,007,{qty}\n".encode()
+
+
+def test_list_all_files_follows_every_page_token():
+    listing = [{'id': f"f{i}", 'name': f"file{i}.csv"} for i in range(7)]
+    drive = FakeDrive(listing)
+    files = list_all_files(drive, 'folder', page_size=3)
+    assert files == listing
+    assert drive.list_calls == [None, '1', '2']
+
+
+def test_download_bytes_returns_rewound_buffer():
+    drive = FakeDrive(contents={'a': b'isi file'})
+    fh = download_bytes(drive, 'a')
+    assert fh.read() == b'isi file'
+
+
+def test_load_files_concurrently_keeps_order_and_reports_errors():
+    files = [{'id': f"f{i}", 'name': f"file{i}.csv"} for i in range(5)]
+    # File awal paling lambat, jadi urutan selesai berbeda dari urutan daftar
+    drive = FakeDrive(
+        contents={f"f{i}": sales_csv(i + 1) for i in range(5) if i != 2},
+        delays={'f0': 0.2, 'f1': 0.1},
+    )
+    progress = []
+
+    def on_progress(done, total, file_info, error):
+        progress.append((done, total, file_info['id'], error is not None, threading.current_thread() is main))
+
+    main = threading.current_thread()
+    dfs, errors = load_files_concurrently(lambda: drive, files, max_workers=4, on_progress=on_progress)
+
+    assert [int(df['Kuantitas'].iloc[0]) for df in dfs] == [1, 2, 4, 5]
+    assert [df['No. Barang'].iloc[0] for df in dfs] == ['007'] * 4
+    assert [(info['id'], type(error)) for info, error in errors] == [('f2', RuntimeError)]
+    assert [p[0] for p in progress] == [1, 2, 3, 4, 5]
+    assert sorted(p[2] for p in progress) == [f"f{i}" for i in range(5)]
+    assert all(p[1] == 5 and p[4] for p in progress)
+    assert [p[2] for p in progress if p[3]] == ['f2']
+
+
+@pytest.mark.parametrize('max_workers', [1, 8])
+def test_load_files_concurrently_one_service_per_worker(max_workers):
+    files = [{'id': f"f{i}", 'name': f"file{i}.csv"} for i in range(6)]
+    created = []
+
+    def factory():
+        created.append(threading.current_thread().name)
+        return FakeDrive(contents={f"f{i}": sales_csv(1) for i in range(6)})
+
+    dfs, errors = load_files_concurrently(factory, files, max_workers=max_workers)
+    assert len(dfs) == 6 and not errors
+    assert len(created) == len(set(created)) <= max_workers
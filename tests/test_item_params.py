@@ -0,0 +1,180 @@
+"""
+Tabel parameter lead time/jendela: validasi, urutan prioritas tingkat kunci, dan
+kesetaraan item yang diatur dengan perhitungan bawaan yang memakai nilai itu secara global.
+"""
+import numpy as np
+import pandas as pd
+import pytest
+
+from benchmarks.synthetic import generate_produk, generate_sales
+from rop_engine.item_params import ItemParamsError, normalize_item_params, param_bounds, resolve_item_params
+from rop_engine.normalize import normalize_produk, normalize_sales
+from rop_engine.rolling import analysis_dates, build_sales_matrix, compute_rolling_frame, rolling_stats
+from rop_engine.rop import ROP_METHODS, abc_codes, apply_rop_method, compute_rop, evaluate_z_grid, row_lead_times
+from rop_engine.simulation import run_simulation, simulate_inventory, simulation_arrays
+
+ITEMS = pd.DataFrame({
+    'City': ['Surabaya', 'Surabaya', 'Bali', 'Bali', 'Semarang'],
+    'No. Barang': ['007', '008', '007', '009', '010'],
+})
+
+
+def resolve(rows):
+    params = normalize_item_params(pd.DataFrame(rows, columns=['City', 'No. Barang', 'Lead Time', 'Jendela']))
+    resolved = resolve_item_params(ITEMS, params)
+    return list(resolved['Lead Time']), list(resolved['Jendela'])
+
+
+def test_defaults_without_matching_rows():
+    assert resolve([['Jakarta', None, 5, 10]]) == ([21] * 5, [90] * 5)
+
+
+def test_blank_keys_apply_to_every_item():
+    assert resolve([[None, None, 30, None]]) == ([30] * 5, [90] * 5)
+
+
+def test_more_specific_levels_take_precedence():
+    lead, window = resolve([
+        ['Surabaya', '007', 7, None],   # City + No. Barang
+        [None, '007', 14, 60],          # No. Barang saja
+        ['Surabaya', None, 10, 45],     # City saja
+        [None, None, 30, 120],          # semua item
+    ])
+    # Surabaya/007: lead dari (City, No. Barang), jendela dari No. Barang (tidak diatur di baris paling spesifik)
+    # Surabaya/008: City; Bali/007: No. Barang; Bali/009 & Semarang/010: baris tanpa kunci
+    assert lead == [7, 10, 14, 30, 30]
+    assert window == [60, 45, 60, 120, 120]
+
+
+def test_row_order_does_not_change_precedence():
+    rows = [['Surabaya', '007', 7, None], [None, None, 30, None], ['Surabaya', None, 10, None], [None, '007', 14, None]]
+    assert resolve(rows) == resolve(rows[::-1])
+
+
+def test_last_duplicate_row_wins():
+    assert resolve([[None, None, 30, None], [None, None, 40, None]])[0] == [40] * 5
+    assert resolve([['Bali', None, 5, None], ['Bali', None, 6, None]])[0] == [21, 21, 6, 6, 21]
+
+
+def test_param_bounds_include_defaults():
+    params = normalize_item_params(pd.DataFrame({'City': [None, 'Bali'], 'Lead Time': [30, 7], 'Jendela': [None, 60]}))
+    assert param_bounds(params) == (90, 30)
+
+
+@pytest.mark.parametrize('values', [[0], [366], [1.5], ['abc']])
+def test_invalid_values_are_rejected(values):
+    with pytest.raises(ItemParamsError):
+        normalize_item_params(pd.DataFrame({'City': ['Bali'] * len(values), 'Lead Time': values}))
+
+
+START, END = '2024-05-01', '2024-06-30'
+STAT_COLUMNS = ['SO', 'sales_90d', 'std_dev_90d', 'ADS', 'Penjualan_Aktual_21_Hari']
+# (City, No. Barang, Lead Time, Jendela); city kedua seluruhnya diatur dengan nilai di atas bawaan
+OVERRIDES = [('Surabaya', 'BRG000000', 7, 45), ('Surabaya', 'BRG000001', None, 60), ('Jakarta', None, 35, 120)]
+
+
+@pytest.fixture(scope='module')
+def override_run():
+    penjualan = normalize_sales(generate_sales(n_skus=25, n_cities=2, n_days=260, sparsity=0.8, seed=22))
+    produk = normalize_produk(generate_produk(n_skus=25, seed=22))
+    assert sorted(penjualan['City'].unique()) == ['Jakarta', 'Surabaya']
+    params = normalize_item_params(pd.DataFrame(OVERRIDES, columns=['City', 'No. Barang', 'Lead Time', 'Jendela']))
+    default = compute_rolling_frame(penjualan, produk, START, END)
+    overridden = compute_rolling_frame(penjualan, produk, START, END, item_params=params)
+    return penjualan, default, overridden
+
+
+def global_run(penjualan, lead_time, window):
+    """Frame statistik bawaan dengan lead time dan jendela global (jalur skalar rolling_stats)."""
+    date_range_full, out_cols = analysis_dates(START, END, window, lead_time)
+    items, matrix = build_sales_matrix(penjualan, date_range_full)
+    stats = rolling_stats(matrix, out_cols, window=window, lookahead=lead_time)
+    frame = items.iloc[np.repeat(np.arange(len(items)), len(out_cols))].reset_index(drop=True)
+    frame['Date'] = np.tile(date_range_full[out_cols].to_numpy(), len(items))
+    frame['SO'] = matrix[:, out_cols].ravel()
+    for col in ['sales_90d', 'std_dev_90d', 'ADS', 'Penjualan_Aktual_21_Hari']:
+        frame[col] = stats[col].ravel()
+    return frame
+
+
+def override_groups(frame):
+    """Mask baris per (lead time, jendela) hasil tabel OVERRIDES, plus baris tanpa pengaturan."""
+    lead, window = frame['Lead Time'].to_numpy(), frame['Jendela'].to_numpy()
+    groups = {(int(lt), int(w)): (lead == lt) & (window == w) for lt, w in {(lt, w) for lt, w in zip(lead, window)}}
+    assert set(groups) == {(7, 45), (21, 60), (35, 120), (21, 90)}
+    return groups
+
+
+def test_overridden_items_match_global_run(override_run):
+    penjualan, default, overridden = override_run
+    assert len(overridden) == len(default)
+    for col in ['City', 'No. Barang', 'Date', 'Kategori ABC']:
+        assert (overridden[col].astype(str).to_numpy() == default[col].astype(str).to_numpy()).all(), col
+    for (lead_time, window), rows in override_groups(overridden).items():
+        expected = global_run(penjualan, lead_time, window)
+        assert (expected['No. Barang'].to_numpy() == default['No. Barang'].to_numpy()).all()
+        for col in STAT_COLUMNS:
+            np.testing.assert_array_equal(overridden.loc[rows, col].to_numpy(dtype=float),
+                                          expected.loc[rows, col].to_numpy(dtype=float), err_msg=f"{col} {lead_time}/{window}")
+    # Item tanpa pengaturan tidak berubah sama sekali
+    rows = override_groups(overridden)[(21, 90)]
+    pd.testing.assert_frame_equal(overridden.loc[rows, default.columns].reset_index(drop=True),
+                                  default.loc[rows].reset_index(drop=True))
+
+
+@pytest.mark.parametrize('method', list(ROP_METHODS))
+def test_overridden_rop_matches_global_run(override_run, method):
+    penjualan, default, overridden = override_run
+    result = apply_rop_method(overridden, method)
+    codes = abc_codes(default['Kategori ABC'])
+    for (lead_time, window), rows in override_groups(overridden).items():
+        expected = global_run(penjualan, lead_time, window)
+        rop = compute_rop(expected['ADS'].to_numpy(), expected['std_dev_90d'].to_numpy(), codes, ROP_METHODS[method],
+                          lead_time, window)
+        np.testing.assert_array_equal(result.loc[rows, 'ROP'].to_numpy(dtype=float), rop[rows])
+    rows = override_groups(overridden)[(21, 90)]
+    np.testing.assert_array_equal(result.loc[rows, 'ROP'].to_numpy(), apply_rop_method(default, method).loc[rows, 'ROP'].to_numpy())
+
+
+def test_z_grid_with_row_lead_times_sums_global_runs(override_run):
+    penjualan, _, overridden = override_run
+
+    def grid(frame, lead_time, period):
+        return evaluate_z_grid(frame['ADS'].to_numpy(dtype=float), frame['std_dev_90d'].to_numpy(dtype=float),
+                               frame['Penjualan_Aktual_21_Hari'].to_numpy(dtype=float), abc_codes(frame['Kategori ABC']),
+                               lead_time=lead_time, period=period)
+
+    combined = grid(overridden, *row_lead_times(overridden))
+    parts = []
+    for (lead_time, window), rows in override_groups(overridden).items():
+        expected = global_run(penjualan, lead_time, window)[rows]
+        expected['Kategori ABC'] = overridden.loc[rows, 'Kategori ABC']
+        parts.append(grid(expected, lead_time, window))
+    for key in ['count', 'stockouts']:
+        np.testing.assert_array_equal(combined[key], sum(part[key] for part in parts), err_msg=key)
+    for key in ['sum_err', 'sum_abs_err']:
+        np.testing.assert_allclose(combined[key], sum(part[key] for part in parts), rtol=1e-12, err_msg=key)
+
+
+def test_overridden_simulation_matches_global_run(override_run):
+    penjualan, default, overridden = override_run
+    item_df, sim = run_simulation(overridden)
+    _, _, arrays = simulation_arrays(overridden)
+    for (lead_time, window), rows in override_groups(overridden).items():
+        items = np.flatnonzero((arrays['Lead Time'] == lead_time) & (arrays['Jendela'] == window))
+        assert len(items) == len(overridden.loc[rows, ['City', 'No. Barang']].drop_duplicates()) > 0
+        expected = global_run(penjualan, lead_time, window)
+        expected['Kategori ABC'] = default['Kategori ABC']
+        _, _, expected_arrays = simulation_arrays(expected)
+        expected_sim = simulate_inventory(expected_arrays['SO'][items], expected_arrays['ADS'][items],
+                                          expected_arrays['std_dev_90d'][items], expected_arrays['abc'][items],
+                                          ROP_METHODS, lead_time=lead_time, period=window)
+        for name in ['Permintaan', 'Terpenuhi', 'Hari Stockout', 'Total Stok', 'Jumlah Pesanan']:
+            np.testing.assert_array_equal(sim[name][:, items], expected_sim[name], err_msg=f"{name} {lead_time}/{window}")
+    # Item tanpa pengaturan: sama dengan simulasi bawaan
+    default_items, default_sim = run_simulation(default)
+    pd.testing.assert_frame_equal(item_df, default_items)
+    items = np.flatnonzero((arrays['Lead Time'] == 21) & (arrays['Jendela'] == 90))
+    assert 0 < len(items) < len(item_df)
+    for name in ['Permintaan', 'Terpenuhi', 'Hari Stockout', 'Total Stok', 'Jumlah Pesanan']:
+        np.testing.assert_array_equal(sim[name][:, items], default_sim[name][:, items], err_msg=name)
@@ -0,0 +1,89 @@
+"""LRUMemo (batas byte) dan frame_fingerprint (cache per objek lewat weakref)."""
+import gc
+import weakref
+
+import numpy as np
+import pandas as pd
+
+from rop_engine import memo
+from rop_engine.memo import LRUMemo, frame_fingerprint
+
+
+def frame_kb(kb):
+    return pd.DataFrame({'x': np.zeros(kb * 1024 // 8)})
+
+
+def size_of(kb):
+    # Ukuran yang dicatat LRUMemo untuk frame: isi kolom ditambah indeks
+    return int(frame_kb(kb).memory_usage(deep=True).sum())
+
+
+def test_lru_memo_evicts_least_recently_used_within_byte_budget():
+    cache = LRUMemo(max_bytes=3 * size_of(1))
+    for key in 'abc':
+        cache.put(key, frame_kb(1))
+    # 'a' dipakai lagi sehingga 'b' yang paling lama tidak dipakai
+    assert cache.get_or_compute('a', lambda: None) is not None
+    cache.put('d', frame_kb(1))
+
+    computed = []
+    cache.get_or_compute('b', lambda: computed.append('b') or frame_kb(1))
+    assert computed == ['b']
+    stats = cache.stats()
+    assert stats['entries'] == 3 and stats['size_bytes'] == 3 * size_of(1)
+    assert (stats['hits'], stats['misses'], stats['evictions']) == (1, 1, 2)
+
+
+def test_lru_memo_keeps_total_under_budget_and_skips_oversized_values():
+    cache = LRUMemo(max_bytes=size_of(1) + size_of(3))
+    cache.put('kecil', frame_kb(1))
+    cache.put('besar', frame_kb(3))
+    cache.put('lebih', frame_kb(2))
+    assert cache.stats()['size_bytes'] <= size_of(1) + size_of(3)
+    assert cache.get_or_compute('kecil', lambda: 'dihitung ulang') == 'dihitung ulang'
+
+    too_big = frame_kb(5)
+    assert cache.get_or_compute('raksasa', lambda: too_big) is too_big
+    assert cache.get_or_compute('raksasa', lambda: 'lagi') == 'lagi'
+
+    # Menyimpan ulang kunci yang sama mengganti ukurannya, bukan menambah
+    cache.clear()
+    cache.put('x', frame_kb(1))
+    cache.put('x', frame_kb(2))
+    assert cache.stats()['size_bytes'] == size_of(2)
+
+
+def sample_frame(qty=3):
+    return pd.DataFrame({'No. Barang': ['007', 'BRG-1'], 'Kuantitas': [qty, 5]})
+
+
+def test_frame_fingerprint_follows_content():
+    df = sample_frame()
+    assert frame_fingerprint(df) == frame_fingerprint(df) == frame_fingerprint(sample_frame())
+    changed = df.copy()
+    changed.loc[0, 'Kuantitas'] = 4
+    assert frame_fingerprint(changed) != frame_fingerprint(df)
+    assert frame_fingerprint(df.astype({'Kuantitas': float})) != frame_fingerprint(df)
+    assert frame_fingerprint(df.rename(columns={'Kuantitas': 'Qty'})) != frame_fingerprint(df)
+    assert frame_fingerprint(df.iloc[:0]) != frame_fingerprint(sample_frame().iloc[:0].astype(str))
+
+
+def test_frame_fingerprint_not_reused_after_frame_is_freed():
+    df = sample_frame(qty=1)
+    key = id(df)
+    old = frame_fingerprint(df)
+    assert key in memo._fingerprints
+    del df
+    gc.collect()
+    assert key not in memo._fingerprints
+
+    # Alamat objek bisa dipakai ulang oleh frame lain; entri yang tertinggal untuk
+    # alamat itu (weakref ke objek lain) tidak boleh dipakai
+    df = sample_frame(qty=2)
+    other = sample_frame(qty=1)
+    memo._fingerprints[id(df)] = (weakref.ref(other), old)
+    assert frame_fingerprint(df) != old
+    assert memo._fingerprints[id(df)][0]() is df
+
+    for qty in range(3, 100):
+        assert frame_fingerprint(sample_frame(qty=qty)) != old
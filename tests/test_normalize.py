@@ -0,0 +1,101 @@
+"""normalize_sales dan map_nama_dept_vectorized terhadap mapping per baris versi awal ROP.py."""
+import numpy as np
+import pandas as pd
+import pytest
+
+from rop_engine.normalize import map_nama_dept_vectorized, normalize_sales
+
+
+# --- map_nama_dept / map_city dan langkah normalisasi dari ROP.py versi awal ---
+def map_nama_dept(row):
+    dept = str(row.get('Dept.', '')).strip().upper()
+    pelanggan = str(row.get('Nama Pelanggan', '')).strip().upper()
+    if dept == 'A':
+        if pelanggan in ['A - CASH', 'AIRPAY INTERNATIONAL INDONESIA', 'TOKOPEDIA']: return 'A - ITC'
+        else: return 'A - RETAIL'
+    mapping = {'B': 'B - JKT', 'C': 'C - PUSAT', 'D': 'D - SMG','E': 'E - JOG', 'F': 'F - MLG', 'G': 'G - PROJECT','H': 'H - BALI', 'X': 'X'}
+    return mapping.get(dept, 'X')
+
+
+def map_city(nama_dept):
+    if nama_dept in ['A - ITC', 'A - RETAIL', 'C - PUSAT', 'G - PROJECT']:
+        return 'Surabaya'
+    elif nama_dept == 'B - JKT': return 'Jakarta'
+    elif nama_dept == 'D - SMG': return 'Semarang'
+    elif nama_dept == 'E - JOG': return 'Jogja'
+    elif nama_dept == 'F - MLG': return 'Malang'
+    elif nama_dept == 'H - BALI': return 'Bali'
+    else: return 'Others'
+
+
+def legacy_normalize(penjualan):
+    penjualan = penjualan.copy()
+    penjualan['No. Barang'] = penjualan['No. Barang'].astype(str).str.strip()
+    if 'Qty' in penjualan.columns and 'Kuantitas' not in penjualan.columns:
+        penjualan.rename(columns={'Qty': 'Kuantitas'}, inplace=True)
+    penjualan['Nama Dept'] = penjualan.apply(map_nama_dept, axis=1)
+    penjualan['City'] = penjualan['Nama Dept'].apply(map_city)
+    penjualan = penjualan[penjualan['City'] != 'Others']
+    penjualan['Tgl Faktur'] = pd.to_datetime(penjualan['Tgl Faktur'], errors='coerce')
+    penjualan.dropna(subset=['Tgl Faktur', 'City'], inplace=True)
+    return penjualan
+
+
+def raw_sales():
+    rows = [
+        # Dept., Nama Pelanggan, Tgl Faktur
+        ('A', 'TOKOPEDIA', '2024-01-02'),
+        (' a ', ' tokopedia ', '2024-01-03'),
+        ('A', 'A - Cash', '2024-01-04'),
+        ('A', 'Airpay International Indonesia', '2024-01-05'),
+        ('A', 'Toko Maju', '2024-01-06'),
+        ('A', None, '2024-01-07'),
+        ('b', 'TOKOPEDIA', '2024-01-08'),
+        ('C', 'Toko Maju', '2024-01-09'),
+        ('D', 'Toko Maju', '2024-01-10'),
+        ('E', 'Toko Maju', '2024-01-11'),
+        ('F', 'Toko Maju', '2024-01-12'),
+        ('G', 'Toko Maju', '2024-01-13'),
+        ('H ', 'Toko Maju', '2024-01-14'),
+        ('X', 'Toko Maju', '2024-01-15'),
+        ('Z', 'TOKOPEDIA', '2024-01-16'),
+        (None, 'TOKOPEDIA', '2024-01-17'),
+        ('B', 'Toko Maju', 'bukan tanggal'),
+        ('B', 'Toko Maju', None),
+        ('C', 'Toko Maju', '31/02/2024'),
+        ('D', 'Toko Maju', '2024-02-29'),
+    ]
+    return pd.DataFrame({
+        'Tgl Faktur': [r[2] for r in rows],
+        'Dept.': [r[0] for r in rows],
+        'Nama Pelanggan': [r[1] for r in rows],
+        'No. Barang': [' 007', '007 ', 'BRG-1', 12, '12', 'BRG-1'] * 3 + ['BRG-2', 'BRG-3'],
+        'Qty': np.arange(1, len(rows) + 1),
+    })
+
+
+def test_map_nama_dept_vectorized_matches_legacy_rows():
+    df = raw_sales()
+    expected = df.apply(map_nama_dept, axis=1)
+    assert map_nama_dept_vectorized(df).tolist() == expected.tolist()
+    # Kolom yang tidak ada dibaca sebagai teks kosong, seperti row.get(..., '')
+    no_pelanggan = df.drop(columns=['Nama Pelanggan'])
+    assert map_nama_dept_vectorized(no_pelanggan).tolist() == no_pelanggan.apply(map_nama_dept, axis=1).tolist()
+
+
+@pytest.mark.parametrize('categorical', [False, True])
+def test_normalize_sales_matches_legacy(categorical):
+    raw = raw_sales()
+    if categorical:
+        # Bentuk keluaran read_sales_bytes: kolom teks sebagai kategori
+        raw = raw.astype({col: 'category' for col in ['Tgl Faktur', 'Dept.', 'Nama Pelanggan']})
+    new = normalize_sales(raw)
+    old = legacy_normalize(raw_sales()).reset_index(drop=True)
+
+    assert len(new) == len(old) == 14
+    assert new['Tgl Faktur'].tolist() == old['Tgl Faktur'].tolist()
+    for col in ['City', 'Nama Dept', 'No. Barang']:
+        assert new[col].astype(str).tolist() == old[col].tolist(), col
+    assert new['Kuantitas'].tolist() == old['Kuantitas'].tolist()
+    assert 'Others' not in set(new['City'].astype(str))
+    assert set(new.loc[new['Nama Dept'] == 'A - ITC', 'Kuantitas']) == {1, 2, 3, 4}
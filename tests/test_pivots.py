@@ -0,0 +1,76 @@
+"""Pewarnaan pivot (setara Styler.background_gradient) dan paginasi pivot_page_rows."""
+import numpy as np
+import pandas as pd
+import pytest
+from matplotlib import colormaps
+
+from rop_engine.pivots import TEXT_COLOR_THRESHOLD, _gradient_css, pivot_page_rows
+
+
+def styler_css(df, cmap_name):
+    """CSS per sel dari Styler.background_gradient (skala per kolom, seperti tampilan lama)."""
+    ctx = df.style.background_gradient(cmap=cmap_name)._compute().ctx
+    css = np.empty(df.shape, dtype=object)
+    for (i, j), props in ctx.items():
+        css[i, j] = ''.join(f"{prop}: {value};" for prop, value in props)
+    return css
+
+
+@pytest.mark.parametrize('cmap_name', ['Greens', 'Blues'])
+def test_gradient_css_matches_styler(cmap_name):
+    rng = np.random.default_rng(5)
+    df = pd.DataFrame({
+        'rentang_lebar': np.linspace(0, 1000, 41).round(),
+        'acak': rng.integers(0, 60, size=41),
+        'konstan': np.full(41, 7),
+        'negatif': rng.integers(-30, 30, size=41),
+    })
+    values = df.to_numpy()
+    css = _gradient_css(values, values.min(axis=0), values.max(axis=0), cmap_name)
+    assert (css == styler_css(df, cmap_name)).all()
+    # Kolom lebar melewati ambang luminans, jadi kedua warna teks muncul
+    assert any('#f1f1f1' in c for c in css[:, 0]) and any('#000000' in c for c in css[:, 0])
+
+
+def test_text_color_flips_at_luminance_threshold():
+    norm = np.linspace(0, 1, 2001)
+    rgb = colormaps['Greens'](norm)[:, :3]
+    linear = np.where(rgb <= 0.04045, rgb / 12.92, ((rgb + 0.055) / 1.055) ** 2.4)
+    luminance = linear @ np.array([0.2126, 0.7152, 0.0722])
+    values = norm[:, None] * 1000
+    css = _gradient_css(values, np.array([0.0]), np.array([1000.0]), 'Greens')[:, 0]
+    dark = np.array(['#f1f1f1' in c for c in css])
+    assert (dark == (luminance < TEXT_COLOR_THRESHOLD)).all()
+    assert 0 < dark.sum() < len(dark)
+
+
+def make_view(total_rop, total_so):
+    return {'pivot': pd.DataFrame(index=range(len(total_rop))), 'total_rop': np.array(total_rop),
+            'total_so': np.array(total_so)}
+
+
+def test_pivot_page_rows_sorting_and_paging():
+    view = make_view(total_rop=[5, 40, 10, 40, 0, 25, 7], total_so=[9, 1, 8, 2, 7, 3, 6])
+
+    rows, n_rows, n_pages = pivot_page_rows(view, sort_by='rop', page_size=3)
+    assert rows.tolist() == [1, 3, 5] and (n_rows, n_pages) == (7, 3)
+    assert pivot_page_rows(view, sort_by='rop', page=3, page_size=3)[0].tolist() == [4]
+    # Halaman di luar jangkauan dijepit ke halaman pertama/terakhir
+    assert pivot_page_rows(view, sort_by='rop', page=9, page_size=3)[0].tolist() == [4]
+    assert pivot_page_rows(view, sort_by='rop', page=0, page_size=3)[0].tolist() == [1, 3, 5]
+
+    assert pivot_page_rows(view, sort_by='so', page_size=10)[0].tolist() == [0, 2, 4, 6, 5, 3, 1]
+    assert pivot_page_rows(view, sort_by='barang', page_size=10)[0].tolist() == list(range(7))
+
+
+def test_pivot_page_rows_top_n_by_rop():
+    view = make_view(total_rop=[5, 40, 10, 40, 0, 25, 7], total_so=[9, 1, 8, 2, 7, 3, 6])
+    rows, n_rows, n_pages = pivot_page_rows(view, sort_by='so', top_n=3, page_size=2)
+    # Top-3 menurut ROP (1, 3, 5), lalu diurutkan menurut SO
+    assert rows.tolist() == [5, 3] and (n_rows, n_pages) == (3, 2)
+    assert pivot_page_rows(view, sort_by='barang', top_n=3, page=2, page_size=2)[0].tolist() == [5]
+    assert pivot_page_rows(view, top_n=50, page_size=50)[1] == 7
+
+    empty = make_view(total_rop=[], total_so=[])
+    rows, n_rows, n_pages = pivot_page_rows(empty)
+    assert rows.tolist() == [] and (n_rows, n_pages) == (0, 1)
@@ -0,0 +1,93 @@
+"""Pembacaan ekspor penjualan per potongan (read_sales_bytes) dan penggabungan antar file."""
+import io
+
+import pandas as pd
+import pytest
+
+from rop_engine.normalize import SalesSchemaError, normalize_sales
+from rop_engine.readers import SALES_TEXT_COLUMNS, concat_sales_frames, read_sales_bytes
+
+CSV_WITH_FOOTER = (
+    "Tgl Faktur,Dept.,Nama Pelanggan,No. Barang,Kuantitas,Keterangan\n"
+    "2024-01-01,C,Budi,007,1,x\n"
+    "2024-01-02,B,Budi,008,2,y\n"
+    "2024-01-03,C,TOKOPEDIA,007,3,z\n"
+    ",,,,,\n"
+    ",,,,,\n"
+)
+
+
+@pytest.mark.parametrize('chunk_rows', [2, 3, 100])
+def test_blank_footer_rows_in_own_chunk(chunk_rows):
+    # chunk_rows=3: potongan kedua hanya berisi baris penutup yang kosong semua
+    df = read_sales_bytes(io.BytesIO(CSV_WITH_FOOTER.encode()), 'a.csv', chunk_rows=chunk_rows)
+    assert len(df) == 5
+    assert 'Keterangan' not in df.columns
+    assert list(df['No. Barang'].dropna()) == ['007', '008', '007']
+
+    baseline = normalize_sales(pd.read_csv(io.BytesIO(CSV_WITH_FOOTER.encode()), dtype={'No. Barang': str}))
+    normalized = normalize_sales(df)
+    assert len(normalized) == len(baseline) == 3
+    assert list(normalized['Tgl Faktur']) == list(baseline['Tgl Faktur'])
+
+
+def test_missing_required_column_is_rejected():
+    csv = "Tgl Faktur,Dept.,Kuantitas\n2024-01-01,C,1\n"
+    with pytest.raises(SalesSchemaError, match="No. Barang"):
+        read_sales_bytes(io.BytesIO(csv.encode()), 'a.csv')
+
+
+def legacy_concat(dfs):
+    df = pd.concat(dfs, ignore_index=True)
+    df['No. Barang'] = df['No. Barang'].astype(str)
+    return df
+
+
+def sales_files():
+    first = read_sales_bytes(io.BytesIO(CSV_WITH_FOOTER.encode()), 'a.csv', chunk_rows=2)
+    second = read_sales_bytes(io.BytesIO((
+        "Tgl Faktur,Dept.,Nama Pelanggan,No. Barang,Kuantitas\n"
+        "2024-01-02,A,ITC,009,4\n"
+        "2024-01-04,C,Budi,007,5\n"
+        "2024-01-04,D,Sari,,6\n"
+    ).encode()), 'b.csv')
+    # Dept. kosong semua: kategori tanpa label, tipe labelnya float
+    third = read_sales_bytes(io.BytesIO(b"Tgl Faktur,Dept.,No. Barang,Qty\n2024-01-05,,010,7\n"), 'c.csv')
+    third['Dept.'] = third['Dept.'].astype(float).astype('category')
+    # Seperti frame dari cache lama: label kategori bertipe object, kode barang berupa angka
+    fourth = pd.DataFrame({
+        'Tgl Faktur': pd.Categorical(['2024-01-06', '2024-01-06'], categories=pd.Index(['2024-01-06'], dtype=object)),
+        'Dept.': pd.Categorical(['C', 'B'], categories=pd.Index(['B', 'C'], dtype=object)),
+        'Nama Pelanggan': pd.Categorical(['Budi', 'Sari'], categories=pd.Index(['Budi', 'Sari'], dtype=object)),
+        'No. Barang': pd.Categorical([11, 7]),
+        'Kuantitas': [8, 9],
+    })
+    return [first, second, third, fourth]
+
+
+def test_concat_keeps_code_columns_categorical():
+    dfs = sales_files()
+    combined = concat_sales_frames(dfs)
+    legacy = legacy_concat(dfs)
+    assert list(combined.columns) == list(legacy.columns)
+    for col in SALES_TEXT_COLUMNS + ['Tgl Faktur']:
+        assert isinstance(combined[col].dtype, pd.CategoricalDtype), col
+    # Kode barang sebagai teks (angka 7 menjadi '7'); sel kosong tetap kosong (versi lama: NaN atau 'nan')
+    missing = legacy['No. Barang'].isna() | legacy['No. Barang'].eq('nan')
+    assert (combined['No. Barang'].isna() == missing).all() and missing.any()
+    assert (combined['No. Barang'][~missing].astype(str) == legacy['No. Barang'][~missing]).all()
+    assert '7' in combined['No. Barang'].cat.categories
+    for col in ['Tgl Faktur', 'Dept.', 'Nama Pelanggan']:
+        assert (combined[col].astype(object).fillna('-') == legacy[col].astype(object).fillna('-')).all(), col
+    assert combined['Kuantitas'].equals(legacy['Kuantitas']) and combined['Qty'].equals(legacy['Qty'])
+
+
+def test_concat_normalizes_like_legacy():
+    dfs = sales_files()
+    for df in dfs[2:]:
+        df.rename(columns={'Qty': 'Kuantitas'}, inplace=True)
+    expected = normalize_sales(legacy_concat(dfs))
+    normalized = normalize_sales(concat_sales_frames(dfs))
+    assert len(normalized) == len(expected) > 0
+    for col in expected.columns:
+        assert (normalized[col].astype(object) == expected[col].astype(object)).all(), col
@@ -0,0 +1,90 @@
+"""Paritas compute_rolling_frame dengan implementasi lama (cross join + groupby().apply())."""
+import numpy as np
+import pandas as pd
+import pytest
+
+from rop_engine import compute_rolling_frame
+
+KEYS = ['City', 'No. Barang', 'Date']
+STAT_COLUMNS = ['SO', 'sales_90d', 'std_dev_90d', 'ADS', 'Penjualan_Aktual_21_Hari']
+
+
+def legacy_preprocess(penjualan_df, start_date, end_date):
+    """preprocess_sales_data versi awal ROP.py (tanpa merge produk), sebagai acuan."""
+    analysis_start_date = pd.to_datetime(start_date) - pd.DateOffset(days=90)
+    extended_end_date = pd.to_datetime(end_date) + pd.DateOffset(days=21)
+    date_range_full = pd.date_range(start=analysis_start_date, end=extended_end_date, freq='D')
+
+    daily_sales = penjualan_df.groupby(['Tgl Faktur', 'City', 'No. Barang'])['Kuantitas'].sum().reset_index()
+    daily_sales = daily_sales.rename(columns={'Tgl Faktur': 'Date', 'Kuantitas': 'SO'})
+    daily_sales['Date'] = pd.to_datetime(daily_sales['Date'])
+    unique_items = daily_sales[['City', 'No. Barang']].drop_duplicates()
+
+    df_full = unique_items.merge(pd.DataFrame({'Date': date_range_full}), how='cross')
+    df_full = df_full.merge(daily_sales, on=KEYS, how='left').fillna(0)
+    df_full = df_full.groupby(KEYS).sum().reset_index()
+
+    # Rolling per (City, No. Barang) seperti calculate_metrics_for_group lama; transform dipakai karena
+    # groupby().apply() pandas 3 tidak lagi menyertakan kolom kunci grup
+    df_full = df_full.sort_values(KEYS).reset_index(drop=True)
+    so = df_full.groupby(['City', 'No. Barang'])['SO']
+    df_full['sales_90d'] = so.transform(lambda s: s.rolling(window=90, min_periods=1).sum())
+    df_full['std_dev_90d'] = so.transform(lambda s: s.rolling(window=90, min_periods=1).std()).fillna(0)
+    df_full['ADS'] = df_full['sales_90d'] / 90
+    df_full['Penjualan_Aktual_21_Hari'] = so.transform(
+        lambda s: s.iloc[::-1].rolling(window=21, min_periods=0).sum().iloc[::-1])
+
+    avg_ads = df_full.groupby(['City', 'No. Barang'])['ADS'].mean().reset_index()
+    sorted_ads = avg_ads.sort_values(by=['City', 'ADS'], ascending=[True, False])
+    city_totals = sorted_ads.groupby('City')['ADS'].transform('sum')
+    sorted_ads['CUM_ADS'] = sorted_ads.groupby('City')['ADS'].cumsum()
+    sorted_ads['Cumulative_Perc'] = 100 * sorted_ads['CUM_ADS'] / city_totals.where(city_totals != 0, 1)
+    sorted_ads['Kategori ABC'] = pd.cut(sorted_ads['Cumulative_Perc'], bins=[-1, 70, 90, 101], labels=['A', 'B', 'C'], right=True)
+    sorted_ads['Kategori ABC'] = sorted_ads['Kategori ABC'].cat.add_categories('D')
+    sorted_ads.loc[city_totals == 0, 'Kategori ABC'] = 'D'
+
+    final_df = df_full.merge(sorted_ads[['City', 'No. Barang', 'Kategori ABC']], on=['City', 'No. Barang'], how='left')
+    dates = final_df['Date'].dt.date
+    return final_df[(dates >= pd.to_datetime(start_date).date()) & (dates <= pd.to_datetime(end_date).date())]
+
+
+@pytest.fixture(scope='module')
+def sales_data():
+    """Penjualan jarang untuk 40 SKU di 3 kota selama 240 hari, termasuk baris duplikat per hari."""
+    rng = np.random.default_rng(7)
+    dates = pd.date_range('2024-01-01', periods=240, freq='D')
+    rows = []
+    for city in ['Jakarta', 'Surabaya', 'Medan']:
+        for sku in range(40):
+            sold = rng.random(len(dates)) > 0.85
+            qty = rng.poisson(rng.uniform(1, 20), size=sold.sum()) + 1
+            rows.append(pd.DataFrame({'Tgl Faktur': dates[sold], 'City': city, 'No. Barang': f'SKU{sku:04d}',
+                                      'Kuantitas': qty.astype(float)}))
+    penjualan = pd.concat(rows, ignore_index=True)
+    penjualan = pd.concat([penjualan, penjualan.sample(frac=0.1, random_state=7)], ignore_index=True)
+    produk = pd.DataFrame({'No. Barang': [f'SKU{sku:04d}' for sku in range(40)],
+                           'Nama Barang': [f'Barang {sku}' for sku in range(40)]})
+    return penjualan, produk
+
+
+@pytest.mark.parametrize('start_date, end_date', [
+    ('2024-05-01', '2024-05-01'),
+    ('2024-04-10', '2024-04-16'),
+    ('2024-01-15', '2024-03-10'),
+    ('2024-06-01', '2024-08-27'),
+])
+def test_compute_rolling_frame_matches_legacy(sales_data, start_date, end_date):
+    penjualan, produk = sales_data
+    new = compute_rolling_frame(penjualan, produk, start_date, end_date)
+    old = legacy_preprocess(penjualan, start_date, end_date)
+
+    new = new.sort_values(KEYS).reset_index(drop=True)
+    old = old.sort_values(KEYS).reset_index(drop=True)
+    assert len(new) == len(old) > 0
+    for col in ['City', 'No. Barang']:
+        assert (new[col].astype(str) == old[col].astype(str)).all()
+    assert (new['Date'].to_numpy() == old['Date'].to_numpy()).all()
+    for col in STAT_COLUMNS:
+        np.testing.assert_allclose(new[col].to_numpy(dtype=float), old[col].to_numpy(dtype=float), rtol=1e-9, atol=1e-9,
+                                   err_msg=col)
+    assert (new['Kategori ABC'].astype(str) == old['Kategori ABC'].astype(str)).all()
@@ -0,0 +1,75 @@
+"""evaluate_z_grid dan search_z_table terhadap perhitungan langsung semua kombinasi z A/B/C/D."""
+import itertools
+
+import numpy as np
+import pytest
+
+from rop_engine.rop import ABC_CLASSES, compute_rop, evaluate_z_grid, score_z_tables, search_z_table
+
+Z_GRID = np.array([0.0, 0.5, 1.0, 1.65, 2.5])
+
+
+@pytest.fixture(scope='module')
+def rows():
+    rng = np.random.default_rng(11)
+    n = 400
+    ads = rng.gamma(1.5, 2.0, size=n)
+    std = rng.gamma(2.0, 1.5, size=n)
+    actual = np.round(ads * 21 + rng.normal(0, 1, size=n) * std * 2)
+    actual[::37] = np.nan
+    codes = rng.integers(0, len(ABC_CLASSES), size=n).astype(np.int8)
+    return ads, std, actual, codes
+
+
+def brute_force(ads, std, actual, codes):
+    """MAE dan jumlah stockout setiap tabel z, dari ROP per baris."""
+    valid = ~np.isnan(actual)
+    tables = np.array(list(itertools.product(Z_GRID, repeat=len(ABC_CLASSES))))
+    mae, stockouts = [], []
+    for table in tables:
+        err = compute_rop(ads, std, codes, dict(zip(ABC_CLASSES, table)))[valid] - actual[valid]
+        mae.append(np.abs(err).mean())
+        stockouts.append(int((err < 0).sum()))
+    return tables, np.array(mae), np.array(stockouts), int(valid.sum())
+
+
+def test_score_z_tables_matches_direct_rop(rows):
+    ads, std, actual, codes = rows
+    tables, mae, stockouts, total = brute_force(*rows)
+    scores = score_z_tables(evaluate_z_grid(ads, std, actual, codes, Z_GRID), tables)
+    np.testing.assert_allclose(scores['MAE'].to_numpy(), mae, rtol=1e-12)
+    assert (scores['Jumlah Hari Stockout'].to_numpy() == stockouts).all()
+    np.testing.assert_allclose(scores['Tingkat Stockout (%)'].to_numpy(), 100 * stockouts / total)
+
+
+def test_chunked_grid_matches_single_pass(rows):
+    ads, std, actual, codes = rows
+    whole = evaluate_z_grid(ads, std, actual, codes, Z_GRID)
+    chunked = evaluate_z_grid(ads, std, actual, codes, Z_GRID, chunk_rows=7)
+    assert (whole['count'] == chunked['count']).all()
+    assert (whole['stockouts'] == chunked['stockouts']).all()
+    np.testing.assert_allclose(whole['sum_err'], chunked['sum_err'], rtol=1e-12)
+    np.testing.assert_allclose(whole['sum_abs_err'], chunked['sum_abs_err'], rtol=1e-12)
+
+
+@pytest.mark.parametrize('chunk_rows', [250_000, 13])
+@pytest.mark.parametrize('target', [0.0, 5.0, 12.5, 25.0, 40.0, 100.0])
+def test_search_z_table_matches_brute_force(rows, target, chunk_rows):
+    ads, std, actual, codes = rows
+    tables, mae, stockouts, total = brute_force(*rows)
+    result = search_z_table(evaluate_z_grid(ads, std, actual, codes, Z_GRID, chunk_rows=chunk_rows), target)
+
+    feasible = stockouts <= np.floor(target / 100 * total + 1e-9)
+    if feasible.any():
+        best = np.flatnonzero(feasible & np.isclose(mae, mae[feasible].min(), rtol=1e-12, atol=0))
+        assert result['target_tercapai']
+    else:
+        # Target tidak tercapai: tabel dengan stockout paling sedikit
+        best = np.flatnonzero(stockouts == stockouts.min())
+        assert not result['target_tercapai']
+    chosen = [result['z_scores'][c] for c in ABC_CLASSES]
+    i = int(np.flatnonzero(np.isclose(tables, chosen).all(axis=1))[0])
+    assert i in best
+    assert result['Jumlah Hari Stockout'] == stockouts[i]
+    np.testing.assert_allclose(result['Tingkat Stockout (%)'], 100 * stockouts[i] / total)
+    np.testing.assert_allclose(result['MAE'], mae[i], rtol=1e-12)
@@ -0,0 +1,102 @@
+"""SharedSalesData dengan service Drive palsu: versi per isi folder, profil pemuatan, dan kegagalan."""
+import json
+import threading
+from datetime import timedelta
+
+import pytest
+
+from rop_engine.shared_data import SharedSalesData, folder_version
+from test_gdrive import FakeDrive, sales_csv
+
+LOAD_STAGES = {'muat_semua_file', 'drive_download', 'parse_file', 'gabung_file', 'normalisasi'}
+
+
+@pytest.fixture
+def drive(monkeypatch, tmp_path):
+    # Log profil ditulis relatif ke direktori kerja
+    monkeypatch.chdir(tmp_path)
+    return FakeDrive(
+        listing=[{'id': 'f1', 'name': 'a.csv', 'md5Checksum': 'v1'}, {'id': 'f2', 'name': 'b.csv', 'md5Checksum': 'v1'}],
+        contents={'f1': sales_csv(1), 'f2': sales_csv(2), 'f3': b"Tgl Faktur,Kuantitas\n2024-01-01,1\n"},
+    )
+
+
+def shared_for(drive):
+    return SharedSalesData(lambda: list(drive.listing), lambda: drive)
+
+
+def read_profile_log():
+    with open('logs/rop_profile.jsonl') as f:
+        return [json.loads(line) for line in f]
+
+
+def test_folder_version_ignores_listing_order(drive):
+    assert folder_version(drive.listing) == folder_version(drive.listing[::-1])
+    assert folder_version(drive.listing) != folder_version(drive.listing[:1])
+
+
+def test_load_once_per_folder_version_and_profile(drive):
+    shared = shared_for(drive)
+    first = shared.refresh()
+    assert first.number == 1 and len(first.penjualan) == 2
+    assert shared.refresh() is first
+
+    records = read_profile_log()
+    assert [r['run'] for r in records] == ['shared_sales_load']
+    assert LOAD_STAGES <= set(records[0]['stages'])
+    assert records[0]['stages']['parse_file']['calls'] == 2
+    assert shared.stats()['last_profile']['version'] == first.version
+
+    drive.listing[1] = {**drive.listing[1], 'md5Checksum': 'v2'}
+    second = shared.refresh()
+    assert second.number == 2 and second is shared.current
+    assert shared.stats()['retired_versions'] == 1
+    assert len(read_profile_log()) == 2
+
+
+def test_failed_load_keeps_current_version(drive):
+    shared = shared_for(drive)
+    first = shared.refresh()
+    drive.listing.append({'id': 'f3', 'name': 'c.csv', 'md5Checksum': 'v1'})
+    assert shared.refresh() is first
+    assert "c.csv" in shared.last_error
+    # Kolom salah tidak dicoba ulang selama isi folder sama
+    records = len(read_profile_log())
+    shared.refresh()
+    assert len(read_profile_log()) == records == 2
+
+
+def test_maybe_refresh_respects_interval(drive):
+    calls = []
+    shared = SharedSalesData(lambda: calls.append(1) or list(drive.listing), lambda: drive, refresh_seconds=60)
+    shared.maybe_refresh().result(timeout=10)
+    assert len(calls) == 1 and shared.current.number == 1
+    # Pemeriksaan terakhir belum 60 detik lalu: tidak dijadwalkan
+    assert shared.maybe_refresh() is None
+    shared.checked_at -= timedelta(seconds=59)
+    assert shared.maybe_refresh() is None
+    shared.checked_at -= timedelta(seconds=2)
+    assert shared.maybe_refresh().result(timeout=10) is shared.current
+    assert len(calls) == 2
+
+
+@pytest.mark.parametrize('refresh_seconds', [0, 60])
+def test_maybe_refresh_does_not_reschedule_while_running(drive, refresh_seconds):
+    started, release = threading.Event(), threading.Event()
+    calls = []
+
+    def slow_listing():
+        calls.append(1)
+        started.set()
+        assert release.wait(timeout=10)
+        return list(drive.listing)
+
+    shared = SharedSalesData(slow_listing, lambda: drive, refresh_seconds=refresh_seconds)
+    future = shared.maybe_refresh()
+    assert started.wait(timeout=10) and shared.refreshing
+    for _ in range(3):
+        # Interval habis: pemeriksaan yang sedang berjalan dikembalikan; belum habis: tidak ada yang dijadwalkan
+        assert shared.maybe_refresh() is (future if refresh_seconds == 0 else None)
+    release.set()
+    assert future.result(timeout=10).number == 1
+    assert len(calls) == 1 and not shared.refreshing
@@ -0,0 +1,110 @@
+"""simulate_inventory terhadap simulasi acuan per item dengan loop biasa."""
+import math
+
+import numpy as np
+import pytest
+
+from rop_engine.rop import ABC_CLASSES, ROP_METHODS
+from rop_engine.simulation import simulate_inventory
+
+METHODS = list(ROP_METHODS)
+
+
+def reference_simulation(demand, ads, std, codes, z_scores, order_days, lead_time, period=90):
+    """Satu metode, satu item demi satu item, dengan daftar pesanan dalam perjalanan."""
+    n_items, n_days = demand.shape
+    out = {name: np.zeros(n_items) for name in ['Permintaan', 'Terpenuhi', 'Hari Stockout', 'Total Stok', 'Jumlah Pesanan']}
+    for i in range(n_items):
+        lt = int(lead_time[i]) if np.ndim(lead_time) else lead_time
+
+        def rop(day):
+            code = codes[i, day] if codes.ndim == 2 else codes[i]
+            z = z_scores[ABC_CLASSES[code]]
+            return round(ads[i, day] * lt + z * std[i, day] * math.sqrt(lt / period))
+
+        on_hand = max(rop(0), 0)
+        pending = []  # (hari tiba, jumlah)
+        for day in range(n_days):
+            on_hand += sum(q for arrive, q in pending if arrive == day)
+            pending = [(arrive, q) for arrive, q in pending if arrive != day]
+            sold = min(on_hand, demand[i, day])
+            on_hand -= sold
+            out['Permintaan'][i] += demand[i, day]
+            out['Terpenuhi'][i] += sold
+            out['Hari Stockout'][i] += sold < demand[i, day]
+            out['Total Stok'][i] += on_hand
+            position = on_hand + sum(q for _, q in pending)
+            if position <= rop(day):
+                quantity = max(math.ceil(rop(day) + ads[i, day] * order_days - position), 0)
+                if lt > 0:
+                    pending.append((day + lt, quantity))
+                else:
+                    on_hand += quantity
+                out['Jumlah Pesanan'][i] += quantity > 0
+    return out
+
+
+def assert_matches_reference(demand, ads, std, codes, order_days, lead_time):
+    sim = simulate_inventory(demand, ads, std, codes, ROP_METHODS, order_days, lead_time)
+    assert sim['n_days'] == demand.shape[1]
+    for m, method in enumerate(METHODS):
+        expected = reference_simulation(demand, ads, std, codes, ROP_METHODS[method], order_days, lead_time)
+        for name, values in expected.items():
+            np.testing.assert_allclose(sim[name][m], values, err_msg=f"{method}: {name}")
+
+
+@pytest.mark.parametrize('lead_time', [2, np.array([2])])
+def test_hand_worked_single_item(lead_time):
+    # ADS 1, std 0 -> ROP 2 setiap hari; pesanan = ROP + 3 hari ADS - posisi, tiba 2 hari kemudian
+    demand = np.array([[3, 0, 1, 3, 5, 0, 0]], dtype=float)
+    ads = np.ones_like(demand)
+    std = np.zeros_like(demand)
+    codes = np.array([0])
+    sim = simulate_inventory(demand, ads, std, codes, {'X': ROP_METHODS['Uniform']}, order_days=3, lead_time=lead_time)
+    # Hari 0: stok awal 2, permintaan 3 -> 1 hilang; pesan 5 (tiba hari 2, langsung terjual 1).
+    # Hari 3: stok 1 <= ROP 2 -> pesan 4 (tiba hari 5). Hari 4: 1 terjual, 4 hilang;
+    # posisi 0 + 4 dalam perjalanan > ROP, jadi tidak memesan lagi.
+    assert sim['Permintaan'][0, 0] == 12
+    assert sim['Terpenuhi'][0, 0] == 7
+    assert sim['Hari Stockout'][0, 0] == 2
+    assert sim['Jumlah Pesanan'][0, 0] == 2
+    assert sim['Total Stok'][0, 0] == 0 + 0 + 4 + 1 + 0 + 4 + 4
+
+
+def test_reorder_when_position_equals_rop():
+    # Stok awal 2 = ROP; tanpa permintaan posisi tetap sama dengan ROP, jadi hari 0 langsung memesan
+    demand = np.zeros((1, 4))
+    sim = simulate_inventory(demand, np.ones((1, 4)), np.zeros((1, 4)), np.array([0]),
+                             {'X': ROP_METHODS['Uniform']}, order_days=3, lead_time=2)
+    assert sim['Jumlah Pesanan'][0, 0] == 1
+    assert sim['Total Stok'][0, 0] == 2 + 2 + 5 + 5
+
+
+@pytest.fixture(scope='module')
+def random_case():
+    rng = np.random.default_rng(17)
+    n_items, n_days = 12, 60
+    demand = rng.poisson(rng.uniform(0.2, 6, size=(n_items, 1)), size=(n_items, n_days)).astype(float)
+    demand[:, 20:25] *= 4  # lonjakan agar ada penjualan hilang
+    ads = np.maximum(demand.mean(axis=1, keepdims=True) + rng.normal(0, 0.3, size=(n_items, n_days)), 0)
+    std = rng.gamma(2.0, 1.0, size=(n_items, n_days))
+    codes = rng.integers(0, len(ABC_CLASSES), size=(n_items, n_days)).astype(np.int8)
+    return demand, ads, std, codes
+
+
+@pytest.mark.parametrize('order_days', [0, 7, 30])
+@pytest.mark.parametrize('lead_time', [0, 1, 21])
+def test_matches_reference_scalar_lead_time(random_case, order_days, lead_time):
+    demand, ads, std, codes = random_case
+    assert_matches_reference(demand, ads, std, codes, order_days, lead_time)
+    assert_matches_reference(demand, ads, std, codes[:, 0], order_days, lead_time)
+
+
+@pytest.mark.parametrize('order_days', [0, 7, 30])
+def test_matches_reference_per_item_lead_time(random_case, order_days):
+    demand, ads, std, codes = random_case
+    lead_time = np.array([1, 2, 3, 5, 7, 14, 21, 30, 1, 4, 9, 30])
+    assert_matches_reference(demand, ads, std, codes, order_days, lead_time)
+    sim = simulate_inventory(demand, ads, std, codes, ROP_METHODS, order_days, lead_time)
+    assert (sim['Hari Stockout'] > 0).any()
+    assert (sim['Terpenuhi'] < sim['Permintaan']).any()
@@ -0,0 +1,141 @@
+"""ResultStore: dedup save_run, latest_rop, item_history lintas run, dan retensi run."""
+import numpy as np
+import pandas as pd
+import pytest
+
+from rop_engine.store import ResultStore
+
+
+def make_result(start, n_days, rop_offset=0, cities=('Surabaya', 'Jakarta'), items=('BRG-001', 'BRG-002')):
+    dates = pd.date_range(start, periods=n_days)
+    index = pd.MultiIndex.from_product([cities, items, dates], names=['City', 'No. Barang', 'Date'])
+    df = index.to_frame(index=False)
+    n = len(df)
+    df['Kategori ABC'] = np.where(df['No. Barang'] == items[0], 'A', 'C')
+    df['SO'] = np.arange(n) % 5
+    df['ADS'] = np.linspace(0.5, 3.0, n)
+    df['std_dev_90d'] = np.linspace(1.0, 2.0, n)
+    df['Safety_Stock'] = df['std_dev_90d'] * 2
+    df['ROP'] = np.arange(n) + rop_offset
+    return df
+
+
+@pytest.fixture
+def store(tmp_path):
+    return ResultStore(str(tmp_path / 'hasil.sqlite'), keep_runs=0)
+
+
+def test_save_run_deduplicates_same_input(store):
+    df = make_result('2024-05-01', 5)
+    first = store.save_run(df, 'Uniform', '2024-05-01', '2024-05-05', 'abc', 'tes')
+    assert store.save_run(df, 'Uniform', '2024-05-01', '2024-05-05', 'abc', 'tes') == first
+    # Metode, rentang, atau sidik jari lain (atau tanpa sidik jari) selalu menjadi run baru
+    others = [
+        store.save_run(df, 'Dynamic', '2024-05-01', '2024-05-05', 'abc'),
+        store.save_run(df, 'Uniform', '2024-05-01', '2024-05-06', 'abc'),
+        store.save_run(df, 'Uniform', '2024-05-01', '2024-05-05', 'xyz'),
+        store.save_run(df, 'Uniform', '2024-05-01', '2024-05-05', ''),
+        store.save_run(df, 'Uniform', '2024-05-01', '2024-05-05', ''),
+    ]
+    assert len({first, *others}) == 6
+    runs = store.runs()
+    assert runs['run_id'].tolist() == sorted(runs['run_id'], reverse=True)
+    assert (runs['status'] == 'selesai').all() and (runs['rows'] == len(df)).all()
+    assert len(store.runs(method='Dynamic')) == 1
+
+
+def test_run_rows_round_trip(store):
+    df = make_result('2024-05-01', 4)
+    df.loc[3, 'std_dev_90d'] = np.nan
+    run_id = store.save_run(df, 'Uniform', '2024-05-01', '2024-05-04')
+    rows = store.run_rows(run_id)
+    expected = df.sort_values(['City', 'No. Barang', 'Date']).reset_index(drop=True)
+    pd.testing.assert_frame_equal(rows, expected, check_dtype=False)
+    subset = store.run_rows(run_id, city='Jakarta', start='2024-05-02', end='2024-05-03')
+    assert (subset['City'] == 'Jakarta').all() and len(subset) == 4
+    assert subset['Date'].min() == pd.Timestamp('2024-05-02') and subset['Date'].max() == pd.Timestamp('2024-05-03')
+
+
+def test_latest_rop_respects_as_of_and_method(store):
+    uniform = make_result('2024-05-01', 10)
+    store.save_run(uniform, 'Uniform', '2024-05-01', '2024-05-10', 'u')
+    dynamic = make_result('2024-05-01', 7, rop_offset=1000)
+    store.save_run(dynamic, 'Dynamic', '2024-05-01', '2024-05-07', 'd')
+
+    def expected(df, as_of):
+        rows = df[(df['City'] == 'Jakarta') & (df['No. Barang'] == 'BRG-002') & (df['Date'] <= as_of)]
+        return rows.iloc[-1]
+
+    latest = store.latest_rop('Jakarta', 'BRG-002')
+    assert latest['Date'] == pd.Timestamp('2024-05-10') and latest['method'] == 'Uniform'
+    assert latest['ROP'] == expected(uniform, pd.Timestamp('2024-05-10'))['ROP']
+
+    # Pada tanggal yang dimuat kedua run, run terbaru yang menang
+    latest = store.latest_rop('Jakarta', 'BRG-002', as_of='2024-05-06')
+    assert latest['Date'] == pd.Timestamp('2024-05-06') and latest['method'] == 'Dynamic'
+    assert latest['ROP'] == expected(dynamic, pd.Timestamp('2024-05-06'))['ROP']
+
+    latest = store.latest_rop('Jakarta', 'BRG-002', method='Uniform', as_of='2024-05-06')
+    assert latest['method'] == 'Uniform'
+    assert latest['ROP'] == expected(uniform, pd.Timestamp('2024-05-06'))['ROP']
+
+    assert store.latest_rop('Jakarta', 'BRG-002', method='Dynamic')['Date'] == pd.Timestamp('2024-05-07')
+    assert store.latest_rop('Jakarta', 'BRG-002', as_of='2024-04-30') is None
+    assert store.latest_rop('Medan', 'BRG-002') is None
+
+
+def test_latest_rop_ignores_unfinished_runs(store):
+    store.save_run(make_result('2024-05-01', 3), 'Uniform', '2024-05-01', '2024-05-03', 'a')
+    run_id = store.begin_run('Uniform', '2024-05-01', '2024-05-09', 'b')
+    store.add_rows(run_id, make_result('2024-05-01', 9, rop_offset=500))
+    assert store.latest_rop('Surabaya', 'BRG-001')['Date'] == pd.Timestamp('2024-05-03')
+    assert store.item_history('Surabaya', 'BRG-001')['Date'].max() == pd.Timestamp('2024-05-03')
+    # Dengan run_id eksplisit, run yang belum selesai tetap bisa dibaca
+    assert len(store.item_history('Surabaya', 'BRG-001', run_id=run_id)) == 9
+
+
+def test_item_history_takes_newest_run_per_date(store):
+    # Run 1: 1-10 Mei, run 2: 6-15 Mei, run 3 (metode lain): 3-4 Mei
+    first = make_result('2024-05-01', 10)
+    second = make_result('2024-05-06', 10, rop_offset=1000)
+    third = make_result('2024-05-03', 2, rop_offset=5000)
+    ids = [store.save_run(first, 'Uniform', '2024-05-01', '2024-05-10', '1'),
+           store.save_run(second, 'Uniform', '2024-05-06', '2024-05-15', '2'),
+           store.save_run(third, 'Dynamic', '2024-05-03', '2024-05-04', '3')]
+
+    def item(df):
+        return df[(df['City'] == 'Surabaya') & (df['No. Barang'] == 'BRG-002')].set_index('Date')
+
+    history = store.item_history('Surabaya', 'BRG-002').set_index('Date')
+    assert history.index.tolist() == list(pd.date_range('2024-05-01', '2024-05-15'))
+    expected_run = pd.Series(ids[0], index=history.index)
+    expected_run[item(third).index] = ids[2]
+    expected_run[item(second).index] = ids[1]
+    assert history['run_id'].tolist() == expected_run.tolist()
+    for run_id, df in zip(ids, [first, second, third]):
+        days = expected_run.index[expected_run == run_id]
+        assert history.loc[days, 'ROP'].tolist() == item(df).loc[days, 'ROP'].tolist()
+        assert history.loc[days, 'ADS'].tolist() == item(df).loc[days, 'ADS'].tolist()
+
+    ranged = store.item_history('Surabaya', 'BRG-002', start='2024-05-04', end='2024-05-07', method='Uniform')
+    assert ranged['Date'].tolist() == list(pd.date_range('2024-05-04', '2024-05-07'))
+    assert ranged['run_id'].tolist() == [ids[0], ids[0], ids[1], ids[1]]
+    assert store.item_history('Surabaya', 'BRG-002', run_id=ids[0])['ROP'].tolist() == item(first)['ROP'].tolist()
+    assert store.item_history('Surabaya', 'BRG-404').empty
+
+
+def test_retention_keeps_newest_finished_runs(tmp_path):
+    store = ResultStore(str(tmp_path / 'hasil.sqlite'), keep_runs=3)
+    running = store.begin_run('Uniform', '2024-05-01', '2024-05-02', 'berjalan')
+    ids = [store.save_run(make_result('2024-05-01', 2, rop_offset=i), 'Uniform', '2024-05-01', '2024-05-02', str(i))
+           for i in range(5)]
+    runs = store.runs()
+    assert sorted(runs['run_id']) == sorted([running] + ids[-3:])
+    # Baris run yang dihapus ikut hilang; run yang masih berjalan tidak disentuh
+    assert all(store.run_rows(run_id).empty for run_id in ids[:2])
+    assert len(store.run_rows(ids[-1])) == 8
+    assert store.latest_rop('Surabaya', 'BRG-001')['run_id'] == ids[-1]
+
+    assert store.prune_runs(keep=1) == [ids[-2], ids[-3]]
+    assert sorted(store.runs()['run_id']) == [running, ids[-1]]
+    assert store.prune_runs(keep=0) == []